@@ -0,0 +1,89 @@
+"""Benchmark decoding of host_list_vm_detection responses.
+
+Compares pydantic-xml's from_xml_tree against the single-pass decoder in qualyspy.models.fast_xml
+on a synthetic response.
+
+Usage:
+python debug/bench_detection_decode.py [hosts] [detections_per_host]
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qualyspy import qutils  # noqa: E402
+from qualyspy.models import fast_xml  # noqa: E402
+from qualyspy.models.vmdr import host_list_vm_detection_output  # noqa: E402
+
+DETECTION = """<DETECTION>
+<UNIQUE_VULN_ID>{uvid}</UNIQUE_VULN_ID><QID>{qid}</QID><TYPE>Confirmed</TYPE>
+<SEVERITY>{severity}</SEVERITY><PORT>443</PORT><PROTOCOL>tcp</PROTOCOL><SSL>1</SSL>
+<RESULTS><![CDATA[Result text for detection {uvid}]]></RESULTS><STATUS>Active</STATUS>
+<FIRST_FOUND_DATETIME>2023-01-01T00:00:00Z</FIRST_FOUND_DATETIME>
+<LAST_FOUND_DATETIME>2024-01-01T00:00:00Z</LAST_FOUND_DATETIME>
+<QDS severity="HIGH">{qds}</QDS>
+<QDS_FACTORS><QDS_FACTOR name="CVSS"><![CDATA[7.5]]></QDS_FACTOR></QDS_FACTORS>
+<TIMES_FOUND>3</TIMES_FOUND><LAST_TEST_DATETIME>2024-01-01T00:00:00Z</LAST_TEST_DATETIME>
+<LAST_UPDATE_DATETIME>2024-01-01T00:00:00Z</LAST_UPDATE_DATETIME>
+<IS_IGNORED>0</IS_IGNORED><IS_DISABLED>0</IS_DISABLED>
+<LAST_PROCESSED_DATETIME>2024-01-01T00:00:00Z</LAST_PROCESSED_DATETIME>
+</DETECTION>"""
+
+HOST = """<HOST><ID>{id}</ID><IP>10.0.{b}.{c}</IP><TRACKING_METHOD>IP</TRACKING_METHOD>
+<OS><![CDATA[Linux]]></OS><DNS_DATA><HOSTNAME><![CDATA[host{id}]]></HOSTNAME></DNS_DATA>
+<LAST_SCAN_DATETIME>2024-01-01T00:00:00Z</LAST_SCAN_DATETIME>
+<DETECTION_LIST>{detections}</DETECTION_LIST></HOST>"""
+
+
+def build_response(hosts: int, detections: int) -> bytes:
+    host_list = "".join(
+        HOST.format(
+            id=h,
+            b=h // 256 % 256,
+            c=h % 256,
+            detections="".join(
+                DETECTION.format(
+                    uvid=h * detections + d, qid=d, severity=d % 5 + 1, qds=d % 100
+                )
+                for d in range(detections)
+            ),
+        )
+        for h in range(1, hosts + 1)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" ?>\n'
+        "<!DOCTYPE HOST_LIST_VM_DETECTION_OUTPUT SYSTEM "
+        '"https://qualysapi.qualys.com/api/2.0/fo/asset/host/vm/detection/'
+        'host_list_vm_detection_output.dtd">\n'
+        "<HOST_LIST_VM_DETECTION_OUTPUT><RESPONSE>"
+        "<DATETIME>2024-01-01T00:00:00Z</DATETIME>"
+        f"<HOST_LIST>{host_list}</HOST_LIST>"
+        "</RESPONSE></HOST_LIST_VM_DETECTION_OUTPUT>"
+    ).encode("utf-8")
+
+
+def main() -> None:
+    hosts = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    detections = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    content = build_response(hosts, detections)
+    root = qutils.xml_root_from_bytes(
+        content, "HOST_LIST_VM_DETECTION_OUTPUT", huge_tree=True
+    )
+    model = host_list_vm_detection_output.HostListVMDetectionOutput
+
+    if model.from_xml_tree(root) != fast_xml.decode(model, root):
+        raise AssertionError("Decoders disagree.")
+
+    number = 3
+    pydantic_xml_sec = timeit.timeit(lambda: model.from_xml_tree(root), number=number)
+    fast_sec = timeit.timeit(lambda: fast_xml.decode(model, root), number=number)
+    print(f"{hosts} hosts x {detections} detections ({len(content) / 1e6:.1f} MB)")
+    print(f"pydantic-xml from_xml_tree: {pydantic_xml_sec / number:.3f} s")
+    print(f"fast_xml.decode:            {fast_sec / number:.3f} s")
+    print(f"speedup:                    {pydantic_xml_sec / fast_sec:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
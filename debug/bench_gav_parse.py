@@ -0,0 +1,127 @@
+"""Benchmark parsing of GAV all_asset_details responses.
+
+Compares the previous three-pass parse (response.json(), cleaning the dict in Python, then
+validating it) against a single model_validate_json on the raw bytes, on a synthetic page.
+
+Usage:
+python debug/bench_gav_parse.py [assets]
+"""
+
+import datetime
+import ipaddress
+import json
+import os
+import sys
+import timeit
+import types
+import typing
+from typing import Any
+
+import pydantic
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qualyspy.models.gav import asset_details_output  # noqa: E402
+
+
+def sample(annotation: Any, n: int) -> Any:
+    """Build a JSON value for annotation, filling lists with a few items."""
+    args = typing.get_args(annotation)
+    origin = typing.get_origin(annotation)
+    if origin is typing.Annotated:
+        return sample(args[0], n)
+    if origin in (typing.Union, types.UnionType):
+        return sample(next(arg for arg in args if arg is not type(None)), n)
+    if origin is list:
+        return [sample(args[0], n + i) for i in range(3)]
+    if isinstance(annotation, type) and issubclass(annotation, pydantic.BaseModel):
+        return {
+            field.alias or name: sample(field.annotation, n)
+            for name, field in annotation.model_fields.items()
+        }
+    if annotation is datetime.datetime:
+        return "2024-01-01T00:00:00.000Z"
+    if annotation is ipaddress.IPv4Address:
+        return f"10.0.{n // 256 % 256}.{n % 256}"
+    if annotation is ipaddress.IPv6Address:
+        return f"fe80::{n:x}"
+    if annotation is bool:
+        return True
+    if annotation is int:
+        return n
+    return f"value {n}"
+
+
+def build_response(assets: int) -> bytes:
+    asset_list = []
+    for n in range(assets):
+        asset = sample(asset_details_output.AssetItem, n)
+        asset["address"] = f"10.1.{n // 256 % 256}.{n % 256}"
+        # Raw forms the cleanup has to handle.
+        for interface in asset["networkInterfaceListData"]["networkInterface"]:
+            interface["addressIpV4"] = ", ".join(interface["addressIpV4"])
+            interface["addressIpV6"] = ", ".join(interface["addressIpV6"])
+        asset["cloudProvider"]["oci"]["tags"] = None
+        asset["whois"] = None
+        asset_list.append(asset)
+    return json.dumps(
+        {
+            "responseMessage": "Valid API Access",
+            "count": assets,
+            "responseCode": "SUCCESS",
+            "lastSeenAssetId": assets,
+            "hasMore": 0,
+            "assetListData": {"asset": asset_list},
+        }
+    ).encode("utf-8")
+
+
+def three_pass(content: bytes) -> asset_details_output.AssetDetailsOutput:
+    """The parse done before the cleanup moved into validators."""
+
+    def convert_ipaddress(ips: str | None) -> list[str] | None:
+        if ips is None:
+            return None
+        elif "," in ips:
+            return ips.split(", ")
+        return [ips]
+
+    response_json = json.loads(content)
+    for asset in response_json["assetListData"]["asset"]:
+        if asset["networkInterfaceListData"] is not None:
+            for interface in asset["networkInterfaceListData"]["networkInterface"]:
+                interface["addressIpV4"] = convert_ipaddress(interface["addressIpV4"])
+                interface["addressIpV6"] = convert_ipaddress(interface["addressIpV6"])
+        if (
+            asset["cloudProvider"] is not None
+            and asset["cloudProvider"]["oci"] is not None
+        ):
+            if asset["cloudProvider"]["oci"]["tags"] is None:
+                asset["cloudProvider"]["oci"]["tags"] = []
+        if asset["whois"] is None:
+            asset["whois"] = []
+    return asset_details_output.AssetDetailsOutput(**response_json)
+
+
+def main() -> None:
+    assets = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    content = build_response(assets)
+    model = asset_details_output.AssetDetailsOutput
+
+    def one_pass() -> asset_details_output.AssetDetailsOutput:
+        return model.model_validate_json(content, by_alias=True, by_name=False)
+
+    if three_pass(content) != one_pass():
+        raise AssertionError("Parsers disagree.")
+
+    number = 10
+    three_pass_sec = timeit.timeit(lambda: three_pass(content), number=number)
+    one_pass_sec = timeit.timeit(one_pass, number=number)
+    print(f"{assets} assets ({len(content) / 1e6:.1f} MB)")
+    print(f"json + clean + validate: {three_pass_sec / number * 1000:.1f} ms")
+    print(f"model_validate_json:     {one_pass_sec / number * 1000:.1f} ms")
+    print(f"speedup:                 {three_pass_sec / one_pass_sec:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -24,6 +24,7 @@ delete_tag = "/qps/rest/2.0/delete/am/tag"
 get_asset_info = "/qps/rest/2.0/get/am/asset"
 update_asset = "/qps/rest/2.0/update/am/asset"
 search_assets = "/qps/rest/2.0/search/am/asset"
+count_assets = "/qps/rest/2.0/count/am/asset"
 
 list_instances = "/certview/v2/instances"
 add_bulk_external_sites = "/certview/v1/externalSites/bulkAdd"
@@ -1,5 +1,10 @@
-from . import URLS
-from .base import QualysAPIBase
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator
+
+from . import URLS, exceptions, qutils
+from .base import BatchResult, QualysAPIBase
 from .models.asset_mgmt_tagging import (
     asset_output,
     asset_request,
@@ -10,6 +15,24 @@ from .models.asset_mgmt_tagging.asset_request import Criteria as AssetSearchCrit
 
 
 class AssetMgmtTaggingAPI(QualysAPIBase):
+    _tag_index: "TagIndex | None" = None
+
+    def tag_index(self, ttl: float | None = 3600.0) -> "TagIndex":
+        """Get the in-memory index of all tags, creating it on first use.
+
+        Args:
+            ttl (float, optional): Seconds after which the index is reloaded in full, to pick up
+                changes made elsewhere.  Defaults to 3600.  None never reloads.
+
+        Returns:
+            TagIndex: The tag index.
+        """
+        if self._tag_index is None:
+            self._tag_index = TagIndex(self, ttl=ttl)
+        else:
+            self._tag_index.ttl = ttl
+        return self._tag_index
+
     def create_tag(
         self,
         name: str,
@@ -36,6 +59,10 @@ class AssetMgmtTaggingAPI(QualysAPIBase):
         )
         ret = tag_output.Wrapper.model_validate_json(resp.text)
 
+        if self._tag_index is not None:
+            for datum in ret.service_response.data:
+                self._tag_index.invalidate(datum.tag.id, children=bool(children))
+
         return ret.service_response
 
     def update_tag(
@@ -73,6 +100,11 @@ class AssetMgmtTaggingAPI(QualysAPIBase):
         )
         ret = tag_output.Wrapper.model_validate_json(resp.text)
 
+        if self._tag_index is not None:
+            self._tag_index.invalidate(
+                tag_id, children=bool(add_children or remove_children)
+            )
+
         return ret.service_response
 
     def search_tags(
@@ -83,6 +115,9 @@ class AssetMgmtTaggingAPI(QualysAPIBase):
         rule_type: tag_request.tag_rule_types | None = None,
         provider: tag_request.tag_provider_types | None = None,
         color: str | None = None,
+        start_from_offset: int | None = None,
+        start_from_id: int | None = None,
+        limit_results: int | None = None,
     ) -> tag_output.ServiceResponse:
         request_data = tag_request.create_search_tags_request(
             id=id,
@@ -91,6 +126,9 @@ class AssetMgmtTaggingAPI(QualysAPIBase):
             rule_type=rule_type,
             provider=provider,
             color=color,
+            start_from_offset=start_from_offset,
+            start_from_id=start_from_id,
+            limit_results=limit_results,
         )
         request_data_xml = request_data.to_xml(
             skip_empty=True, pretty_print=True, encoding="UTF-8", xml_declaration=True
@@ -105,10 +143,83 @@ class AssetMgmtTaggingAPI(QualysAPIBase):
 
         return ret.service_response
 
+    def count_tags(
+        self,
+        id: int | None = None,
+        name: str | None = None,
+        parent: int | None = None,
+        rule_type: tag_request.tag_rule_types | None = None,
+        provider: tag_request.tag_provider_types | None = None,
+        color: str | None = None,
+    ) -> int:
+        request_data = tag_request.create_search_tags_request(
+            id=id,
+            name=name,
+            parent=parent,
+            rule_type=rule_type,
+            provider=provider,
+            color=color,
+        )
+        request_data_xml = request_data.to_xml(
+            skip_empty=True, encoding="UTF-8", xml_declaration=True
+        )
+
+        resp = self.post(
+            URLS.count_tags,
+            content=request_data_xml,
+            content_type="application/xml",
+        )
+        ret = tag_output.Wrapper.model_validate_json(resp.text)
+
+        return ret.service_response.count
+
+    def iter_tags(
+        self,
+        id: int | None = None,
+        name: str | None = None,
+        parent: int | None = None,
+        rule_type: tag_request.tag_rule_types | None = None,
+        provider: tag_request.tag_provider_types | None = None,
+        color: str | None = None,
+        page_size: int = 1000,
+        workers: int | None = None,
+    ) -> Iterator[tag_output.Tag]:
+        """Iterate over every tag matching the filters, fetching pages as needed.
+
+        Args:
+            id, name, parent, rule_type, provider, color: Filters, as for search_tags.
+            page_size (int, optional): Number of tags per request.  Defaults to 1000.
+            workers (int, optional): Number of pages to fetch at once.  Defaults to None, which
+                uses the concurrency limit reported by the Qualys API.  1 fetches the pages one
+                after another, without counting the tags first.
+
+        Yields:
+            tag_output.Tag: The matching tags, each once.
+        """
+        filters: dict[str, Any] = {
+            "id": id,
+            "name": name,
+            "parent": parent,
+            "rule_type": rule_type,
+            "provider": provider,
+            "color": color,
+        }
+        count = self.count_tags(**filters) if workers != 1 else None
+        yield from self._paginate(
+            lambda **prefs: self.search_tags(**filters, **prefs),
+            records=lambda page: [datum.tag for datum in page.data],
+            page_size=page_size,
+            count=count,
+            workers=workers,
+        )
+
     def delete_tag(self, tag_id: int) -> tag_output.ServiceResponse:
         resp = self.post(URLS.delete_tag + f"/{tag_id}")
         ret = tag_output.Wrapper.model_validate_json(resp.text)
 
+        if self._tag_index is not None:
+            self._tag_index.discard(tag_id)
+
         return ret.service_response
 
     def get_asset_info(self, asset_id: int) -> asset_output.ServiceResponse:
@@ -145,8 +256,12 @@ class AssetMgmtTaggingAPI(QualysAPIBase):
             skip_empty=True, pretty_print=True, encoding="UTF-8", xml_declaration=True
         )
 
+        # Without an id, the update applies to every asset matching criteria.
+        url = URLS.update_asset
+        if asset_id is not None:
+            url += f"/{asset_id}"
         resp = self.post(
-            URLS.update_asset + f"/{asset_id}",
+            url,
             content=request_data_xml,
             content_type="application/xml",
         )
@@ -154,6 +269,59 @@ class AssetMgmtTaggingAPI(QualysAPIBase):
 
         return ret.service_response
 
+    def update_assets(
+        self,
+        asset_ids: list[int],
+        add_tags: list[int] = [],
+        remove_tags: list[int] = [],
+        batch_size: int = 1000,
+        workers: int | None = None,
+    ) -> list[BatchResult]:
+        """Add or remove tags on many assets, sending batches of asset IDs concurrently.
+
+        Args:
+            asset_ids (list[int]): IDs of the assets to update.  Duplicates are ignored.
+            add_tags (list[int], optional): IDs of the tags to add.  Defaults to [].
+            remove_tags (list[int], optional): IDs of the tags to remove.  Defaults to [].
+            batch_size (int, optional): Number of assets per request.  Defaults to 1000.
+            workers (int, optional): Number of requests to send at once.  Defaults to None,
+                which uses the concurrency limit reported by the Qualys API.
+
+        Returns:
+            list[BatchResult]: For each batch, its asset IDs and either the
+                asset_output.ServiceResponse or the error.
+
+        Raises:
+            ValueError: Raised if both add_tags and remove_tags are given.
+        """
+        if add_tags and remove_tags:
+            raise ValueError(
+                "Cannot add and remove tags at the same time. Please use separate calls."
+            )
+
+        def _update_batch(batch: list[int]) -> asset_output.ServiceResponse:
+            criteria = AssetSearchCriteria(
+                field="id", operator="IN", value=",".join(map(str, batch))
+            )
+            request_data = asset_request.create_asset_request(
+                criteria=[criteria], add_tags=add_tags, remove_tags=remove_tags
+            )
+            request_data_xml = request_data.to_xml(
+                skip_empty=True, encoding="UTF-8", xml_declaration=True
+            )
+            resp = self.post(
+                URLS.update_asset,
+                content=request_data_xml,
+                content_type="application/xml",
+            )
+            ret = asset_output.Wrapper.model_validate_json(resp.text).service_response
+            if ret.response_code != "SUCCESS":
+                raise exceptions.QualysAPIError(resp.text)
+            return ret
+
+        batches = list(qutils.chunked(dict.fromkeys(asset_ids), batch_size))
+        return self.run_batches(_update_batch, batches, workers=workers)
+
     def search_assets(
         self,
         criteria: list[AssetSearchCriteria],
@@ -179,3 +347,331 @@ class AssetMgmtTaggingAPI(QualysAPIBase):
         ret = asset_output.Wrapper.model_validate_json(resp.text)
 
         return ret.service_response
+
+    def count_assets(self, criteria: list[AssetSearchCriteria]) -> int:
+        request_data = asset_request.create_asset_request(criteria=criteria)
+        request_data_xml = request_data.to_xml(
+            skip_empty=True, encoding="UTF-8", xml_declaration=True
+        )
+
+        resp = self.post(
+            URLS.count_assets,
+            content=request_data_xml,
+            content_type="application/xml",
+        )
+        ret = asset_output.Wrapper.model_validate_json(resp.text)
+
+        return ret.service_response.count or 0
+
+    def iter_assets(
+        self,
+        criteria: list[AssetSearchCriteria],
+        page_size: int = 1000,
+        workers: int | None = None,
+    ) -> Iterator[asset_output.Asset]:
+        """Iterate over every asset matching criteria, fetching pages as needed.
+
+        Args:
+            criteria (list[AssetSearchCriteria]): Criteria to match the assets with.
+            page_size (int, optional): Number of assets per request.  Defaults to 1000.
+            workers (int, optional): Number of pages to fetch at once.  Defaults to None, which
+                uses the concurrency limit reported by the Qualys API.  1 fetches the pages one
+                after another, without counting the assets first.
+
+        Yields:
+            asset_output.Asset: The matching assets, each once.
+        """
+        count = self.count_assets(criteria) if workers != 1 else None
+        yield from self._paginate(
+            lambda **prefs: self.search_assets(criteria, **prefs),
+            records=lambda page: [datum.asset for datum in page.data or []],
+            page_size=page_size,
+            count=count,
+            workers=workers,
+        )
+
+    def _paginate(
+        self,
+        search: Callable[..., Any],
+        records: Callable[[Any], list[Any]],
+        page_size: int,
+        count: int | None,
+        workers: int | None,
+    ) -> Iterator[Any]:
+        """Fetch every page of a search concurrently and yield each record once.
+
+        Args:
+            search (Callable[..., Any]): Search method accepting the start_from_offset,
+                start_from_id and limit_results preferences and returning a ServiceResponse.
+            records (Callable[[Any], list[Any]]): Function returning the records of a page.
+            page_size (int): Number of records per request.
+            count (int | None): Number of matching records, if known.  Pages past it are
+                fetched one after another.
+            workers (int | None): Number of pages to fetch at once.
+
+        Yields:
+            Any: The records, in page order.
+        """
+        seen: set[int] = set()
+
+        def _new_records(page: Any) -> Iterator[Any]:
+            for record in records(page):
+                if record.id not in seen:
+                    seen.add(record.id)
+                    yield record
+
+        page = None
+        if count:
+            # Offsets are 1-based.
+            offsets = range(1, count + 1, page_size)
+            executor = ThreadPoolExecutor(
+                max_workers=workers or self.concurrency_limit_limit or 4
+            )
+            try:
+                for page in executor.map(
+                    lambda offset: search(
+                        start_from_offset=offset, limit_results=page_size
+                    ),
+                    offsets,
+                ):
+                    yield from _new_records(page)
+            finally:
+                executor.shutdown(cancel_futures=True)
+        else:
+            page = search(limit_results=page_size)
+            yield from _new_records(page)
+
+        while page.has_more_records and page.last_id is not None:
+            page = search(start_from_id=page.last_id + 1, limit_results=page_size)
+            yield from _new_records(page)
+
+
+class TagIndex:
+    """In-memory index of the Qualys tags, kept up to date by AssetMgmtTaggingAPI.
+
+    Attributes:
+        ttl (float | None): Seconds after which the index is reloaded in full.  None never
+            reloads.
+    """
+
+    def __init__(self, api: AssetMgmtTaggingAPI, ttl: float | None = 3600.0) -> None:
+        self.ttl = ttl
+        self._api = api
+        self._lock = threading.RLock()
+        self._loaded_at: float | None = None
+        # Tag IDs to re-fetch, mapped to whether their children must be re-fetched too.
+        self._stale: dict[int, bool] = {}
+        self._tags: dict[int, tag_output.Tag] = {}
+        self._by_name: dict[str, set[int]] = {}
+        self._by_rule_type: dict[str | None, set[int]] = {}
+        self._children: dict[int, set[int]] = {}
+
+    def refresh(self) -> None:
+        """Reload every tag from Qualys."""
+        with self._lock:
+            self._tags.clear()
+            self._by_name.clear()
+            self._by_rule_type.clear()
+            self._children.clear()
+            self._stale.clear()
+            for tag in self._api.iter_tags():
+                self._add(tag)
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self, tag_id: int, children: bool = False) -> None:
+        """Mark a tag as changed, so it is re-fetched before the next lookup.
+
+        Args:
+            tag_id (int): ID of the tag.
+            children (bool, optional): Whether the children of the tag changed too.  Defaults
+                to False.
+        """
+        with self._lock:
+            self._stale[tag_id] = self._stale.get(tag_id, False) or children
+
+    def discard(self, tag_id: int) -> None:
+        """Remove a deleted tag, and its descendants, from the index.
+
+        Args:
+            tag_id (int): ID of the tag.
+        """
+        with self._lock:
+            self._stale.pop(tag_id, None)
+            self._remove_tree(tag_id)
+
+    def get(self, tag_id: int) -> tag_output.Tag | None:
+        """Get a tag by ID.
+
+        Args:
+            tag_id (int): ID of the tag.
+
+        Returns:
+            tag_output.Tag | None: The tag, or None if there is no tag with this ID.
+        """
+        with self._lock:
+            self._ensure_fresh()
+            return self._tags.get(tag_id)
+
+    def by_name(self, name: str) -> list[tag_output.Tag]:
+        """Get the tags with a name.  Tag names are only unique among siblings.
+
+        Args:
+            name (str): Name of the tags.
+
+        Returns:
+            list[tag_output.Tag]: The tags with this name, ordered by ID.
+        """
+        with self._lock:
+            self._ensure_fresh()
+            return self._lookup(self._by_name.get(name, set()))
+
+    def id_of(self, name: str) -> int:
+        """Get the ID of the only tag with a name.
+
+        Args:
+            name (str): Name of the tag.
+
+        Returns:
+            int: ID of the tag.
+
+        Raises:
+            KeyError: Raised if there is no tag with this name.
+            ValueError: Raised if several tags have this name.
+        """
+        tags = self.by_name(name)
+        if not tags:
+            raise KeyError(name)
+        if len(tags) > 1:
+            raise ValueError(
+                f"{len(tags)} tags are named {name!r}: {[tag.id for tag in tags]}"
+            )
+        return tags[0].id
+
+    def by_rule_type(self, rule_type: str | None) -> list[tag_output.Tag]:
+        """Get the tags with a rule type.
+
+        Args:
+            rule_type (str | None): Rule type of the tags, or None for tags without a rule.
+
+        Returns:
+            list[tag_output.Tag]: The tags with this rule type, ordered by ID.
+        """
+        with self._lock:
+            self._ensure_fresh()
+            return self._lookup(self._by_rule_type.get(rule_type, set()))
+
+    def parent(self, tag_id: int) -> tag_output.Tag | None:
+        """Get the parent of a tag.
+
+        Args:
+            tag_id (int): ID of the tag.
+
+        Returns:
+            tag_output.Tag | None: The parent tag, or None for top-level and unknown tags.
+        """
+        with self._lock:
+            tag = self.get(tag_id)
+            if tag is None or tag.parent_tag_id is None:
+                return None
+            return self._tags.get(tag.parent_tag_id)
+
+    def children(self, tag_id: int) -> list[tag_output.Tag]:
+        """Get the children of a tag.
+
+        Args:
+            tag_id (int): ID of the tag.
+
+        Returns:
+            list[tag_output.Tag]: The child tags, ordered by ID.
+        """
+        with self._lock:
+            self._ensure_fresh()
+            return self._lookup(self._children.get(tag_id, set()))
+
+    def descendants(self, tag_id: int) -> Iterator[tag_output.Tag]:
+        """Iterate over the descendants of a tag, depth first.
+
+        Args:
+            tag_id (int): ID of the tag.
+
+        Yields:
+            tag_output.Tag: The descendant tags.
+        """
+        for child in self.children(tag_id):
+            yield child
+            yield from self.descendants(child.id)
+
+    def ancestors(self, tag_id: int) -> Iterator[tag_output.Tag]:
+        """Iterate over the ancestors of a tag, from its parent up to the top-level tag.
+
+        Args:
+            tag_id (int): ID of the tag.
+
+        Yields:
+            tag_output.Tag: The ancestor tags.
+        """
+        parent = self.parent(tag_id)
+        while parent is not None:
+            yield parent
+            parent = self.parent(parent.id)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_fresh()
+            return len(self._tags)
+
+    def __contains__(self, tag_id: object) -> bool:
+        with self._lock:
+            self._ensure_fresh()
+            return tag_id in self._tags
+
+    def _ensure_fresh(self) -> None:
+        """Reload or re-fetch stale tags.  Callers hold self._lock while they read."""
+        if self._loaded_at is None or (
+            self.ttl is not None and time.monotonic() - self._loaded_at > self.ttl
+        ):
+            self.refresh()
+        while self._stale:
+            tag_id, children = self._stale.popitem()
+            self._fetch(tag_id, children)
+
+    def _fetch(self, tag_id: int, children: bool) -> None:
+        """Re-fetch one tag, and optionally its children, from Qualys."""
+        tags = [datum.tag for datum in self._api.search_tags(id=tag_id).data]
+        if not tags:
+            self._remove_tree(tag_id)
+            return
+        if children:
+            tags += self._api.iter_tags(parent=tag_id, workers=1)
+            removed = self._children.get(tag_id, set()) - {tag.id for tag in tags}
+            for child_id in removed:
+                self._remove_tree(child_id)
+        for tag in tags:
+            self._remove(tag.id)
+            self._add(tag)
+
+    def _lookup(self, tag_ids: set[int]) -> list[tag_output.Tag]:
+        return [self._tags[tag_id] for tag_id in sorted(tag_ids)]
+
+    def _add(self, tag: tag_output.Tag) -> None:
+        self._tags[tag.id] = tag
+        if tag.name is not None:
+            self._by_name.setdefault(tag.name, set()).add(tag.id)
+        self._by_rule_type.setdefault(tag.rule_type, set()).add(tag.id)
+        if tag.parent_tag_id is not None:
+            self._children.setdefault(tag.parent_tag_id, set()).add(tag.id)
+
+    def _remove(self, tag_id: int) -> None:
+        tag = self._tags.pop(tag_id, None)
+        if tag is None:
+            return
+        if tag.name is not None:
+            self._by_name[tag.name].discard(tag_id)
+        self._by_rule_type[tag.rule_type].discard(tag_id)
+        if tag.parent_tag_id is not None:
+            self._children.get(tag.parent_tag_id, set()).discard(tag_id)
+
+    def _remove_tree(self, tag_id: int) -> None:
+        for child_id in self._children.pop(tag_id, set()):
+            self._remove_tree(child_id)
+        self._remove(tag_id)
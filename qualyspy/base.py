@@ -10,19 +10,24 @@ api.get("/msp/about.php")
 # For SQLAlchemy:
 # mypy: allow-untyped-calls
 
+import contextlib
+import dataclasses
 import datetime
+import functools
 import json
-import sys
+import time
 import urllib.parse
 from abc import ABC, abstractmethod
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator, Sequence
 
 import httpx
 import sqlalchemy as sa
 import sqlalchemy.orm as orm
 from decouple import config  # type: ignore
+from psycopg.errors import LockNotAvailable
 
-from . import URLS, exceptions
+from . import URLS, exceptions, qutils
 from .qualyspy_logging import bootstrap_logger
 
 _USE_API_SERVER = ["msp", "api", "qps"]
@@ -31,6 +36,26 @@ _USE_API_GATEWAY = ["rest", "certview"]
 _TIMEOUT = httpx.Timeout(120.0, read=300.0)
 
 
+@dataclasses.dataclass
+class BatchResult:
+    """Outcome of one batch of a bulk operation.
+
+    Attributes:
+        items (list[Any]): The items in the batch.
+        result (Any): The value returned for the batch.  None if the batch failed.
+        error (Exception | None): The exception raised by the batch, if any.
+    """
+
+    items: list[Any]
+    result: Any = None
+    error: Exception | None = None
+
+    @property
+    def ok(self) -> bool:
+        """Whether the batch succeeded."""
+        return self.error is None
+
+
 class QualysAPIBase:
     """Base class for interacting with the Qualys API.  This class is not intended to be used
     directly, but rather to be subclassed by other classes which implement specific Qualys API
@@ -208,6 +233,33 @@ class QualysAPIBase:
         Returns:
             The text of the response.
 
+        Raises:
+            exceptions.QualysAPIError: Raised if the Qualys API returns a non-200 response.
+        """
+        with self.stream_get(url, params, accept) as response:
+            response.read()
+        return response
+
+    @contextlib.contextmanager
+    def stream_get(
+        self,
+        url: str,
+        params: dict[str, str] | None = None,
+        accept: str = "application/xml",
+    ) -> Iterator[httpx.Response]:
+        """Send a GET request to the Qualys API without reading the response body.
+
+        The body can then be read in chunks with iter_bytes, so large responses don't have to be
+        held in memory.  The connection is closed when the context exits.
+
+        Args:
+            url (str): URL to send the request to.
+            params (dict[str, str], optional): Parameters to send with the request.  Defaults to
+                None, which means the API call will use the default parameters.
+
+        Yields:
+            The response, with its body not yet read.
+
         Raises:
             exceptions.QualysAPIError: Raised if the Qualys API returns a non-200 response.
         """
@@ -224,7 +276,8 @@ class QualysAPIBase:
         else:
             raise ValueError("No valid API root or gateway found.")
         try:
-            response = httpx.get(
+            with httpx.stream(
+                "GET",
                 root + url,
                 params=params,
                 auth=(self.username, self.password)
@@ -232,7 +285,16 @@ class QualysAPIBase:
                 else None,
                 headers=headers,
                 timeout=_TIMEOUT,
-            )
+            ) as response:
+                try:
+                    response.raise_for_status()
+                except httpx.HTTPError as e:
+                    response.read()
+                    raise exceptions.QualysAPIError(response.text) from e
+
+                self._update_limits(response)
+                self._log_http(method="GET", params=params, resp=response)
+                yield response
         except httpx.ReadTimeout as e:
             raise exceptions.QualysAPIError(
                 f"""
@@ -242,14 +304,6 @@ class QualysAPIBase:
                                             timestamp: {datetime.datetime.now()}
                                             """
             ) from e
-        try:
-            response.raise_for_status()
-        except httpx.HTTPError as e:
-            raise exceptions.QualysAPIError(response.text) from e
-
-        self._update_limits(response)
-        self._log_http(method="GET", params=params, resp=response)
-        return response
 
     def post(
         self,
@@ -321,6 +375,256 @@ class QualysAPIBase:
         self._log_http(method="POST", params=params, resp=response)
         return response
 
+    def _wait_for_ratelimit(self) -> None:
+        """Sleep until the rate limit window resets if no requests remain in it."""
+        if self.ratelimit_remaining == 0:
+            wait = self.ratelimit_towait_sec or self.ratelimit_window_sec or 1
+            self.log.info("Rate limit reached, waiting %s seconds", wait)
+            time.sleep(wait)
+
+    def run_batches(
+        self,
+        func: Callable[[list[Any]], Any],
+        batches: Sequence[list[Any]],
+        workers: int | None = None,
+    ) -> list[BatchResult]:
+        """Call func on each batch concurrently, collecting the outcome of each batch.
+
+        A batch that raises doesn't stop the others; its exception is recorded in its result.
+        Before each call, waits for the rate limit window to reset if no requests remain in it.
+
+        Args:
+            func (Callable[[list[Any]], Any]): Function making the API call(s) for one batch.
+            batches (Sequence[list[Any]]): The batches to process.
+            workers (int, optional): Number of batches to process at once.  Defaults to None,
+                which uses the concurrency limit reported by the Qualys API, or 4 if unknown.
+
+        Returns:
+            list[BatchResult]: The outcome of each batch, in the same order as batches.
+        """
+
+        def _run(batch: list[Any]) -> BatchResult:
+            self._wait_for_ratelimit()
+            try:
+                return BatchResult(items=batch, result=func(batch))
+            except Exception as e:
+                self.log.warning("Batch of %d items failed: %s", len(batch), e)
+                return BatchResult(items=batch, error=e)
+
+        workers = workers or self.concurrency_limit_limit or 4
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(_run, batches))
+
+
+def _with_eager_loads(stmt: Any) -> Any:
+    """Add options to a select statement to eager load the children of the selected entity.
+
+    Args:
+        stmt (Any): SQLAlchemy select statement of a single ORM entity.
+
+    Returns:
+        Any: The statement with the loader options from qutils.eager_load_options.
+    """
+    entity = stmt.column_descriptions[0]["entity"]
+    if entity is None:
+        raise ValueError("Statement does not select an ORM entity.")
+    return stmt.options(*qutils.eager_load_options(entity))
+
+
+def _create_bare_tables(conn: sa.Connection, metadata: sa.MetaData) -> None:
+    """Create the tables of metadata without their secondary indexes or foreign key constraints.
+
+    Args:
+        conn (sa.Connection): Connection to create the tables with.
+        metadata (sa.MetaData): Metadata containing the tables.
+    """
+    for table in metadata.sorted_tables:
+        conn.execute(sa.schema.CreateTable(table, include_foreign_key_constraints=[]))
+
+
+def _create_indexes_and_constraints(
+    engine: sa.Engine, metadata: sa.MetaData, workers: int
+) -> None:
+    """Create the indexes and foreign key constraints left out by _create_bare_tables.
+
+    Indexes are built concurrently, each on its own connection.  Each foreign key constraint is
+    then validated against the loaded rows in a single pass.
+
+    Args:
+        engine (sa.Engine): Engine to connect with.
+        metadata (sa.MetaData): Metadata containing the tables.
+        workers (int): Number of indexes to build at once.
+
+    Raises:
+        sqlalchemy.exc.IntegrityError: Raised if the loaded rows violate a foreign key.
+    """
+
+    def _create_index(index: sa.Index) -> None:
+        with engine.begin() as conn:
+            index.create(conn)
+
+    indexes = [index for table in metadata.sorted_tables for index in table.indexes]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # list() re-raises the first error, if any.
+        list(executor.map(_create_index, indexes))
+
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            for fk in table.foreign_key_constraints:
+                # Without isolate_from_table=False, the constraint would be left out of every
+                # later CREATE TABLE of this metadata.
+                conn.execute(sa.schema.AddConstraint(fk, isolate_from_table=False))
+
+
+def _set_unlogged(conn: sa.Connection, metadata: sa.MetaData, schema: str) -> None:
+    """Switch the (empty) tables of metadata in schema to UNLOGGED.
+
+    Referencing tables are switched before the tables they reference, since a logged table can't
+    reference an unlogged one.
+
+    Args:
+        conn (sa.Connection): Connection to alter the tables with.
+        metadata (sa.MetaData): Metadata containing the tables.
+        schema (str): Schema the tables were created in.
+    """
+    for table in reversed(metadata.sorted_tables):
+        conn.execute(sa.text(f"ALTER TABLE {schema}.{table.name} SET UNLOGGED"))
+
+
+def _set_logged(
+    engine: sa.Engine,
+    metadata: sa.MetaData,
+    schema: str,
+    workers: int,
+    *,
+    foreign_keys: bool = True,
+) -> None:
+    """Switch the tables of metadata in schema back to LOGGED.
+
+    Switching rewrites the whole table to the WAL, so independent tables are switched
+    concurrently, each on its own connection.  Referenced tables are switched before the tables
+    referencing them.
+
+    Args:
+        engine (sa.Engine): Engine to connect with.
+        metadata (sa.MetaData): Metadata containing the tables.
+        schema (str): Schema the tables were created in.
+        workers (int): Number of tables to switch at once.
+        foreign_keys (bool, optional): Whether the foreign key constraints exist yet.  If not,
+            all tables are independent.  Defaults to True.
+    """
+    levels: dict[sa.Table, int] = {}
+    for table in metadata.sorted_tables:
+        referred = (
+            [
+                fk.referred_table
+                for fk in table.foreign_key_constraints
+                if fk.referred_table is not table
+            ]
+            if foreign_keys
+            else []
+        )
+        levels[table] = max((levels[parent] + 1 for parent in referred), default=0)
+
+    def _set_table_logged(table: sa.Table) -> None:
+        with engine.begin() as conn:
+            conn.execute(sa.text(f"ALTER TABLE {schema}.{table.name} SET LOGGED"))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for level in range(max(levels.values(), default=-1) + 1):
+            tables = [table for table, lvl in levels.items() if lvl == level]
+            list(executor.map(_set_table_logged, tables))
+
+
+def _swap_schemas(
+    engine: sa.Engine,
+    base_schema: str,
+    temp_schema: str,
+    *,
+    lock_timeout: float,
+    attempts: int,
+) -> str:
+    """Replace base_schema with temp_schema atomically.
+
+    Both schemas are renamed in a single transaction, so readers see either the old tables or
+    the new ones, never neither.  The renames only lock the schemas, not the tables in them, so
+    queries running against the old tables carry on until they finish.  If a lock can't be
+    taken within lock_timeout, the transaction is rolled back, so it never holds up readers
+    queued behind it, and the swap is retried after a short wait.
+
+    Args:
+        engine (sa.Engine): Engine to connect with.
+        base_schema (str): Name of the schema to replace.
+        temp_schema (str): Name of the schema to replace it with.
+        lock_timeout (float): Seconds to wait for locks in each attempt.
+        attempts (int): Number of attempts before giving up.
+
+    Returns:
+        str: The name the old base schema was renamed to.
+
+    Raises:
+        sqlalchemy.exc.OperationalError: Raised if the locks couldn't be taken in any attempt.
+    """
+    old_schema = f"{temp_schema}_old"
+    # Left behind if an earlier swap into the same name crashed before dropping it.
+    with engine.begin() as conn:
+        conn.execute(sa.schema.DropSchema(old_schema, cascade=True, if_exists=True))
+    for attempt in range(1, attempts + 1):
+        try:
+            with engine.begin() as conn:
+                conn.execute(
+                    sa.text(f"SET LOCAL lock_timeout = {int(lock_timeout * 1000)}")
+                )
+                conn.execute(
+                    sa.text(f"ALTER SCHEMA {base_schema} RENAME TO {old_schema}")
+                )
+                conn.execute(
+                    sa.text(f"ALTER SCHEMA {temp_schema} RENAME TO {base_schema}")
+                )
+            break
+        except sa.exc.OperationalError as e:
+            if not isinstance(e.orig, LockNotAvailable) or attempt == attempts:
+                raise
+            time.sleep(attempt)
+    return old_schema
+
+
+@functools.cache
+def _shared_engine(
+    url: str,
+    *,
+    pool_size: int,
+    max_overflow: int,
+    pool_pre_ping: bool,
+    statement_timeout: int,
+    insertmanyvalues_page_size: int,
+) -> sa.Engine:
+    """Get the engine for a database URL and pool settings, creating it on first use.
+
+    Engines are thread safe, so every ORM class (and every thread of a parallel load) using the
+    same database shares one connection pool instead of opening its own.
+
+    Args:
+        url (str): SQLAlchemy engine URL.
+        pool_size (int): Number of connections kept open in the pool.
+        max_overflow (int): Number of connections allowed beyond pool_size under load.
+        pool_pre_ping (bool): Whether to test connections for liveness when they are checked out.
+        statement_timeout (int): PostgreSQL statement_timeout in milliseconds.  0 disables it.
+        insertmanyvalues_page_size (int): Number of rows per multi-row INSERT when the ORM
+            inserts many rows at once.
+
+    Returns:
+        sa.Engine: The shared engine.
+    """
+    return sa.create_engine(
+        url,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_pre_ping=pool_pre_ping,
+        insertmanyvalues_page_size=insertmanyvalues_page_size,
+        connect_args={"options": f"-c statement_timeout={statement_timeout}"},
+    )
+
 
 class QualysORMMixin(ABC):
     """Mixin class for Qualys API classes that use SQLAlchemy ORM.
@@ -333,7 +637,11 @@ class QualysORMMixin(ABC):
         db_username (str): Username to use to connect to the PostgreSQL database.
         db_password (str): Password to use to connect to the PostgreSQL database.
         e_url (str): SQLAlchemy engine URL.
-        engine (sqlalchemy.engine.base.Engine): SQLAlchemy engine.
+        engine (sqlalchemy.engine.base.Engine): SQLAlchemy engine.  Its connection pool is shared
+            by all instances using the same database and pool settings, which are read from the
+            optional config keys PG_POOL_SIZE (default 5), PG_MAX_OVERFLOW (default 10),
+            PG_POOL_PRE_PING (default True), PG_STATEMENT_TIMEOUT (milliseconds, default 0 for
+            no timeout) and PG_INSERTMANYVALUES_PAGE_SIZE (default 1000).
         echo (bool): Whether or not to echo SQL statements to stdout. Defaults to False.  If changed
             after the engine is created, the engine will automatically update with the new value.
     """
@@ -362,7 +670,18 @@ class QualysORMMixin(ABC):
         self.e_url += (
             f"//{self.db_username}:{self.db_password}@{self.db_host}/{self.db_name}"
         )
-        self.engine = sa.create_engine(self.e_url, echo=echo)
+        # execution_options() gives this instance its own view of the shared engine, so echo
+        # and schema_translate_map can be changed without affecting other instances.
+        self.engine = _shared_engine(
+            self.e_url,
+            pool_size=config("PG_POOL_SIZE", default=5, cast=int),
+            max_overflow=config("PG_MAX_OVERFLOW", default=10, cast=int),
+            pool_pre_ping=config("PG_POOL_PRE_PING", default=True, cast=bool),
+            statement_timeout=config("PG_STATEMENT_TIMEOUT", default=0, cast=int),
+            insertmanyvalues_page_size=config(
+                "PG_INSERTMANYVALUES_PAGE_SIZE", default=1000, cast=int
+            ),
+        ).execution_options()
 
         self.echo = echo
 
@@ -387,10 +706,45 @@ class QualysORMMixin(ABC):
         """Load data into the database."""
         ...
 
-    def load_safe(self, **kwargs: Any) -> None:
+    def load_safe(
+        self,
+        *,
+        fast_build: bool = False,
+        unlogged: bool = False,
+        workers: int = 4,
+        lock_timeout: float = 5.0,
+        swap_attempts: int = 5,
+        **kwargs: Any,
+    ) -> None:
         """Safely load data by creating a temporary schema if the base schema exists,
         loading data there, and rolling back in case of error. If loading succeeds,
         replace the old schema with the new one.
+
+        The old schema is replaced atomically, so queries running during the load keep working
+        and see the new data as soon as the swap commits.
+
+        Args:
+            fast_build (bool, optional): Create the tables without secondary indexes or foreign
+                key constraints, and add them only once the load has finished.  Building an
+                index once is much faster than maintaining it row by row, but the loaded rows
+                are not checked against the foreign keys until the end.  Defaults to False.
+            unlogged (bool, optional): Create the tables in the temporary schema as UNLOGGED, so
+                the load doesn't write to the WAL, and switch them to LOGGED before replacing the
+                old schema.  Has no effect when the base schema doesn't exist yet.  Defaults to
+                False.
+            workers (int, optional): Number of connections to use for building indexes and
+                switching tables to LOGGED.  Defaults to 4.
+            lock_timeout (float, optional): Seconds to wait for the locks needed to swap the
+                schemas before backing off and retrying.  Defaults to 5.0.
+            swap_attempts (int, optional): Number of times to try swapping the schemas.  If
+                all attempts time out, the temporary schema is dropped and the error is raised.
+                Defaults to 5.
+            **kwargs (Any): Keyword arguments to pass to load.
+
+        Raises:
+            Exception: Any error raised while loading or swapping the schemas.  The schema
+                being loaded is dropped first: the temporary schema if the base schema already
+                existed, so the base schema is left as it was, and the base schema otherwise.
         """
         base_schema = self.orm_base.metadata.schema
         if not base_schema:
@@ -412,11 +766,25 @@ class QualysORMMixin(ABC):
 
         # If the base schema doesn't exist, just use normal init + load
         if not schema_exists:
-            self.init_db()
             try:
+                if fast_build:
+                    with self.engine.begin() as conn:
+                        conn.execute(sa.schema.CreateSchema(base_schema))
+                        _create_bare_tables(conn, self.orm_base.metadata)
+                else:
+                    self.init_db()
                 self.load(**kwargs)
-            except Exception as e:
-                print(e, file=sys.stderr)
+                if fast_build:
+                    _create_indexes_and_constraints(
+                        self.engine, self.orm_base.metadata, workers
+                    )
+            except Exception:
+                # Drop the partly loaded base schema, so the next call starts from scratch
+                with self.engine.begin() as conn:
+                    conn.execute(
+                        sa.schema.DropSchema(base_schema, cascade=True, if_exists=True)
+                    )
+                raise
             return
 
         # If the base schema does exist, create a temp schema with a timestamp
@@ -434,36 +802,63 @@ class QualysORMMixin(ABC):
 
         try:
             # Create the tables in the temp schema
-            self.orm_base.metadata.create_all(self.engine)
+            if fast_build:
+                with self.engine.begin() as conn:
+                    _create_bare_tables(conn, self.orm_base.metadata)
+            else:
+                self.orm_base.metadata.create_all(self.engine)
+            if unlogged:
+                with self.engine.begin() as conn:
+                    _set_unlogged(conn, self.orm_base.metadata, temp_schema)
 
             # Attempt the data load in the temp schema
             self.load(**kwargs)
 
-        except Exception as e:
+            if unlogged:
+                _set_logged(
+                    self.engine,
+                    self.orm_base.metadata,
+                    temp_schema,
+                    workers,
+                    foreign_keys=not fast_build,
+                )
+            if fast_build:
+                _create_indexes_and_constraints(
+                    self.engine, self.orm_base.metadata, workers
+                )
+
+        except Exception:
             # Drop the temp schema if any error occurs
-            with self.engine.connect() as conn:
-                conn.execute(sa.schema.DropSchema(temp_schema, cascade=True))
-                conn.commit()
             self.engine = self.engine.execution_options(
                 schema_translate_map={base_schema: base_schema}
             )
-            print(e, file=sys.stderr)
-            return
-
-        # If load is successful, drop the old schema and rename the temp to the old name
-        with self.engine.connect() as conn:
-            conn.execute(sa.schema.DropSchema(base_schema, cascade=True))
-            # Rename the temp schema to the original base schema
-            conn.execute(
-                sa.text(f"ALTER SCHEMA {temp_schema} RENAME TO {base_schema}"),
-            )
-            conn.commit()
+            with self.engine.begin() as conn:
+                conn.execute(sa.schema.DropSchema(temp_schema, cascade=True))
+            raise
 
         # Revert the engine to use the original base schema
         self.engine = self.engine.execution_options(
             schema_translate_map={base_schema: base_schema}
         )
 
+        # If load is successful, swap the temp schema in for the old one
+        try:
+            old_schema = _swap_schemas(
+                self.engine,
+                base_schema,
+                temp_schema,
+                lock_timeout=lock_timeout,
+                attempts=swap_attempts,
+            )
+        except Exception:
+            with self.engine.begin() as conn:
+                conn.execute(sa.schema.DropSchema(temp_schema, cascade=True))
+            raise
+
+        # Waits for any queries still reading the old tables, without blocking the new ones.
+        with self.engine.begin() as conn:
+            conn.execute(sa.schema.DropSchema(old_schema, cascade=True))
+
     def drop(self) -> None:
         """Drop the database."""
         with self.engine.connect() as conn:
@@ -476,22 +871,75 @@ class QualysORMMixin(ABC):
             )
             conn.commit()
 
-    def query(self, stmt: Any, *, echo: bool = False) -> Any:
+    def query(self, stmt: Any, *, echo: bool = False, output_class: Any = None) -> Any:
         """Execute a query against the database.
 
         Args:
             stmt (Any): SQLAlchemy statement to execute.
             echo (bool, optional): Whether or not to echo SQL statements to stdout.  Defaults to
                 False.
+            output_class (Any, optional): Output model to convert the selected entity to, e.g.
+                host_list_vm_detection_output.Host for a select of host_list_vm_detection_orm.Host.
+                The entity's children are eager loaded, so the conversion takes a fixed number
+                of queries.  Defaults to None, which returns the rows as is.
 
         Returns:
             list[_C]: List of objects returned by the query.
         """
 
+        if output_class is not None:
+            stmt = _with_eager_loads(stmt)
         with orm.Session(self.engine) as session:
             results = session.execute(stmt)
+            if output_class is not None:
+                return qutils.from_orm_objects(results.scalars().all(), output_class)
             return results.all()
 
+    def stream_query(
+        self,
+        stmt: Any,
+        *,
+        batch_size: int = 1000,
+        partitions: bool = False,
+        output_class: Any = None,
+    ) -> Iterator[Any]:
+        """Execute a query against the database, yielding results as they are fetched.
+
+        Unlike query, the results are read through a server-side cursor in batches of batch_size
+        rows, so only one batch is held in memory at a time.  The session stays open until the
+        iterator is exhausted or closed.
+
+        Args:
+            stmt (Any): SQLAlchemy statement to execute.
+            batch_size (int, optional): Number of rows to fetch from the server at a time.
+                Defaults to 1000.
+            partitions (bool, optional): If True, yield lists of up to batch_size results instead
+                of single results.  Defaults to False.
+            output_class (Any, optional): Output model to convert the first entity of each row to,
+                e.g. host_list_vm_detection_output.Host for a select of
+                host_list_vm_detection_orm.Host.  The entity's children are eager loaded with
+                each batch.  Defaults to None, which yields plain tuples.
+
+        Yields:
+            Any: A tuple (or output model) per row, or a list of them if partitions is True.
+        """
+
+        def _convert(row: Any) -> Any:
+            if output_class is not None:
+                return qutils.from_orm_object(row[0], output_class)
+            return tuple(row)
+
+        if output_class is not None:
+            stmt = _with_eager_loads(stmt)
+        with orm.Session(self.engine) as session:
+            results = session.execute(stmt, execution_options={"yield_per": batch_size})
+            for partition in results.partitions():
+                converted = [_convert(row) for row in partition]
+                if partitions:
+                    yield converted
+                else:
+                    yield from converted
+
     def __setattr__(self, __name: str, __value: Any) -> None:
         """Set an attribute of the QualysORMMixin class.  If the attribute is "echo", the engine
         attribute is updated with the new value.
@@ -502,4 +950,4 @@ class QualysORMMixin(ABC):
         """
         super().__setattr__(__name, __value)
         if __name == "echo":
-            self.engine = sa.create_engine(self.e_url, echo=__value)
+            self.engine.echo = __value
@@ -1,9 +1,16 @@
+import collections
+import csv
 import dataclasses
-from typing import Any
+import io
+import json
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Iterator
 
-from . import URLS
-from .base import QualysAPIBase
-from .models.certview import instances_output
+import sqlalchemy as sa
+
+from . import URLS, qutils
+from .base import BatchResult, QualysAPIBase, QualysORMMixin
+from .models.certview import instances_orm, instances_output
 
 
 @dataclasses.dataclass
@@ -59,7 +66,7 @@ class CertViewAPI(QualysAPIBase):
 
         Args:
             filter (Filter | None): Optional filter to apply to the list of instances.
-            page_number (int | None): Optional page number for pagination.
+            page_number (int | None): Optional page number for pagination, starting from 0.
             page_size (int | None): Optional page size for pagination.
 
         Returns:
@@ -76,7 +83,7 @@ class CertViewAPI(QualysAPIBase):
 
         response = self.post(
             URLS.list_instances,
-            json=data,
+            content=json.dumps(data),
             content_type="application/json",
             accept="application/json",
         )
@@ -87,20 +94,114 @@ class CertViewAPI(QualysAPIBase):
         ]
         return instances
 
-    def add_bulk_external_sites(self, *, sites: list[str]) -> None:
+    def iter_instance_pages(
+        self,
+        *,
+        filter_request: FilterRequest | None = None,
+        page_size: int = 100,
+        workers: int | None = None,
+    ) -> Iterator[list[instances_output.Instance]]:
+        """Iterate over the pages of instances in CertView, fetching several pages at once.
+
+        The total number of pages isn't known in advance, so the next page numbers are
+        requested as earlier pages complete, until a page comes back short.
+
+        Args:
+            filter_request (FilterRequest | None): Optional filter to apply to the instances.
+            page_size (int): Number of instances per page.  Defaults to 100.
+            workers (int | None): Number of pages to fetch at once.  Defaults to None, which
+                uses the concurrency limit reported by the Qualys API, or 4 if unknown.
+
+        Yields:
+            list[instances_output.Instance]: The instances of each page, in page order.
+        """
+
+        def _fetch(page_number: int) -> list[instances_output.Instance]:
+            return self.list_instances(
+                filter_request=filter_request,
+                page_number=page_number,
+                page_size=page_size,
+            )
+
+        workers = workers or self.concurrency_limit_limit or 4
+        executor = ThreadPoolExecutor(max_workers=workers)
+        pending: collections.deque[Future[list[instances_output.Instance]]] = (
+            collections.deque()
+        )
+        try:
+            next_page = 0
+            for next_page in range(workers):
+                pending.append(executor.submit(_fetch, next_page))
+            while pending:
+                page = pending.popleft().result()
+                if page:
+                    yield page
+                if len(page) < page_size:
+                    break
+                next_page += 1
+                pending.append(executor.submit(_fetch, next_page))
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    def existing_sites(self) -> set[str]:
+        """Get the names and primary IPs of the assets that already have instances in CertView.
+
+        Returns:
+            set[str]: The asset names, in lowercase, and primary IPs.
+        """
+        sites: set[str] = set()
+        for page in self.iter_instance_pages():
+            for instance in page:
+                sites.add(instance.asset.name.lower())
+                sites.add(str(instance.asset.primary_ip))
+        return sites
+
+    def add_bulk_external_sites(
+        self,
+        *,
+        sites: list[str],
+        skip_existing: bool = False,
+        existing: set[str] | None = None,
+        chunk_size: int = 1000,
+        workers: int | None = None,
+    ) -> list[BatchResult]:
         """Add a list of external sites to CertView.
 
+        The sites are uploaded as CSV files of chunk_size sites, several at once.  A failed chunk
+        doesn't stop the others, and can be retried alone by passing its items as sites.
+
         Args:
-            sites (list[str]): A list of external sites to add to CertView.
+            sites (list[str]): A list of external sites to add to CertView.  Duplicates are
+                ignored.
+            skip_existing (bool, optional): Whether to leave out the sites whose asset already
+                has instances in CertView.  Defaults to False.
+            existing (set[str] | None, optional): The sites to leave out when skip_existing is
+                set, as returned by existing_sites.  Pass the same set when adding sites in
+                several calls, so the instances are only listed once.  Defaults to None, which
+                calls existing_sites.
+            chunk_size (int, optional): Number of sites per CSV file.  CertView accepts up to
+                1000.  Defaults to 1000.
+            workers (int, optional): Number of uploads at once.  Defaults to None, which uses
+                the concurrency limit reported by the Qualys API.
+
+        Returns:
+            list[BatchResult]: For each chunk, its sites and either the parsed response or the
+                error.
         """
+        unique = dict.fromkeys(site.strip() for site in sites if site.strip())
+        if skip_existing and unique:
+            if existing is None:
+                existing = self.existing_sites()
+            unique = {site: None for site in unique if site.lower() not in existing}
 
-        # A single CSV file can contain up to 1000 records, so add in batches of 1000
-        for i in range(0, len(sites), 1000):
-            sites_batch = sites[i : i + 1000]
-            csv_string = "Sites\n" + "\n".join(sites_batch) + "\n"
-            files = {"file": ("sites.csv", csv_string, "text/csv")}
+        def _upload(chunk: list[str]) -> Any:
+            csv_file = io.StringIO()
+            writer = csv.writer(csv_file, lineterminator="\n")
+            writer.writerow(["Sites"])
+            writer.writerows([site] for site in chunk)
+            files = {"file": ("sites.csv", csv_file.getvalue(), "text/csv")}
 
-            self.post(
+            response = self.post(
                 URLS.add_bulk_external_sites,
                 params={"action": "SAVE_AND_LAUNCH"},
                 files=files,
@@ -108,3 +209,128 @@ class CertViewAPI(QualysAPIBase):
                 content_type=None,
                 accept="application/json",
             )
+            return response.json() if response.content else None
+
+        chunks = list(qutils.chunked(unique, chunk_size))
+        return self.run_batches(_upload, chunks, workers=workers)
+
+
+class CertViewORM(CertViewAPI, QualysORMMixin):
+    """Qualys CertView ORM Class.  Contains methods for loading certificate instances into an
+    ORM database.
+    """
+
+    def __init__(self, echo: bool = False) -> None:
+        """Initialize the CertView ORM Class.
+
+        Args:
+            echo (bool, optional): Whether to echo SQL statements. Defaults to False.
+        """
+        CertViewAPI.__init__(self)
+        self.orm_base = instances_orm.Base  # type: ignore
+        QualysORMMixin.__init__(self, self, echo=echo)
+
+    def load(self, **kwargs: Any) -> None:
+        """Load all certificate instances into the ORM database.
+
+        Pages are fetched concurrently and each is upserted as it arrives, so loading again
+        updates the existing rows instead of failing on them.
+
+        Args:
+            **kwargs (Any): Keyword arguments to pass to iter_instance_pages.
+        """
+        for page in self.iter_instance_pages(**kwargs):
+            with self.engine.begin() as conn:
+                self._upsert_instances(conn, page)
+
+    @staticmethod
+    def _upsert_instances(
+        conn: sa.Connection, instances: list[instances_output.Instance]
+    ) -> None:
+        """Upsert one page of instances, with their assets, certificates and cipher suites.
+
+        Args:
+            conn (sa.Connection): Connection to upsert with.
+            instances (list[instances_output.Instance]): The instances to upsert.
+        """
+        # Keyed by primary key, since a row can only be upserted once per statement.
+        assets: dict[int, dict[str, Any]] = {}
+        certificates: dict[int, dict[str, Any]] = {}
+        cipher_suites: dict[str, dict[str, Any]] = {}
+        instance_rows: dict[int, dict[str, Any]] = {}
+        grade_summaries: dict[int, dict[str, Any]] = {}
+        instance_cipher_suites: dict[tuple[int, str, str], dict[str, Any]] = {}
+
+        for instance in instances:
+            assets[instance.asset.id] = instance.asset.model_dump()
+            certificates[instance.certificate.id] = instance.certificate.model_dump()
+            instance_rows[instance.id] = instance.model_dump(
+                exclude={"asset", "certificate", "grade_summary"}
+            ) | {
+                "asset_id": instance.asset.id,
+                "certificate_id": instance.certificate.id,
+            }
+
+            summary = instance.grade_summary
+            grade_summaries[instance.id] = summary.model_dump(
+                exclude={
+                    "protocol_support_info",
+                    "cipher_strength_info",
+                    "key_exchange_info",
+                    "cipher_suites",
+                }
+            ) | {
+                "instance_id": instance.id,
+                "protocol_support_info": summary.protocol_support_info.model_dump(
+                    by_alias=True
+                ),
+                "cipher_strength_info": summary.cipher_strength_info.model_dump(
+                    by_alias=True
+                ),
+                "key_exchange_info": summary.key_exchange_info.model_dump(
+                    by_alias=True
+                ),
+            }
+
+            for field, info in type(summary.cipher_suites).model_fields.items():
+                for suite in getattr(summary.cipher_suites, field) or []:
+                    cipher_suites[suite.name] = suite.model_dump()
+                    key = (instance.id, str(info.alias), suite.name)
+                    instance_cipher_suites[key] = {
+                        "instance_id": instance.id,
+                        "protocol": info.alias,
+                        "cipher_suite_name": suite.name,
+                    }
+
+        qutils.upsert(conn, instances_orm.Asset.__table__, list(assets.values()))  # type: ignore
+        qutils.upsert(
+            conn,
+            instances_orm.Certificate.__table__,  # type: ignore
+            list(certificates.values()),
+        )
+        qutils.upsert(
+            conn,
+            instances_orm.CipherSuite.__table__,  # type: ignore
+            list(cipher_suites.values()),
+        )
+        qutils.upsert(
+            conn,
+            instances_orm.Instance.__table__,  # type: ignore
+            list(instance_rows.values()),
+        )
+        qutils.upsert(
+            conn,
+            instances_orm.GradeSummary.__table__,  # type: ignore
+            list(grade_summaries.values()),
+        )
+        # The cipher suites of an instance are replaced, so dropped ones don't linger.
+        conn.execute(
+            sa.delete(instances_orm.InstanceCipherSuite).where(
+                instances_orm.InstanceCipherSuite.instance_id.in_(list(instance_rows))
+            )
+        )
+        qutils.upsert(
+            conn,
+            instances_orm.InstanceCipherSuite.__table__,  # type: ignore
+            list(instance_cipher_suites.values()),
+        )
@@ -3,7 +3,7 @@ from typing import Any
 import sqlalchemy.orm as orm
 
 from . import URLS, qutils
-from .base import QualysAPIBase, QualysORMMixin
+from .base import BatchResult, QualysAPIBase, QualysORMMixin
 from .exceptions import QualysAPIError
 from .models.gav import asset_details_orm, asset_details_output
 
@@ -11,45 +11,6 @@ from .models.gav import asset_details_orm, asset_details_output
 class GavAPI(QualysAPIBase):
     """Qualys VMDR API Class.  Contains methods for interacting with the VMDR API."""
 
-    def _convert_ipaddress(self, ips: str | None) -> list[str] | None:
-        """Converts a string of IPs into a list of IP strings, for easier validation in
-        Pydantic.
-        """
-        if ips is None:
-            return None
-        elif "," in ips:
-            return ips.split(", ")
-        return [ips]
-
-    def _clean_asset_details_response(
-        self, response_json: dict[str, Any]
-    ) -> dict[str, Any]:
-        """
-        Cleans the asset details response by converting IP address strings to lists of IP address strings,
-        converts None values for lists to empty lists, etc.
-        """
-        for asset in response_json["assetListData"]["asset"]:
-            if asset["networkInterfaceListData"] is not None:
-                for interface in asset["networkInterfaceListData"]["networkInterface"]:
-                    interface["addressIpV4"] = self._convert_ipaddress(
-                        interface["addressIpV4"]
-                    )
-                    interface["addressIpV6"] = self._convert_ipaddress(
-                        interface["addressIpV6"]
-                    )
-
-            if (
-                asset["cloudProvider"] is not None
-                and asset["cloudProvider"]["oci"] is not None
-            ):
-                if asset["cloudProvider"]["oci"]["tags"] is None:
-                    asset["cloudProvider"]["oci"]["tags"] = []
-
-            if asset["whois"] is None:
-                asset["whois"] = []
-
-        return response_json
-
     def asset_details(self, *, asset_id: int) -> asset_details_output.AssetItem | None:
         params = {"assetId": asset_id}
         params_cleaned = qutils.clean_dict(params)
@@ -57,11 +18,41 @@ class GavAPI(QualysAPIBase):
         raw_response = self.get(URLS.asset_details, params=params_cleaned)
         if raw_response.status_code == 204:
             return None
-        response_json = raw_response.json()
-        response_json = self._clean_asset_details_response(response_json)
-        response = asset_details_output.AssetDetailsOutput(**response_json)
+        response = asset_details_output.AssetDetailsOutput.model_validate_json(
+            raw_response.content, by_alias=True, by_name=False
+        )
         return response.asset_list_data.asset[0]
 
+    def asset_details_many(
+        self, *, asset_ids: list[int], workers: int | None = None
+    ) -> list[BatchResult]:
+        """Get the details of many assets, fetching several at once.
+
+        Each asset is fetched with its own asset_details call, so one failing asset doesn't
+        affect the others.
+
+        Args:
+            asset_ids (list[int]): IDs of the assets.  Each distinct ID is only fetched once.
+            workers (int, optional): Number of assets to fetch at once.  Defaults to None,
+                which uses the concurrency limit reported by the Qualys API.
+
+        Returns:
+            list[BatchResult]: One result per ID in asset_ids, in the same order.  Its result
+                is the asset_details_output.AssetItem, or None if the asset doesn't exist, and
+                its error is the exception raised while fetching it, if any.
+        """
+        if self.jwt is None:
+            # Authenticate once up front rather than in every worker.
+            self._get_jwt()
+        unique = [[asset_id] for asset_id in dict.fromkeys(asset_ids)]
+        results = self.run_batches(
+            lambda batch: self.asset_details(asset_id=batch[0]),
+            unique,
+            workers=workers,
+        )
+        by_id = {result.items[0]: result for result in results}
+        return [by_id[asset_id] for asset_id in asset_ids]
+
     def all_asset_details(
         self,
         *,
@@ -73,10 +64,12 @@ class GavAPI(QualysAPIBase):
             "pageSize": page_size,
         }
         params_cleaned = qutils.clean_dict(params)
-        raw_response = self.post(URLS.all_asset_details, params=params_cleaned).json()
-        raw_response = self._clean_asset_details_response(raw_response)
-
-        response = asset_details_output.AssetDetailsOutput(**raw_response)
+        raw_response = self.post(URLS.all_asset_details, params=params_cleaned)
+        # The API only uses the camelCase aliases.  Also matching field names would make
+        # pydantic-core validate every nested model twice per level of nesting.
+        response = asset_details_output.AssetDetailsOutput.model_validate_json(
+            raw_response.content, by_alias=True, by_name=False
+        )
 
         if response.response_code != "SUCCESS":
             raise QualysAPIError(
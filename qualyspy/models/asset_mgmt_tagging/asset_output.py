@@ -39,6 +39,8 @@ class ServiceResponse(Model):
     data: list[Datum] | None = None
     response_code: str = Field(alias="responseCode")
     count: int | None = None
+    has_more_records: bool | None = None
+    last_id: int | None = None
 
 
 class Wrapper(Model):
@@ -25,6 +25,10 @@ class Tag(Model):
     modified: str | None = None
     name: str | None = None
     color: str | None = None
+    parent_tag_id: int | None = None
+    rule_type: str | None = None
+    rule_text: str | None = None
+    criticality_score: int | None = None
     children: Children | None = None
 
 
@@ -34,8 +38,10 @@ class Datum(Model):
 
 class ServiceResponse(Model):
     response_code: str
-    data: list[Datum]
+    data: list[Datum] = []
     count: int
+    has_more_records: bool | None = None
+    last_id: int | None = None
 
 
 class Wrapper(Model):
@@ -60,9 +60,16 @@ class Filters(BaseXmlModel):
     criteria: list[Criteria] = element(tag="Criteria")
 
 
+class Preferences(BaseXmlModel):
+    start_from_offset: int | None = element(tag="startFromOffset", default=None)
+    start_from_id: int | None = element(tag="startFromId", default=None)
+    limit_results: int | None = element(tag="limitResults", default=None)
+
+
 class ServiceRequest(BaseXmlModel, tag="ServiceRequest"):
     data: Data | None = element(tag="data", default=None)
     filters: Filters | None = element(tag="filters", default=None)
+    preferences: Preferences | None = element(tag="preferences", default=None)
 
 
 def create_add_tag_request(
@@ -135,6 +142,9 @@ def create_search_tags_request(
     rule_type: tag_rule_types | None,
     provider: tag_provider_types | None,
     color: str | None,
+    start_from_offset: int | None = None,
+    start_from_id: int | None = None,
+    limit_results: int | None = None,
 ) -> ServiceRequest:
     criteria_list = []
     for field, value in {
@@ -147,4 +157,11 @@ def create_search_tags_request(
     }.items():
         if value:
             criteria_list.append(Criteria(field=field, operator="EQUALS", value=str(value)))
-    return ServiceRequest(filters=Filters(criteria=criteria_list))
+    return ServiceRequest(
+        filters=Filters(criteria=criteria_list),
+        preferences=Preferences(
+            start_from_offset=start_from_offset,
+            start_from_id=start_from_id,
+            limit_results=limit_results,
+        ),
+    )
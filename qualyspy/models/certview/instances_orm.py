@@ -1,13 +1,16 @@
 import datetime
+import ipaddress
+from typing import Any
 
 import sqlalchemy as sa
+import sqlalchemy.dialects.postgresql as sa_pg
 import sqlalchemy.orm as orm
 
-from .. import sa_types
+from .. import sa_indexes, sa_types
 
 
 class Base(orm.DeclarativeBase):
-    metadata = sa.MetaData(schema="asset_details")
+    metadata = sa.MetaData(schema="qualys_certview")
 
 
 class CipherSuite(Base):
@@ -19,26 +22,22 @@ class CipherSuite(Base):
     category: orm.Mapped[str]
 
 
-class CipherSuites(Base):
-    __tablename__ = "cipher_suites"
+class InstanceCipherSuite(Base):
+    """A cipher suite supported by an instance for one protocol (e.g. "TLSv1.2")."""
 
-    id: orm.Mapped[int] = orm.mapped_column(primary_key=True)
-    sslv3: orm.Mapped[list["CipherSuite"]] = orm.relationship(
-        back_populates="sslv3", uselist=True
-    )
-    tlsv1: orm.Mapped[list["CipherSuite"]] = orm.relationship(
-        back_populates="tlsv1", uselist=True
-    )
-    tlsv1_1: orm.Mapped[list["CipherSuite"]] = orm.relationship(
-        back_populates="tlsv1_1", uselist=True
-    )
-    tlsv1_2: orm.Mapped[list["CipherSuite"]] = orm.relationship(
-        back_populates="tlsv1_2", uselist=True
+    __tablename__ = "instance_cipher_suite"
+
+    instance_id: orm.Mapped[int] = orm.mapped_column(
+        sa.ForeignKey("instance.id", ondelete="CASCADE"), primary_key=True
     )
-    tlsv1_3: orm.Mapped[list["CipherSuite"]] = orm.relationship(
-        back_populates="tlsv1_3", uselist=True
+    protocol: orm.Mapped[str] = orm.mapped_column(primary_key=True)
+    cipher_suite_name: orm.Mapped[str] = orm.mapped_column(
+        sa.ForeignKey("cipher_suite.name"), primary_key=True
     )
 
+    instance: orm.Mapped["Instance"] = orm.relationship(back_populates="cipher_suites")
+    cipher_suite: orm.Mapped[CipherSuite] = orm.relationship()
+
 
 class Asset(Base):
     __tablename__ = "asset"
@@ -46,7 +45,9 @@ class Asset(Base):
     id: orm.Mapped[int] = orm.mapped_column(primary_key=True)
     uuid: orm.Mapped[str]
     name: orm.Mapped[str]
-    primary_ip: orm.Mapped[sa_types.IPAddressGenericType]
+    primary_ip: orm.Mapped[ipaddress.IPv4Address | ipaddress.IPv6Address] = (
+        orm.mapped_column(sa_types.IPAddressGenericType)
+    )
 
     instances: orm.Mapped[list["Instance"]] = orm.relationship(
         back_populates="asset", uselist=True
@@ -69,25 +70,29 @@ class Certificate(Base):
 class GradeSummary(Base):
     __tablename__ = "grade_summary"
 
-    id: orm.Mapped[int] = orm.mapped_column(primary_key=True, autoincrement=True)
+    instance_id: orm.Mapped[int] = orm.mapped_column(
+        sa.ForeignKey("instance.id", ondelete="CASCADE"), primary_key=True
+    )
     grade: orm.Mapped[str]
     grade_with_trust_ignored: orm.Mapped[str]
     certificate_score: orm.Mapped[int]
     protocol_support_score: orm.Mapped[int]
     key_exchange_score: orm.Mapped[int]
     cipher_strength_score: orm.Mapped[int]
-    warnings: orm.Mapped[list[str]]
-    errors: orm.Mapped[list[str]]
-    notices: orm.Mapped[list[str]]
-    infos: orm.Mapped[list[str]]
-    highlights: orm.Mapped[list[str]]
-    protocol_support_info: orm.Mapped[ProtocolSupportInfo]
+    warnings: orm.Mapped[list[str]] = orm.mapped_column(sa_pg.ARRAY(sa.String))
+    errors: orm.Mapped[list[str]] = orm.mapped_column(sa_pg.ARRAY(sa.String))
+    notices: orm.Mapped[list[str]] = orm.mapped_column(sa_pg.ARRAY(sa.String))
+    infos: orm.Mapped[list[str]] = orm.mapped_column(sa_pg.ARRAY(sa.String))
+    highlights: orm.Mapped[list[str]] = orm.mapped_column(sa_pg.ARRAY(sa.String))
+    # The info objects are fixed sets of flags, stored as they are returned by the API.
+    protocol_support_info: orm.Mapped[dict[str, Any]] = orm.mapped_column(sa_pg.JSONB)
     protocol_support_weightage: orm.Mapped[int]
-    cipher_strength_info: orm.Mapped[CipherStrengthInfo]
+    cipher_strength_info: orm.Mapped[dict[str, Any]] = orm.mapped_column(sa_pg.JSONB)
     cipher_strength_weightage: orm.Mapped[int]
-    key_exchange_info: orm.Mapped[KeyExchangeInfo]
+    key_exchange_info: orm.Mapped[dict[str, Any]] = orm.mapped_column(sa_pg.JSONB)
     key_exchange_weightage: orm.Mapped[int]
-    cipher_suites: orm.Mapped[CipherSuites]
+
+    instance: orm.Mapped["Instance"] = orm.relationship(back_populates="grade_summary")
 
 
 class Instance(Base):
@@ -107,6 +112,12 @@ class Instance(Base):
     certificate: orm.Mapped[Certificate] = orm.relationship(
         back_populates="instances", uselist=False
     )
-    grade_summary: orm.Mapped[GradeSummary] = orm.relationship(
+    grade_summary: orm.Mapped[GradeSummary | None] = orm.relationship(
         back_populates="instance", uselist=False
     )
+    cipher_suites: orm.Mapped[list[InstanceCipherSuite]] = orm.relationship(
+        back_populates="instance", uselist=True
+    )
+
+
+sa_indexes.add_foreign_key_indexes(Base.metadata)
@@ -0,0 +1,173 @@
+"""Fast decoding of pydantic-xml models from lxml trees.
+
+pydantic-xml looks up every field of a model in the element separately, which is slow for models
+with many optional child elements (e.g. host_list_vm_detection_output.Detection).  The decoders
+in this module are generated from the same model definitions, but walk the children of each
+element only once, collecting the raw text and attributes into plain dicts.  The result is then
+validated by pydantic in a single model_validate call.
+
+When the children of each element appear in the order their fields are declared, as in Qualys
+responses, the output is the same as from_xml_tree.  Unlike pydantic-xml's default strict search
+mode, which skips children that appear after a later field's element, children are matched here
+regardless of their order, so out-of-order elements are kept rather than dropped.
+
+Typical usage example:
+root = qutils.xml_root_from_bytes(content, "HOST_LIST_VM_DETECTION_OUTPUT", huge_tree=True)
+output = fast_xml.decode(host_list_vm_detection_output.HostListVMDetectionOutput, root)
+"""
+
+import dataclasses
+import functools
+import types
+import typing
+from typing import Any, TypeVar
+
+from lxml import etree
+from pydantic_xml import BaseXmlModel
+from pydantic_xml.fields import XmlEntityInfo
+from pydantic_xml.model import EntityLocation
+
+_M = TypeVar("_M", bound=BaseXmlModel)
+
+
+@dataclasses.dataclass
+class _Field:
+    """How to collect a single field of a model."""
+
+    key: str
+    location: EntityLocation
+    tag: str
+    item_tag: str | None
+    is_list: bool
+    model: type[BaseXmlModel] | None
+
+
+def _unwrap_annotation(annotation: Any) -> tuple[bool, Any]:
+    """Strip Optional from an annotation and report whether it is a list.
+
+    Returns:
+        tuple[bool, Any]: Whether the annotation is a list, and the type of the value (or of the
+            list items).
+    """
+    origin = typing.get_origin(annotation)
+    if origin in (typing.Union, types.UnionType):
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return _unwrap_annotation(args[0])
+        return False, annotation
+    if origin is list:
+        (item,) = typing.get_args(annotation)
+        return True, _unwrap_annotation(item)[1]
+    return False, annotation
+
+
+class _ModelDecoder:
+    """Decoder for a single pydantic-xml model class, generated from its field definitions."""
+
+    def __init__(self, model: type[BaseXmlModel]) -> None:
+        self.attributes: dict[str, str] = {}
+        self.text_key: str | None = None
+        self.children: dict[str, _Field] = {}
+
+        for name, field_info in model.model_fields.items():
+            key = field_info.alias or name
+            entity = next(
+                (m for m in field_info.metadata if isinstance(m, XmlEntityInfo)), None
+            )
+            is_list, annotation = _unwrap_annotation(field_info.annotation)
+            sub_model = (
+                annotation
+                if isinstance(annotation, type) and issubclass(annotation, BaseXmlModel)
+                else None
+            )
+
+            if entity is None:
+                if sub_model is None:
+                    self.text_key = key
+                    continue
+                # Untagged sub-models are looked up by the sub-model's own tag.
+                location, tag = EntityLocation.ELEMENT, sub_model.__xml_tag__
+            else:
+                location, tag = entity.location, entity.path
+            if tag is None:
+                raise ValueError(f"Field {model.__name__}.{name} has no tag.")
+
+            if location == EntityLocation.ATTRIBUTE:
+                self.attributes[tag] = key
+                continue
+            item_tag = None
+            if location == EntityLocation.WRAPPED:
+                if entity is None or entity.wrapped is None:
+                    raise ValueError(
+                        f"Unsupported wrapped field {model.__name__}.{name}"
+                    )
+                item_tag = entity.wrapped.path
+            self.children[tag] = _Field(
+                key, location, tag, item_tag, is_list, sub_model
+            )
+
+    def values(self, element: Any) -> dict[str, Any]:
+        """Collect the raw values of the fields present in the element.
+
+        Args:
+            element (Any): The element to decode.
+
+        Returns:
+            dict[str, Any]: Raw field values (dicts, for sub-models), keyed by alias or field
+                name.
+        """
+        values: dict[str, Any] = {}
+        attrib = element.attrib
+        for tag, key in self.attributes.items():
+            if tag in attrib:
+                values[key] = attrib[tag]
+        if self.text_key is not None:
+            values[self.text_key] = element.text
+
+        children = self.children
+        for child in element:
+            field = children.get(child.tag)
+            if field is None:
+                continue
+            if field.location == EntityLocation.WRAPPED:
+                items = values.setdefault(field.key, [])
+                for item in child:
+                    if item.tag == field.item_tag:
+                        items.append(self._value(field, item))
+            elif field.is_list:
+                values.setdefault(field.key, []).append(self._value(field, child))
+            else:
+                values[field.key] = self._value(field, child)
+        return values
+
+    @staticmethod
+    def _value(field: _Field, element: Any) -> Any:
+        if field.model is not None:
+            return _decoder_for(field.model).values(element)
+        return element.text
+
+
+@functools.cache
+def _decoder_for(model: type[BaseXmlModel]) -> _ModelDecoder:
+    return _ModelDecoder(model)
+
+
+def decode(model: type[_M], element: etree._Element) -> _M:
+    """Decode an element into an instance of a pydantic-xml model.
+
+    Gives the same result as model.from_xml_tree(element) when the children of each element are
+    in the order the model declares them.  Children out of that order are kept, where
+    from_xml_tree drops them.  The children of each element are only walked once and the whole
+    tree is validated in one call.
+
+    Args:
+        model (type[_M]): The pydantic-xml model class to decode into.
+        element (etree._Element): The element corresponding to the model.
+
+    Returns:
+        _M: The decoded model.
+
+    Raises:
+        pydantic.ValidationError: If the element does not match the model.
+    """
+    return model.model_validate(_decoder_for(model).values(element))
@@ -5,7 +5,7 @@ import sqlalchemy as sa
 import sqlalchemy.dialects.postgresql as sa_pg
 import sqlalchemy.orm as orm
 
-from .. import sa_types
+from .. import sa_indexes, sa_types
 
 
 class Base(orm.DeclarativeBase):
@@ -703,6 +703,10 @@ class Processor(Base):
 
 class AssetItem(Base):
     __tablename__ = "asset_item"
+    __table_args__ = (
+        sa.Index("ix_asset_item_address", "address"),
+        sa.Index("ix_asset_item_host_id", "host_id"),
+    )
 
     asset_id: orm.Mapped[int] = orm.mapped_column(primary_key=True)
     assetUUID: orm.Mapped[str]
@@ -800,3 +804,6 @@ class AssetItem(Base):
     processor: orm.Mapped[Processor] = orm.relationship(
         back_populates="asset_item", uselist=False
     )
+
+
+sa_indexes.add_foreign_key_indexes(Base.metadata)
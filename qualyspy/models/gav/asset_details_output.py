@@ -19,6 +19,20 @@ def ensure_datetime(value: Any) -> datetime.datetime | None:
         return None
 
 
+def split_ip_addresses(value: Any) -> Any:
+    """Qualys returns the addresses of a network interface as one comma-separated string."""
+    if isinstance(value, str):
+        return [ip.strip() for ip in value.split(",")]
+    return value
+
+
+def none_to_list(value: Any) -> Any:
+    """Qualys returns null instead of an empty list for some lists."""
+    if value is None:
+        return []
+    return value
+
+
 class Model(BaseModel):
     model_config = ConfigDict(validate_by_name=True, alias_generator=to_camel)
 
@@ -118,8 +132,12 @@ class VolumeListData(Model):
 
 class NetworkInterfaceItem(Model):
     hostname: str | None
-    address_ip_v4: list[ipaddress.IPv4Address] | None
-    address_ip_v6: list[ipaddress.IPv6Address] | None
+    address_ip_v4: Annotated[
+        list[ipaddress.IPv4Address] | None, BeforeValidator(split_ip_addresses)
+    ]
+    address_ip_v6: Annotated[
+        list[ipaddress.IPv6Address] | None, BeforeValidator(split_ip_addresses)
+    ]
     mac_address: str
     interface_name: str
     dns_address: str | None
@@ -218,7 +236,7 @@ class CloudTag(Model):
 
 class Oci(Model):
     compute: Oci_Compute
-    tags: list[CloudTag]
+    tags: Annotated[list[CloudTag], BeforeValidator(none_to_list)]
 
 
 class CloudProvider(Model):
@@ -387,7 +405,7 @@ class AssetItem(Model):
     passive_sensor: str | None
     domain: list[str] | None
     subdomain: list[str] | None
-    whois: list[Whois] | None
+    whois: Annotated[list[Whois] | None, BeforeValidator(none_to_list)]
     isp: str | None
     asn: str | None
     easm_tags: list[str] | None
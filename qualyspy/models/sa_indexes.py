@@ -0,0 +1,38 @@
+"""Shareable SQLAlchemy index helpers"""
+
+import hashlib
+
+import sqlalchemy as sa
+
+# PostgreSQL truncates identifiers longer than this.
+_MAX_IDENTIFIER_LENGTH = 63
+
+
+def _index_name(table: sa.Table, columns: list[sa.Column]) -> str:  # type: ignore
+    name = f"ix_{table.name}_{'_'.join(col.name for col in columns)}"
+    if len(name) > _MAX_IDENTIFIER_LENGTH:
+        digest = hashlib.md5(name.encode()).hexdigest()[:8]
+        name = f"{name[:_MAX_IDENTIFIER_LENGTH - 9]}_{digest}"
+    return name
+
+
+def add_foreign_key_indexes(metadata: sa.MetaData) -> None:
+    """Add an index for every foreign key that isn't already the leading part of an index.
+
+    PostgreSQL doesn't index the referencing side of a foreign key, so without these joins from
+    parent to children (and cascading deletes) scan the whole child table.  Call this at the end
+    of an ORM module, once all tables have been declared, so the indexes are created by
+    create_all along with the tables.
+
+    Args:
+        metadata (sa.MetaData): Metadata containing the tables.
+    """
+    for table in metadata.tables.values():
+        existing = [list(index.columns) for index in table.indexes]
+        existing.append(list(table.primary_key.columns))
+        for fk in table.foreign_key_constraints:
+            columns = list(fk.columns)
+            if any(cols[: len(columns)] == columns for cols in existing):
+                continue
+            sa.Index(_index_name(table, columns), *columns)
+            existing.append(columns)
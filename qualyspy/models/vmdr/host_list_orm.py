@@ -7,7 +7,7 @@ from typing import Optional
 import sqlalchemy as sa
 import sqlalchemy.orm as orm
 
-from .. import sa_types
+from .. import sa_indexes, sa_types
 
 
 class Base(orm.DeclarativeBase):
@@ -314,6 +314,10 @@ class Metadata(Base):
 
 class Host(Base):
     __tablename__ = "host"
+    __table_args__ = (
+        sa.Index("ix_host_ip", "ip"),
+        sa.Index("ix_host_asset_id", "asset_id"),
+    )
 
     id: orm.Mapped[int] = orm.mapped_column(primary_key=True)
     asset_id: orm.Mapped[int | None]
@@ -368,3 +372,6 @@ class Host(Base):
         back_populates="host", uselist=False
     )
     asset_group_ids: orm.Mapped[str | None]
+
+
+sa_indexes.add_foreign_key_indexes(Base.metadata)
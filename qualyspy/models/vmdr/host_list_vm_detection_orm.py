@@ -6,7 +6,7 @@ import ipaddress
 import sqlalchemy as sa
 import sqlalchemy.orm as orm
 
-from .. import sa_types
+from .. import sa_indexes, sa_types
 
 
 class Base(orm.DeclarativeBase):
@@ -146,6 +146,26 @@ class QdsFactors(Base):
 
 class Detection(Base):
     __tablename__ = "detection"
+    __table_args__ = (
+        sa.Index("ix_detection_host_id_status", "host_id", "status"),
+        sa.Index("ix_detection_qid_status", "qid", "status"),
+        sa.Index("ix_detection_severity_status", "severity", "status"),
+        # BRIN indexes stay tiny and are effective for range filters because detections are
+        # loaded roughly in the order they were found.  Block ranges filled after the index is
+        # created are summarized by autovacuum.
+        sa.Index(
+            "ix_detection_first_found_datetime",
+            "first_found_datetime",
+            postgresql_using="brin",
+            postgresql_with={"autosummarize": "on"},
+        ),
+        sa.Index(
+            "ix_detection_last_found_datetime",
+            "last_found_datetime",
+            postgresql_using="brin",
+            postgresql_with={"autosummarize": "on"},
+        ),
+    )
 
     unique_vuln_id: orm.Mapped[int] = orm.mapped_column(primary_key=True)
     qid: orm.Mapped[int] = orm.mapped_column(primary_key=True)
@@ -201,6 +221,10 @@ class Metadata(Base):
 
 class Host(Base):
     __tablename__ = "host"
+    __table_args__ = (
+        sa.Index("ix_host_ip", "ip"),
+        sa.Index("ix_host_asset_id", "asset_id"),
+    )
 
     id: orm.Mapped[int] = orm.mapped_column(primary_key=True)
     asset_id: orm.Mapped[int | None]
@@ -240,3 +264,38 @@ class Host(Base):
     detections: orm.Mapped[list[Detection]] = orm.relationship(
         back_populates="host", uselist=True
     )
+    # Set by the loader from qutils.content_digest, to skip hosts that haven't changed.
+    content_digest: orm.Mapped[str | None]
+
+
+sa_indexes.add_foreign_key_indexes(Base.metadata)
+
+
+class HistoryBase(orm.DeclarativeBase):
+    # Kept in its own schema, so it survives load_safe replacing the detection schema.
+    metadata = sa.MetaData(schema="qualys_host_list_vm_detection_history")
+
+
+class DetectionHistory(HistoryBase):
+    """Append-only log of changes to the status and last_found_datetime of detections.
+
+    A row is added whenever a load finds a detection that is new, has changed, or has
+    disappeared from its host.  The table is range partitioned by month on recorded_at; the
+    partitions are created by the loader as needed.
+    """
+
+    __tablename__ = "detection_history"
+    __table_args__ = {"postgresql_partition_by": "RANGE (recorded_at)"}
+
+    host_id: orm.Mapped[int] = orm.mapped_column(primary_key=True)
+    unique_vuln_id: orm.Mapped[int] = orm.mapped_column(primary_key=True)
+    qid: orm.Mapped[int] = orm.mapped_column(primary_key=True)
+    recorded_at: orm.Mapped[dt.datetime] = orm.mapped_column(
+        sa.DateTime(timezone=True), primary_key=True
+    )
+    # "added", "changed" or "removed"
+    change: orm.Mapped[str]
+    status: orm.Mapped[str | None]
+    last_found_datetime: orm.Mapped[dt.datetime | None] = orm.mapped_column(
+        sa.DateTime(timezone=True)
+    )
@@ -0,0 +1,36 @@
+"""ORM data model for map reports"""
+
+import ipaddress
+from typing import Any
+
+import sqlalchemy as sa
+import sqlalchemy.dialects.postgresql as sa_pg
+import sqlalchemy.orm as orm
+
+from .. import sa_types
+
+
+class Base(orm.DeclarativeBase):
+    metadata = sa.MetaData(schema="qualys_map_report")
+
+
+class Ip(Base):
+    """A host found by a map report."""
+
+    __tablename__ = "ip"
+
+    report_ref: orm.Mapped[str] = orm.mapped_column(primary_key=True)
+    value: orm.Mapped[ipaddress.IPv4Address | ipaddress.IPv6Address] = (
+        orm.mapped_column(sa_types.IPAddressGenericType, primary_key=True)
+    )
+    name: orm.Mapped[str | None]
+    type: orm.Mapped[str | None]
+    os: orm.Mapped[str | None]
+    account: orm.Mapped[str | None]
+    netbios: orm.Mapped[str | None]
+    network: orm.Mapped[str | None]
+    network_id: orm.Mapped[str | None]
+    # Lists of small objects, stored as they are returned by the API.
+    port: orm.Mapped[list[dict[str, Any]]] = orm.mapped_column(sa_pg.JSONB)
+    discovery: orm.Mapped[list[dict[str, Any]]] = orm.mapped_column(sa_pg.JSONB)
+    link: orm.Mapped[list[dict[str, Any]]] = orm.mapped_column(sa_pg.JSONB)
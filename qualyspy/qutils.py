@@ -2,17 +2,33 @@
 
 import copy
 import dataclasses
+import hashlib
 import importlib
 import inspect
+import ipaddress
+import json
 import re
-from typing import Any, Sequence, TypeVar
+from typing import Any, Iterable, Iterator, Sequence, TypeVar
 
+import sqlalchemy as sa
+import sqlalchemy.dialects.postgresql as sa_pg
+import sqlalchemy.orm as orm
+from lxml import etree
 from sqlalchemy import inspect as sqlalchemy_inspect
+from sqlalchemy.orm import MANYTOONE
 
 _D = TypeVar("_D")
+_T = TypeVar("_T")
+
+IPAddress = ipaddress.IPv4Address | ipaddress.IPv6Address
+# An IP, IP network, or string holding an IP, a network in CIDR notation, or a "first-last" range.
+IPRangeLike = str | IPAddress | ipaddress.IPv4Network | ipaddress.IPv6Network
 _RE_QUALYSPY_CLASSNAME = re.compile(r"(qualyspy[\w._]*)")
 _RE_SA_CLASSNAME = re.compile(r"sqlalchemy.orm")
 
+# Size of the slices fed to the XML parser when the response has to be fed incrementally.
+_XML_FEED_CHUNK_SIZE = 1024 * 1024
+
 
 def _get_cls_inst_from_annot(mapped_cls: str) -> Any:
     """Get an instance of a class from a string annotation.
@@ -161,71 +177,337 @@ def to_orm_objects(objs: Sequence[Any], out_cls: type[_D]) -> list[_D]:
     return orm_objs
 
 
+def eager_load_options(orm_cls: type[Any]) -> list[Any]:
+    """Plan loader options for loading an ORM class together with everything related to it.
+
+    The relationship graph is walked from orm_cls, skipping relationships to classes already on
+    the current path so that back-references are not followed.  Collections are loaded with
+    selectinload and many-to-one relationships with joinedload, so loading with these options
+    takes a fixed number of queries, regardless of the number of objects.  _orm_object_to_dict
+    follows the same relationships.
+
+    Args:
+        orm_cls (type[Any]): The ORM class at the root of the hierarchy, e.g.
+            host_list_vm_detection_orm.Host.
+
+    Returns:
+        list[Any]: Loader options to pass to Select.options.
+    """
+    options: list[Any] = []
+    # Each entry is (mapper, loader option for the path to it, classes on the path).
+    stack: list[tuple[Any, Any, frozenset[Any]]] = [
+        (sqlalchemy_inspect(orm_cls), None, frozenset((orm_cls,)))
+    ]
+    while stack:
+        mapper, option, path = stack.pop()
+        is_leaf = True
+        for rel in mapper.relationships:
+            if rel.mapper.class_ in path:
+                continue
+            is_leaf = False
+            attr = rel.class_attribute
+            loader = "joinedload" if rel.direction == MANYTOONE else "selectinload"
+            child_option = (
+                getattr(orm, loader)(attr)
+                if option is None
+                else getattr(option, loader)(attr)
+            )
+            stack.append((rel.mapper, child_option, path | {rel.mapper.class_}))
+        if is_leaf and option is not None:
+            options.append(option)
+    return options
+
+
+def _orm_object_to_dict(obj: Any) -> dict[str, Any]:
+    """Convert an ORM object and its children to nested dicts.
+
+    Relationships to a class already on the current path (e.g. Detection.host when converting a
+    Host) are skipped without being loaded, the same way as in eager_load_options.  Other
+    objects of the same class, such as sibling detections, are all converted.
+
+    Args:
+        obj (Any): The ORM object.
+
+    Returns:
+        dict[str, Any]: The attributes of the ORM object, with relationships as nested dicts and
+            lists of dicts.
+    """
+    result: dict[str, Any] = {}
+    # Each entry is (ORM object, dict to fill in, classes on the path to it).
+    stack: list[tuple[Any, dict[str, Any], frozenset[Any]]] = [
+        (obj, result, frozenset((type(obj),)))
+    ]
+    while stack:
+        current, out, path = stack.pop()
+        mapper = sqlalchemy_inspect(current).mapper
+        for column_attr in mapper.column_attrs:
+            out[column_attr.key] = getattr(current, column_attr.key)
+        for rel in mapper.relationships:
+            if rel.mapper.class_ in path:
+                continue
+            child_path = path | {rel.mapper.class_}
+            value = getattr(current, rel.key)
+            if value is None:
+                out[rel.key] = None
+            elif rel.uselist:
+                children: list[dict[str, Any]] = []
+                for item in value:
+                    child: dict[str, Any] = {}
+                    children.append(child)
+                    stack.append((item, child, child_path))
+                out[rel.key] = children
+            else:
+                child = {}
+                out[rel.key] = child
+                stack.append((value, child, child_path))
+    return result
+
+
 def from_orm_object(obj: Any, output_class: Any) -> Any:
     """Convert an ORM object to a dataclass instance of a Qualys object.
 
+    To avoid a lazy-load query per relationship per object, load obj with the options from
+    eager_load_options first.
+
     Args:
         obj (Any): The ORM object.
+        output_class (Any): The output class to convert to.
 
     Returns:
         Any: The dataclass instance of a Qualys object.
     """
+    return output_class(**_orm_object_to_dict(obj))
 
-    # Since the ORM objects relationships are bidirectional, we need to keep track of which
-    # classes we've already processed to avoid infinite recursion.
-    processed_classes: set[Any] = set()
 
-    builtin_types = (str, int, float, bool, type(None))
+def from_orm_objects(objs: Sequence[Any], output_class: Any) -> list[Any]:
+    """Convert ORM objects to dataclass instances of a Qualys object.
 
-    def get_attributes(obj: Any) -> dict[str, Any]:
-        """Get the attributes of an ORM object.
+    Args:
+        objs (Sequence[Any]): The ORM objects.
+        output_class (Any): The output class to convert to.
 
-        Args:
-            obj (Any): The ORM object.
+    Returns:
+        list[Any]: The dataclass instances of a Qualys object.
+    """
+    return [from_orm_object(obj, output_class) for obj in objs]
 
-        Returns:
-            dict[str, Any]: The attributes of the ORM object.
-        """
-        nonlocal processed_classes
-        processed_classes.add(type(obj))
 
-        result: dict[str, Any] = {}
-        keys = obj.__mapper__.attrs.keys()  # List of attributes of the ORM object
-        for key in keys:
-            value = getattr(obj, key)
+def _canonicalize(value: Any) -> Any:
+    """Sort the lists in a JSON-compatible value, recursively, so their order doesn't matter."""
+    if isinstance(value, dict):
+        return {k: _canonicalize(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return sorted(
+            (_canonicalize(v) for v in value),
+            key=lambda v: json.dumps(v, sort_keys=True),
+        )
+    return value
 
-            # Check for bultin types first so they don't get added to processed_classes
-            if isinstance(value, builtin_types):
-                result[key] = value
-                continue
 
-            # Skip classes we've already processed so we don't go back up the hierarchy
-            if type(value) in processed_classes:
+def content_digest(obj: Any) -> str:
+    """Compute a digest of a Qualys object and everything nested in it.
+
+    The object is dumped to JSON with sorted keys and lists, so two objects with the same
+    content have the same digest regardless of the order the API returned their children in.
+
+    Args:
+        obj (Any): Pydantic model instance of a Qualys object, e.g. a
+            host_list_vm_detection_output.Host.
+
+    Returns:
+        str: Hex SHA-256 digest of the object's content.
+    """
+    canonical = _canonicalize(obj.model_dump(mode="json"))
+    return hashlib.sha256(
+        json.dumps(canonical, sort_keys=True, separators=(",", ":")).encode()
+    ).hexdigest()
+
+
+def delete_orm_trees(
+    session: orm.Session, orm_cls: type[Any], whereclause: Any
+) -> None:
+    """Delete rows of an ORM class together with all of their children.
+
+    Children are found by following one-to-many relationships, like eager_load_options, and are
+    deleted with one bulk DELETE per relationship, deepest first, so no foreign key is violated
+    along the way.
+
+    Args:
+        session (orm.Session): Session to execute the deletes in.  The caller commits.
+        orm_cls (type[Any]): The ORM class at the root of the hierarchy, e.g.
+            host_list_vm_detection_orm.Host.
+        whereclause (Any): Condition selecting the rows of orm_cls to delete, e.g.
+            Host.id.in_(ids).
+    """
+
+    def _delete(mapper: Any, whereclause: Any, path: frozenset[Any]) -> None:
+        for rel in mapper.relationships:
+            if rel.direction == MANYTOONE or rel.mapper.class_ in path:
                 continue
+            parent_cols = [parent for parent, _ in rel.local_remote_pairs]
+            child_cols = [child for _, child in rel.local_remote_pairs]
+            parents = sa.select(*parent_cols).where(whereclause)
+            child_where = (
+                child_cols[0].in_(parents)
+                if len(child_cols) == 1
+                else sa.tuple_(*child_cols).in_(parents)
+            )
+            _delete(rel.mapper, child_where, path | {rel.mapper.class_})
+        session.execute(
+            sa.delete(mapper.class_).where(whereclause),
+            execution_options={"synchronize_session": False},
+        )
+
+    _delete(sqlalchemy_inspect(orm_cls), whereclause, frozenset((orm_cls,)))
+
+
+def chunked(items: Iterable[_T], size: int) -> Iterator[list[_T]]:
+    """Split items into lists of at most size items.
+
+    Args:
+        items (Iterable[Any]): Items to split.
+        size (int): Maximum number of items per list.
+
+    Returns:
+        Iterator[list[Any]]: The lists of items, in order.
+    """
+    if size < 1:
+        raise ValueError("size must be at least 1")
+    chunk: list[_T] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def parse_ip_range(value: IPRangeLike) -> tuple[IPAddress, IPAddress]:
+    """Get the first and last IP of an IP, an IP network, or an IP range ("first-last").
+
+    Args:
+        value (IPRangeLike): The IP, network or range.
+
+    Returns:
+        tuple[IPAddress, IPAddress]: The first and last IP.
+
+    Raises:
+        ValueError: Raised if value isn't an IP, network or range, or if it is a range whose
+            ends are of different IP versions or out of order.
+    """
+    if isinstance(value, (ipaddress.IPv4Address, ipaddress.IPv6Address)):
+        return value, value
+    if isinstance(value, (ipaddress.IPv4Network, ipaddress.IPv6Network)):
+        return value[0], value[-1]
+    value = value.strip()
+    if "-" in value:
+        first_str, last_str = value.split("-", 1)
+        first = ipaddress.ip_address(first_str.strip())
+        last = ipaddress.ip_address(last_str.strip())
+        if first.version != last.version or first > last:  # type: ignore[operator]
+            raise ValueError(f"Invalid IP range {value!r}.")
+        return first, last
+    network = ipaddress.ip_network(value, strict=False)
+    return network[0], network[-1]
+
+
+def collapse_ip_ranges(
+    values: Iterable[IPRangeLike],
+) -> list[tuple[IPAddress, IPAddress]]:
+    """Merge IPs, networks and ranges into the fewest ranges covering the same addresses.
+
+    Args:
+        values (Iterable[IPRangeLike]): The IPs, networks and ranges.
+
+    Returns:
+        list[tuple[IPAddress, IPAddress]]: The first and last IP of each range, sorted, with
+            IPv4 ranges first.
+    """
+    networks: dict[int, list[Any]] = {4: [], 6: []}
+    for value in values:
+        first, last = parse_ip_range(value)
+        networks[first.version] += ipaddress.summarize_address_range(
+            first, last  # type: ignore[arg-type]
+        )
+    ranges: list[tuple[IPAddress, IPAddress]] = []
+    for version in (4, 6):
+        merged: list[tuple[IPAddress, IPAddress]] = []
+        # collapse_addresses merges overlapping and sibling networks; adjacent networks that
+        # aren't siblings still have to be joined into one range.
+        for network in ipaddress.collapse_addresses(networks[version]):
+            if merged and int(merged[-1][1]) + 1 == int(network[0]):
+                merged[-1] = (merged[-1][0], network[-1])
             else:
-                processed_classes.add(type(value))
+                merged.append((network[0], network[-1]))
+        ranges += merged
+    return ranges
+
+
+def subtract_ip_ranges(
+    ranges: list[tuple[IPAddress, IPAddress]],
+    to_remove: list[tuple[IPAddress, IPAddress]],
+) -> list[tuple[IPAddress, IPAddress]]:
+    """Remove the addresses of some ranges from other ranges.
+
+    Args:
+        ranges (list[tuple[IPAddress, IPAddress]]): Ranges to remove addresses from, as returned
+            by collapse_ip_ranges.
+        to_remove (list[tuple[IPAddress, IPAddress]]): Ranges of the addresses to remove, as
+            returned by collapse_ip_ranges.
 
-            if callable(value):  # Skip methods
+    Returns:
+        list[tuple[IPAddress, IPAddress]]: The remaining ranges, sorted.
+    """
+    result: list[tuple[IPAddress, IPAddress]] = []
+    for first, last in ranges:
+        address = type(first)
+        start = int(first)
+        for remove_first, remove_last in to_remove:
+            if remove_first.version != first.version or int(remove_last) < start:
                 continue
-            elif isinstance(value, list):
-                result[key] = [_from_orm_object(v) for v in value]
-            else:
-                result[key] = _from_orm_object(value)
-        return result
+            if int(remove_first) > int(last):
+                break
+            if int(remove_first) > start:
+                result.append((address(start), address(int(remove_first) - 1)))
+            start = int(remove_last) + 1
+        if start <= int(last):
+            result.append((address(start), last))
+    return result
+
+
+def format_ip_ranges(ranges: list[tuple[IPAddress, IPAddress]]) -> str:
+    """Format ranges as a comma-separated list of IPs and "first-last" ranges.
+
+    Args:
+        ranges (list[tuple[IPAddress, IPAddress]]): The first and last IP of each range.
 
-    def _from_orm_object(
-        obj: Any,
-    ) -> Any:
-        """Helper function for from_orm_object.  Recursively converts an ORM object to a dataclass
-        instance of a Qualys object.
-        """
-        if isinstance(obj, list):
-            return [_from_orm_object(item) for item in obj]
-        elif not hasattr(obj, "__dict__"):
-            return obj
-        return get_attributes(obj)
+    Returns:
+        str: The formatted ranges.
+    """
+    return ",".join(
+        str(first) if first == last else f"{first}-{last}" for first, last in ranges
+    )
 
-    return output_class(**_from_orm_object(obj))
+
+def collapse_ids(ids: Iterable[int]) -> list[str]:
+    """Merge IDs into the fewest IDs and "first-last" ranges covering the same IDs.
+
+    Args:
+        ids (Iterable[int]): The IDs.
+
+    Returns:
+        list[str]: The IDs and ranges, sorted.
+    """
+    ranges: list[list[int]] = []
+    for id_ in sorted(set(ids)):
+        if ranges and ranges[-1][1] + 1 == id_:
+            ranges[-1][1] = id_
+        else:
+            ranges.append([id_, id_])
+    return [
+        str(first) if first == last else f"{first}-{last}" for first, last in ranges
+    ]
 
 
 def snake_to_camel_case(snake_str: str) -> str:
@@ -254,3 +536,126 @@ def clean_dict(d: dict[str, Any]) -> dict[str, str]:
             return str(v)
 
     return {k: _clean_dict(v) for k, v in d.items() if v is not None}
+
+
+def xml_root_from_bytes(
+    content: bytes, tag: str, *, huge_tree: bool = False
+) -> etree._Element:
+    """Parse an XML API response and return the element with the given tag.
+
+    The response bytes are handed to lxml directly, so the XML declaration and DOCTYPE are handled
+    by the parser rather than by searching the decoded text.  If anything precedes the first
+    element (e.g. leading whitespace), the remainder is fed to the parser in chunks instead of
+    being copied.
+
+    Args:
+        content (bytes): Raw body of the API response.
+        tag (str): Tag of the element to return, e.g. "HOST_LIST_OUTPUT".
+        huge_tree (bool, optional): Whether to allow very deep trees and very long text content.
+            Defaults to False.
+
+    Returns:
+        etree._Element: The element with the given tag.
+
+    Raises:
+        ValueError: If the response does not contain an element with the given tag.
+        lxml.etree.XMLSyntaxError: If the response is not well-formed XML.
+    """
+    parser = etree.XMLParser(
+        huge_tree=huge_tree, resolve_entities=False, no_network=True
+    )
+
+    start = content.find(b"<")
+    if start == -1:
+        raise ValueError(f"Cannot find {tag} in response.")
+    if start == 0:
+        root = etree.fromstring(content, parser)
+    else:
+        view = memoryview(content)
+        for i in range(start, len(content), _XML_FEED_CHUNK_SIZE):
+            parser.feed(view[i : i + _XML_FEED_CHUNK_SIZE].tobytes())
+        root = parser.close()
+
+    if root.tag == tag:
+        return root
+    element = next(root.iter(tag), None)
+    if element is None:
+        raise ValueError(f"Cannot find {tag} in response.")
+    return element
+
+
+def iter_xml_elements(
+    chunks: Iterable[bytes], tags: Sequence[str]
+) -> Iterator[etree._Element]:
+    """Parse an XML API response incrementally, yielding the elements with the given tags.
+
+    Each element is yielded once it is complete, then cleared and detached from the tree along
+    with the elements before it, so memory use doesn't grow with the size of the response.  The
+    element must not be used after the next one is requested.
+
+    Args:
+        chunks (Iterable[bytes]): The raw body of the API response, in chunks, e.g. from
+            httpx.Response.iter_bytes.
+        tags (Sequence[str]): Tags of the elements to yield, e.g. ["IP"].
+
+    Returns:
+        Iterator[etree._Element]: The complete elements, in document order.
+
+    Raises:
+        lxml.etree.XMLSyntaxError: If the response is not well-formed XML.
+    """
+    parser = etree.XMLPullParser(
+        events=("end",),
+        tag=list(tags),
+        huge_tree=True,
+        resolve_entities=False,
+        no_network=True,
+    )
+
+    def _events() -> Iterator[etree._Element]:
+        for _, element in parser.read_events():
+            yield element
+            element.clear(keep_tail=True)
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+
+    started = False
+    for chunk in chunks:
+        if not started:
+            # Anything before the first element (e.g. leading whitespace) is skipped.
+            start = chunk.find(b"<")
+            if start == -1:
+                continue
+            chunk = chunk[start:]
+            started = True
+        parser.feed(chunk)
+        yield from _events()
+    if started:
+        parser.close()
+        yield from _events()
+
+
+def upsert(conn: sa.Connection, table: sa.Table, rows: list[dict[str, Any]]) -> None:
+    """Insert rows into a PostgreSQL table, updating the rows whose primary key already exists.
+
+    Args:
+        conn (sa.Connection): Connection to insert with.
+        table (sa.Table): Table to insert into.
+        rows (list[dict[str, Any]]): Rows to insert, with at most one row per primary key.
+    """
+    if not rows:
+        return
+    keys = [col.name for col in table.primary_key.columns]
+    stmt = sa_pg.insert(table)
+    update = {
+        col.name: stmt.excluded[col.name]
+        for col in table.columns
+        if col.name not in keys
+    }
+    if update:
+        stmt = stmt.on_conflict_do_update(index_elements=keys, set_=update)
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=keys)
+    conn.execute(stmt, rows)
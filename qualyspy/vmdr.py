@@ -14,17 +14,19 @@ session.close()
 
 import datetime
 import ipaddress
+import itertools
 import re
-from typing import Any, Literal
+from typing import Any, Callable, Iterator, Literal, Mapping, TypeVar
 
+import sqlalchemy as sa
 import sqlalchemy.orm as orm
-from lxml import etree
 from lxml.etree import XMLSyntaxError
 from psycopg import OperationalError as pgOperationalError
 from sqlalchemy.exc import OperationalError as saOperationalError
 
-from . import URLS, qutils
-from .base import QualysAPIBase, QualysORMMixin
+from . import URLS, exceptions, qutils
+from .base import BatchResult, QualysAPIBase, QualysORMMixin
+from .models import fast_xml
 from .models.vmdr import (
     asset_group_list_output,
     host_list_orm,
@@ -35,13 +37,214 @@ from .models.vmdr import (
     knowledgebase_output,
     map_report,
     map_report_list,
+    map_report_orm,
     scan_list_output,
     simple_return,
 )
 
+_H = TypeVar("_H", host_list_output.Host, host_list_vm_detection_output.Host)
+
+
+def _id_filters(name: str, ids: int | list[int], size: int) -> list[dict[str, str]]:
+    """Compress IDs into ranges and split them into chunks of the parameter name."""
+    if not isinstance(ids, list):
+        ids = [ids]
+    return [
+        {name: ",".join(chunk)}
+        for chunk in qutils.chunked(qutils.collapse_ids(ids), size)
+    ]
+
+
+def _id_bounds(ids: str | None) -> tuple[int, int | None]:
+    """Get the first and last ID of a chunk made by _id_filters, or (0, None) if ids is None."""
+    if ids is None:
+        return 0, None
+    tokens = ids.split(",")
+    return int(tokens[0].split("-")[0]), int(tokens[-1].split("-")[-1])
+
+
+def _ip_filters(
+    ips: list[qutils.IPRangeLike] | qutils.IPRangeLike | None, size: int
+) -> list[dict[str, str]]:
+    """Compress IPs into ranges and split them into chunks of the ips and ipv6 parameters.
+
+    The API can't take IPv4 and IPv6 addresses in the same call, and the ipv6 parameter only
+    takes single addresses, so IPv6 addresses are sent one by one in separate chunks.  IPv6
+    networks and ranges of up to size addresses are expanded.
+    """
+    if ips is None:
+        return [{}]
+    if not isinstance(ips, list):
+        ips = [ips]
+    ipv4_values: list[qutils.IPRangeLike] = []
+    ipv6_ips: set[ipaddress.IPv6Address] = set()
+    for value in ips:
+        first, last = qutils.parse_ip_range(value)
+        if first.version == 4:
+            ipv4_values.append(value)
+        elif int(last) - int(first) < size:
+            ipv6_ips.update(
+                ipaddress.IPv6Address(ip) for ip in range(int(first), int(last) + 1)
+            )
+        else:
+            raise ValueError(f"IPv6 range too large to expand: {first}-{last}")
+    return [
+        {"ips": qutils.format_ip_ranges(chunk)}
+        for chunk in qutils.chunked(qutils.collapse_ip_ranges(ipv4_values), size)
+    ] + [
+        {"ipv6": ",".join(map(str, chunk))}
+        for chunk in qutils.chunked(sorted(ipv6_ips), size)
+    ]
+
+
+def _next_page(warning: Any) -> tuple[bool, int]:
+    """Get whether a host list response was truncated, and the next id_min if it was."""
+    if warning is None:
+        return False, 0
+    next_id_match = re.search(r"id_min=(\d+)", warning.url)
+    if next_id_match is None:
+        raise ValueError(
+            "Unable to parse URL in warning message. No id_min found.\n"
+            f"{warning.url}"
+        )
+    return True, int(next_id_match.group(1))
+
+
+def _parse_host_list_response(
+    raw_response: bytes,
+) -> tuple[list[host_list_output.Host], bool, int]:
+    host_list_output_root = qutils.xml_root_from_bytes(raw_response, "HOST_LIST_OUTPUT")
+    host_list_output_obj = host_list_output.HostListOutput.from_xml_tree(
+        host_list_output_root
+    )
+    # The host list is left out when no hosts match, e.g. for one chunk of a long filter.
+    host_list = host_list_output_obj.response.host_list or []
+    truncated, next_id_min = _next_page(host_list_output_obj.response.warning)
+    return host_list, truncated, next_id_min
+
+
+def _parse_host_list_vm_detection_response(
+    raw_response: bytes,
+) -> tuple[list[host_list_vm_detection_output.Host], bool, int]:
+    # Detections results can be quite large, so we need to set the parser to allow for large
+    # trees.
+    host_list_vm_detection_output_root = qutils.xml_root_from_bytes(
+        raw_response, "HOST_LIST_VM_DETECTION_OUTPUT", huge_tree=True
+    )
+    # Detections have many optional child elements, which pydantic-xml is slow to look up
+    # one by one, so use the single-pass decoder.
+    host_list_vm_detection_output_obj = fast_xml.decode(
+        host_list_vm_detection_output.HostListVMDetectionOutput,
+        host_list_vm_detection_output_root,
+    )
+    host_list = host_list_vm_detection_output_obj.response.host_list or []
+    truncated, next_id_min = _next_page(
+        host_list_vm_detection_output_obj.response.warning
+    )
+    return host_list, truncated, next_id_min
+
 
 class VmdrAPI(QualysAPIBase):
-    """Qualys VMDR API Class.  Contains methods for interacting with the VMDR API."""
+    """Qualys VMDR API Class.  Contains methods for interacting with the VMDR API.
+
+    Attributes:
+        filter_chunk_size (int): Maximum number of IPs, IDs and ranges sent in one list-valued
+            parameter of host_list and host_list_vm_detection.  Longer lists are split across
+            several requests.
+    """
+
+    filter_chunk_size = 1000
+
+    def _list_hosts(
+        self,
+        url: str,
+        params: dict[str, Any],
+        filters: list[list[dict[str, str]]],
+        parse: Callable[[bytes], tuple[list[_H], bool, int]],
+    ) -> tuple[list[_H], bool, int]:
+        """Send a host list request for every combination of filter chunks and merge the pages.
+
+        The requests are sent as POST form bodies, concurrently when there are several.  Every
+        request gets the same id_min, so the merged page is cut at the smallest id_min returned
+        by a truncated request, and at truncation_limit hosts; hosts past the cut are returned
+        by the next page instead.  Chunks of IDs are disjoint and sorted, so they are requested
+        in order, a few at a time, until the page is full.
+
+        Args:
+            url (str): URL of the host list API.
+            params (dict[str, Any]): Parameters sent with every request.
+            filters (list[list[dict[str, str]]]): For each list-valued filter, the parameters of
+                each of its chunks.  Hosts must match one chunk of every filter.
+            parse (Callable[[bytes], tuple[list[_H], bool, int]]): Function parsing a response
+                into its hosts, whether it was truncated, and the next id_min.
+
+        Returns:
+            tuple[list[_H], bool, int]: The hosts sorted by ID, whether the results were
+                truncated, and the next id_min to use for the next call.
+        """
+        params_cleaned = qutils.clean_dict(params)
+        params_cleaned["action"] = "list"
+        id_min = int(params_cleaned.get("id_min", 0))
+        # Requests grouped by the first and last ID of their chunk of IDs, if any.
+        groups: dict[tuple[int, int | None], list[dict[str, str]]] = {}
+        for combination in itertools.product(*filters):
+            request = params_cleaned.copy()
+            for chunk in combination:
+                request |= chunk
+            bounds = _id_bounds(request.get("ids"))
+            if bounds[1] is None or bounds[1] >= id_min:
+                groups.setdefault(bounds, []).append(request)
+
+        def _fetch(batch: list[dict[str, str]]) -> tuple[list[_H], bool, int]:
+            raw_response = self.post(
+                url,
+                data=batch[0],
+                content_type="application/x-www-form-urlencoded",
+                accept="application/xml",
+            ).content
+            return parse(raw_response)
+
+        if not groups:
+            # A filter with an empty list matches no hosts.
+            return [], False, 0
+        if len(groups) == 1 and len(requests := next(iter(groups.values()))) == 1:
+            return _fetch(requests)
+
+        # The API returns up to 1000 hosts by default; 0 means no limit.
+        limit = int(params_cleaned.get("truncation_limit", 1000))
+        workers = self.concurrency_limit_limit or 4
+        pending = sorted(groups.items(), key=lambda group: group[0][0])
+        hosts: dict[int, _H] = {}
+        cutoff: int | None = None
+        while pending:
+            window: list[dict[str, str]] = []
+            while pending and (not window or len(window) < workers):
+                window += pending.pop(0)[1]
+            for result in self.run_batches(_fetch, [[r] for r in window], workers):
+                if result.error is not None:
+                    raise result.error
+                page, truncated, next_id_min = result.result
+                if truncated:
+                    cutoff = next_id_min if cutoff is None else min(cutoff, next_id_min)
+                for host in page:
+                    hosts[host.id] = host  # type: ignore[attr-defined]
+
+            if not pending:
+                break
+            # All hosts of the remaining chunks of IDs come after the hosts found so far.
+            next_first = pending[0][0][0]
+            if cutoff is not None and next_first >= cutoff:
+                break
+            if next_first > id_min and limit and len(hosts) >= limit:
+                cutoff = next_first if cutoff is None else min(cutoff, next_first)
+                break
+
+        ids = sorted(id_ for id_ in hosts if cutoff is None or id_ < cutoff)
+        # Each chunk returns up to limit hosts, so several chunks together can return more.
+        if limit and len(ids) > limit:
+            cutoff = ids[limit]
+            ids = ids[:limit]
+        return [hosts[id_] for id_ in ids], cutoff is not None, cutoff or 0
 
     def host_list(
         self,
@@ -50,13 +253,7 @@ class VmdrAPI(QualysAPIBase):
         details: Literal["Basic", "Basic/AGs", "All", "All/AGs", "None"] | None = None,
         os_pattern: str | None = None,
         truncation_limit: int | None = None,
-        ips: (
-            list[str | ipaddress.IPv4Address | ipaddress.IPv6Address]
-            | str
-            | ipaddress.IPv4Address
-            | ipaddress.IPv6Address
-            | None
-        ) = None,
+        ips: list[qutils.IPRangeLike] | qutils.IPRangeLike | None = None,
         ag_ids: int | list[int] | None = None,
         ag_titles: str | list[str] | None = None,
         ids: int | list[int] | None = None,
@@ -91,7 +288,13 @@ class VmdrAPI(QualysAPIBase):
         """Get a list of hosts from the VMDR API.  A value of None for the parameters will use their
             default values in the API.
 
+        Long lists of ips and ids are compressed into ranges and split across several requests,
+        which are sent concurrently and merged into one page of results.  IPv4 and IPv6
+        addresses can be mixed.
+
         Args:
+            ips (list[qutils.IPRangeLike] | qutils.IPRangeLike | None, optional): IPs to query.
+                IPv4 networks and "first-last" ranges are also accepted.  Defaults to None.
             ids (int | list[int] | None, optional): Host IDs to query. Defaults to None.
 
         Returns:
@@ -100,50 +303,13 @@ class VmdrAPI(QualysAPIBase):
                 results were truncated, and the next id_min to use for the next call.
         """
 
-        if ips is not None:
-            if not isinstance(ips, list):
-                ips = [ips]
-            ipv4_ips: (
-                list[str | ipaddress.IPv4Address | ipaddress.IPv6Address] | None
-            ) = [
-                ip
-                for ip in ips
-                if isinstance(ip, ipaddress.IPv4Address)
-                or isinstance(ipaddress.ip_address(ip), ipaddress.IPv4Address)
-            ]
-            ipv6_ips: (
-                list[str | ipaddress.IPv4Address | ipaddress.IPv6Address] | None
-            ) = [
-                ip
-                for ip in ips
-                if isinstance(ip, ipaddress.IPv6Address)
-                or isinstance(ipaddress.ip_address(ip), ipaddress.IPv6Address)
-            ]
-
-            if not ipv4_ips:
-                ipv4_ips = None
-            if not ipv6_ips:
-                ipv6_ips = None
-        else:
-            ipv4_ips = None
-            ipv6_ips = None
-
-        # Cannot pass both IPv4 and IPv6 addresses in the same call.
-        if ipv4_ips and ipv6_ips:
-            raise ValueError(
-                "Cannot pass both IPv4 and IPv6 addresses in the same call."
-            )
-
         params: dict[str, Any] = {
             "show_asset_id": show_asset_id,
             "details": details,
             "os_pattern": os_pattern,
             "truncation_limit": truncation_limit,
-            "ips": ipv4_ips,
-            "ipv6": ipv6_ips,
             "ag_ids": ag_ids,
             "ag_titles": ag_titles,
-            "ids": ids,
             "id_min": id_min,
             "id_max": id_max,
             "network_ids": network_ids,
@@ -172,36 +338,12 @@ class VmdrAPI(QualysAPIBase):
             "trurisk_max": trurisk_max,
             "show_trurisk_factors": show_trurisk_factors,
         }
-        params["action"] = "list"
-        params_cleaned = qutils.clean_dict(params)
-
-        raw_response = self.get(URLS.host_list, params=params_cleaned).text
-        match = re.search(
-            r"<HOST_LIST_OUTPUT>.*?</HOST_LIST_OUTPUT>", raw_response, re.DOTALL
+        filters = [_ip_filters(ips, self.filter_chunk_size)]
+        if ids is not None:
+            filters.append(_id_filters("ids", ids, self.filter_chunk_size))
+        return self._list_hosts(
+            URLS.host_list, params, filters, _parse_host_list_response
         )
-        if match is None:
-            raise ValueError("Cannot find HOST_LIST_OUTPUT in response.")
-        host_list_output_str = match.group(0)
-        host_list_output_obj = host_list_output.HostListOutput.from_xml(
-            host_list_output_str
-        )
-        if host_list_output_obj.response.host_list is None:
-            raise ValueError("Response has no host_list")
-
-        host_list = host_list_output_obj.response.host_list
-        warning = host_list_output_obj.response.warning
-        if warning is None:
-            return host_list, False, 0
-        next_id_match = re.search(r"id_min=(\d+)", warning.url)
-        if next_id_match is None:
-            raise ValueError(
-                "Unable to parse URL in warning message. No id_min found.\n"
-                f"{warning.url}"
-            )
-        truncated = True
-        next_id_min = int(next_id_match.group(1))
-
-        return host_list, truncated, next_id_min
 
     def host_list_vm_detection(
         self,
@@ -220,11 +362,16 @@ class VmdrAPI(QualysAPIBase):
         """Get a list of hosts with associated vulnerability detections from the VMDR API.  A
         value of None for the parameters will use their default values in the API.
 
+        Long lists of ids are handled as in host_list.  qids are compressed into ranges and
+        sent in full with every request.
+
             Args:
                 ids (int | list[int] | None, optional): Host IDs to query. Defaults to None.
                 truncation_limit (int | None, optional): Maximum number of hosts to return. Defaults
                      to None.
                 id_min (int | None, optional): Minimum host list ID to return. Defaults to None.
+                qids (int | list[int] | None, optional): QIDs of the detections to return.
+                    Defaults to None.
 
             Returns:
                 tuple[host_list_vm_detection_output.HostList, bool, int]: A tuple containing the
@@ -233,10 +380,8 @@ class VmdrAPI(QualysAPIBase):
         """
 
         params = {
-            "ids": ids,
             "truncation_limit": truncation_limit,
             "id_min": id_min,
-            "qids": qids,
             "show_qds": show_qds,
             "qds_min": qds_min,
             "qds_max": qds_max,
@@ -244,44 +389,21 @@ class VmdrAPI(QualysAPIBase):
             "show_igs": show_igs,
             "show_arf_data": show_arf_data,
         }
-        cleaned_params = qutils.clean_dict(params)
-        cleaned_params["action"] = "list"
-
-        # Detections results can be quite large, so we need to set the parser to allow for large
-        # trees.
-        parser = etree.XMLParser(huge_tree=True)
-
-        raw_response = self.get(URLS.host_list_vm_detection, params=cleaned_params).text
-        match = re.search(
-            r"<HOST_LIST_VM_DETECTION_OUTPUT>.*?</HOST_LIST_VM_DETECTION_OUTPUT>",
-            raw_response,
-            re.DOTALL,
-        )
-        if match is None:
-            raise ValueError("Cannot find HOST_LIST_VM_DETECTION_OUTPUT in response.")
-        host_list_vm_detection_output_str = match.group(0)
-        host_list_vm_detection_output_obj = (
-            host_list_vm_detection_output.HostListVMDetectionOutput.from_xml(
-                host_list_vm_detection_output_str, parser=parser
+        filters = []
+        if ids is not None:
+            filters.append(_id_filters("ids", ids, self.filter_chunk_size))
+        if qids is not None:
+            # Every chunk of hosts needs all of the QIDs: chunking them too would return each
+            # host once per chunk of QIDs, with only some of its detections.
+            params["qids"] = ",".join(
+                qutils.collapse_ids(qids if isinstance(qids, list) else [qids])
             )
+        return self._list_hosts(
+            URLS.host_list_vm_detection,
+            params,
+            filters,
+            _parse_host_list_vm_detection_response,
         )
-        if host_list_vm_detection_output_obj.response.host_list is None:
-            raise ValueError("Response has no host_list")
-
-        host_list = host_list_vm_detection_output_obj.response.host_list
-        warning = host_list_vm_detection_output_obj.response.warning
-        if warning is None:
-            return host_list, False, 0
-        next_id_match = re.search(r"id_min=(\d+)", warning.url)
-        if next_id_match is None:
-            raise ValueError(
-                "Unable to parse URL in warning message. No id_min found.\n"
-                f"{warning.url}"
-            )
-        truncated = True
-        next_id_min = int(next_id_match.group(1))
-
-        return host_list, truncated, next_id_min
 
     def knowledgebase(
         self,
@@ -307,26 +429,22 @@ class VmdrAPI(QualysAPIBase):
         params["action"] = "list"
         params_cleaned = qutils.clean_dict(params)
 
-        raw_response = self.get(URLS.knowledgebase, params=params_cleaned).text
-        match = re.search(
-            r"<KNOWLEDGE_BASE_VULN_LIST_OUTPUT>.*?</KNOWLEDGE_BASE_VULN_LIST_OUTPUT>",
-            raw_response,
-            re.DOTALL,
-        )
-        if match is None:
-            raise ValueError("Cannot find KNOWLEDGE_BASE_VULN_LIST_OUTPUT in response.")
-        knowledge_base_output_str = match.group(0)
+        raw_response = self.get(URLS.knowledgebase, params=params_cleaned).content
         try:
-            knowledge_base_output_obj = (
-                knowledgebase_output.KnowledgeBaseOutput.from_xml(
-                    knowledge_base_output_str
-                )
+            knowledge_base_output_root = qutils.xml_root_from_bytes(
+                raw_response, "KNOWLEDGE_BASE_VULN_LIST_OUTPUT"
             )
         except XMLSyntaxError as e:
             self.log.error(
-                f"Error parsing XML response: {e}\nResponse:\n{raw_response}"
+                f"Error parsing XML response: {e}\nResponse:\n"
+                f"{raw_response.decode('utf-8', errors='replace')}"
             )
             raise
+        knowledge_base_output_obj = (
+            knowledgebase_output.KnowledgeBaseOutput.from_xml_tree(
+                knowledge_base_output_root
+            )
+        )
 
         return knowledge_base_output_obj.response.vuln_list
 
@@ -360,9 +478,19 @@ class VmdrAPI(QualysAPIBase):
         return launch_vm_scan_output_obj
 
     def vm_scan_list(
-        self, *, scan_ref: str | None = None
+        self,
+        *,
+        scan_ref: str | None = None,
+        launched_after_datetime: datetime.datetime | None = None,
     ) -> scan_list_output.ScanListOutput:
-        params = {"scan_ref": scan_ref}
+        params: dict[str, Any] = {"scan_ref": scan_ref}
+        if launched_after_datetime is not None:
+            launched_after = _as_utc(launched_after_datetime).astimezone(  # type: ignore
+                datetime.timezone.utc
+            )
+            params["launched_after_datetime"] = launched_after.strftime(
+                "%Y-%m-%dT%H:%M:%SZ"
+            )
         params["action"] = "list"
         params_cleaned = qutils.clean_dict(params)
 
@@ -396,11 +524,40 @@ class VmdrAPI(QualysAPIBase):
 
         raw_response = self.get(
             URLS.download_saved_map_report, params=params_cleaned
-        ).text.encode("utf-8")
-        map_report_output_obj = map_report.Map.from_xml(raw_response)
+        ).content
+        root = qutils.xml_root_from_bytes(raw_response, "MAP", huge_tree=True)
+        map_report_output_obj = fast_xml.decode(map_report.Map, root)
 
         return map_report_output_obj
 
+    def iter_map_report(self, *, ref: str) -> Iterator[map_report.Ip]:
+        """Stream a saved map report, yielding its hosts as they are downloaded.
+
+        Unlike download_saved_map_report, the report is never held in memory as a whole, so map
+        reports of any size are read with constant memory.
+
+        Args:
+            ref (str): Reference of the map report, e.g. from map_report_list.
+
+        Yields:
+            map_report.Ip: The hosts found by the map, in report order.
+
+        Raises:
+            exceptions.QualysAPIError: Raised if Qualys returns an error instead of the report.
+        """
+        params_cleaned = qutils.clean_dict({"ref": ref})
+        with self.stream_get(
+            URLS.download_saved_map_report, params=params_cleaned
+        ) as response:
+            for element in qutils.iter_xml_elements(
+                response.iter_bytes(), ["IP", "ERROR"]
+            ):
+                if element.tag == "ERROR":
+                    raise exceptions.QualysAPIError(
+                        f"Failed to download map report {ref}: {element.text}"
+                    )
+                yield fast_xml.decode(map_report.Ip, element)
+
     def asset_group_list(self) -> list[asset_group_list_output.AssetGroup]:
         params = {"action": "list"}
         params_cleaned = qutils.clean_dict(params)
@@ -420,14 +577,41 @@ class VmdrAPI(QualysAPIBase):
         self,
         *,
         id: int,
-        set_ips: list[str | ipaddress.IPv4Address | ipaddress.IPv4Network]
-        | None = None,
+        set_ips: list[qutils.IPRangeLike] | None = None,
+        add_ips: list[qutils.IPRangeLike] | None = None,
+        remove_ips: list[qutils.IPRangeLike] | None = None,
     ) -> simple_return.SimpleReturn:
+        """Edit the IPs of an asset group.
+
+        The IPs are collapsed into the fewest IPs and ranges before being sent.
+
+        Args:
+            id (int): ID of the asset group.
+            set_ips (list[qutils.IPRangeLike], optional): IPs, networks and ranges to replace
+                the IPs of the group with.  Defaults to None.
+            add_ips (list[qutils.IPRangeLike], optional): IPs, networks and ranges to add to the
+                group.  Defaults to None.
+            remove_ips (list[qutils.IPRangeLike], optional): IPs, networks and ranges to remove
+                from the group.  Defaults to None.
+
+        Returns:
+            simple_return.SimpleReturn: The response.
+
+        Raises:
+            ValueError: Raised if set_ips is combined with add_ips or remove_ips, or if Qualys
+                doesn't report the group as updated.
+        """
+        if set_ips is not None and (add_ips or remove_ips):
+            raise ValueError("set_ips can't be combined with add_ips or remove_ips.")
         params = {"action": "edit"}
         data = {"id": str(id)}
-        if set_ips is not None:
-            ips_str = ",".join([str(ip) for ip in set_ips])
-            data["set_ips"] = ips_str
+        for key, ips in (
+            ("set_ips", set_ips),
+            ("add_ips", add_ips),
+            ("remove_ips", remove_ips),
+        ):
+            if ips is not None and (ips or key == "set_ips"):
+                data[key] = qutils.format_ip_ranges(qutils.collapse_ip_ranges(ips))
 
         raw_response = self.post(
             URLS.asset_group,
@@ -446,6 +630,87 @@ class VmdrAPI(QualysAPIBase):
             )
         return edit_asset_group_output_obj
 
+    def update_asset_group_ips(
+        self,
+        *,
+        asset_group: asset_group_list_output.AssetGroup,
+        ips: list[qutils.IPRangeLike],
+    ) -> simple_return.SimpleReturn | None:
+        """Make the IPs of an asset group exactly ips, sending only the changes.
+
+        The IPs to add and to remove are computed against the current IPs of the group, so large
+        groups aren't sent in full for small changes.
+
+        Args:
+            asset_group (asset_group_list_output.AssetGroup): The asset group, as returned by
+                asset_group_list.
+            ips (list[qutils.IPRangeLike]): IPs, networks and ranges the group should contain.
+
+        Returns:
+            simple_return.SimpleReturn | None: The response, or None if the group already
+                contains exactly ips.
+        """
+        current = qutils.collapse_ip_ranges(asset_group_ips(asset_group))
+        desired = qutils.collapse_ip_ranges(ips)
+        add_ips = qutils.subtract_ip_ranges(desired, current)
+        remove_ips = qutils.subtract_ip_ranges(current, desired)
+        if not add_ips and not remove_ips:
+            return None
+        return self.edit_asset_group(
+            id=asset_group.id,
+            add_ips=[f"{first}-{last}" for first, last in add_ips],
+            remove_ips=[f"{first}-{last}" for first, last in remove_ips],
+        )
+
+    def update_asset_groups_ips(
+        self,
+        *,
+        ips: Mapping[int, list[qutils.IPRangeLike]],
+        workers: int | None = None,
+    ) -> list[BatchResult]:
+        """Make the IPs of many asset groups exactly the given IPs, editing groups concurrently.
+
+        The current IPs of all groups are read with one asset_group_list call, then only the
+        changes are sent, as in update_asset_group_ips.
+
+        Args:
+            ips (Mapping[int, list[qutils.IPRangeLike]]): IPs, networks and ranges each group
+                should contain, keyed by asset group ID.
+            workers (int, optional): Number of groups to edit at once.  Defaults to None, which
+                uses the concurrency limit reported by the Qualys API.
+
+        Returns:
+            list[BatchResult]: For each group, in the order of ips, its ID and either the
+                response (None if it was unchanged) or the error, e.g. a KeyError if there is no
+                group with that ID.
+        """
+        asset_groups = {ag.id: ag for ag in self.asset_group_list()}
+        return self.run_batches(
+            lambda batch: self.update_asset_group_ips(
+                asset_group=asset_groups[batch[0]], ips=ips[batch[0]]
+            ),
+            [[group_id] for group_id in ips],
+            workers=workers,
+        )
+
+
+def asset_group_ips(
+    asset_group: asset_group_list_output.AssetGroup,
+) -> list[qutils.IPRangeLike]:
+    """Get the IPs and IP ranges of an asset group.
+
+    Args:
+        asset_group (asset_group_list_output.AssetGroup): The asset group.
+
+    Returns:
+        list[qutils.IPRangeLike]: The IPs and "first-last" IP ranges.
+    """
+    if asset_group.ip_set is None:
+        return []
+    ips: list[qutils.IPRangeLike] = [ip.value for ip in asset_group.ip_set.ip or []]
+    ips += [ip_range.value for ip_range in asset_group.ip_set.ip_range or []]
+    return ips
+
 
 class HostListORM(VmdrAPI, QualysORMMixin):
     """Qualys VMDR Host List ORM Class.  Contains methods for loading hosts into an ORM database."""
@@ -490,6 +755,54 @@ class HostListORM(VmdrAPI, QualysORMMixin):
             load_set(to_load)
 
 
+class MapReportORM(VmdrAPI, QualysORMMixin):
+    """Qualys VMDR Map Report ORM Class.  Contains methods for loading map reports into an ORM
+    database.
+    """
+
+    def __init__(self, echo: bool = False) -> None:
+        """Initialize the Map Report ORM Class.
+
+        Args:
+            echo (bool, optional): Whether to echo SQL statements. Defaults to False.
+        """
+        VmdrAPI.__init__(self)
+        self.orm_base = map_report_orm.Base  # type: ignore
+        QualysORMMixin.__init__(self, self, echo=echo)
+
+    def load(self, *, ref: str, batch_size: int = 5000) -> None:  # type: ignore[override]
+        """Load the hosts of a saved map report into the ORM database.
+
+        The report is streamed and inserted batch_size hosts at a time, so memory use doesn't
+        depend on the size of the report.  Hosts already loaded for the report are replaced in
+        the same transaction.
+
+        Args:
+            ref (str): Reference of the map report, e.g. from map_report_list.
+            batch_size (int, optional): Number of hosts per insert.  Defaults to 5000.
+        """
+        table: sa.Table = map_report_orm.Ip.__table__  # type: ignore
+        with self.engine.begin() as conn:
+            conn.execute(sa.delete(table).where(table.c.report_ref == ref))
+            for batch in qutils.chunked(self.iter_map_report(ref=ref), batch_size):
+                # Keyed by IP, since a row can only be upserted once per statement.
+                rows = {}
+                for ip in batch:
+                    row = ip.model_dump() | {"report_ref": ref}
+                    row["value"] = ipaddress.ip_address(ip.value)
+                    for field in ("port", "discovery", "link"):
+                        row[field] = row[field] or []
+                    rows[row["value"]] = row
+                qutils.upsert(conn, table, list(rows.values()))
+
+
+def _as_utc(value: datetime.datetime | None) -> datetime.datetime | None:
+    """Treat naive datetimes from the API as UTC, so they compare equal to stored ones."""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value
+
+
 class HostListVMDetectionORM(VmdrAPI, QualysORMMixin):
     """Qualys VMDR Host List Detection ORM Class.  Contains methods for loading host
     detections into an ORM database.
@@ -505,11 +818,139 @@ class HostListVMDetectionORM(VmdrAPI, QualysORMMixin):
         self.orm_base = host_list_vm_detection_orm.Base  # type: ignore
         QualysORMMixin.__init__(self, self, echo=echo)
 
-    def load(self, **kwargs: Any) -> None:
+    def init_history_db(self) -> None:
+        """Create the detection history schema and table if they don't already exist."""
+        metadata = host_list_vm_detection_orm.HistoryBase.metadata
+        if metadata.schema is None:
+            raise exceptions.ConfigError("Schema not set in ORM base.")
+        with self.engine.begin() as conn:
+            conn.execute(sa.schema.CreateSchema(metadata.schema, if_not_exists=True))
+            metadata.create_all(conn)
+
+    def _add_content_digest_column(self) -> None:
+        """Add the content_digest column to a host table created by an earlier version.
+
+        create_all skips tables that already exist, so databases initialized before the column
+        was added would otherwise fail on the first insert.
+        """
+        with self.engine.begin() as conn:
+            conn.execute(
+                sa.DDL(
+                    "ALTER TABLE IF EXISTS %(fullname)s "
+                    "ADD COLUMN IF NOT EXISTS content_digest VARCHAR"
+                ).against(host_list_vm_detection_orm.Host.__table__)
+            )
+
+    def _create_history_partition(self, recorded_at: datetime.datetime) -> None:
+        """Create the monthly partition of the detection history table for recorded_at.
+
+        Args:
+            recorded_at (datetime.datetime): Time the rows will be recorded at.
+        """
+        table = host_list_vm_detection_orm.DetectionHistory.__table__
+        name = f"{table.schema}.{table.name}"
+        start = recorded_at.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        end = (start + datetime.timedelta(days=32)).replace(day=1)
+        with self.engine.begin() as conn:
+            conn.execute(
+                sa.text(
+                    f"CREATE TABLE IF NOT EXISTS {name}_{start:%Y_%m} PARTITION OF {name} "
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                )
+            )
+
+    @staticmethod
+    def _record_history(
+        session: orm.Session,
+        hosts: list[host_list_vm_detection_orm.Host],
+        recorded_at: datetime.datetime,
+    ) -> None:
+        """Add detection history rows for the detections of hosts that differ from the last
+        recorded state.
+
+        Args:
+            session (orm.Session): Session to add the rows in.  The caller commits.
+            hosts (list[host_list_vm_detection_orm.Host]): Hosts being loaded.
+            recorded_at (datetime.datetime): Time to record the changes at.
+        """
+        History = host_list_vm_detection_orm.DetectionHistory
+        key_columns = (History.host_id, History.unique_vuln_id, History.qid)
+        latest = session.execute(
+            sa.select(History)
+            .where(History.host_id.in_([host.id for host in hosts]))
+            .distinct(*key_columns)
+            .order_by(*key_columns, History.recorded_at.desc())
+        ).scalars()
+        previous = {
+            (row.host_id, row.unique_vuln_id, row.qid): row
+            for row in latest
+            if row.change != "removed"
+        }
+
+        rows: list[dict[str, Any]] = []
+        for host in hosts:
+            for detection in host.detections:
+                last_found = _as_utc(detection.last_found_datetime)
+                key = (host.id, detection.unique_vuln_id, detection.qid)
+                prev = previous.pop(key, None)
+                if prev is None:
+                    change = "added"
+                elif (prev.status, prev.last_found_datetime) != (
+                    detection.status,
+                    last_found,
+                ):
+                    change = "changed"
+                else:
+                    continue
+                rows.append(
+                    {
+                        "host_id": host.id,
+                        "unique_vuln_id": detection.unique_vuln_id,
+                        "qid": detection.qid,
+                        "recorded_at": recorded_at,
+                        "change": change,
+                        "status": detection.status,
+                        "last_found_datetime": last_found,
+                    }
+                )
+        # Whatever is left was recorded before but is no longer on its host.
+        for (host_id, unique_vuln_id, qid), prev in previous.items():
+            rows.append(
+                {
+                    "host_id": host_id,
+                    "unique_vuln_id": unique_vuln_id,
+                    "qid": qid,
+                    "recorded_at": recorded_at,
+                    "change": "removed",
+                    "status": prev.status,
+                    "last_found_datetime": prev.last_found_datetime,
+                }
+            )
+        if rows:
+            session.execute(sa.insert(History), rows)
+
+    def load(
+        self, *, incremental: bool = False, history: bool = False, **kwargs: Any
+    ) -> None:
         """Load hosts into the ORM database.
 
+        The METADATA of hosts and the QDS and QDS_FACTORS of detections can't be mapped to the
+        ORM classes yet, whose tables don't follow the structure of the API's output, so hosts
+        returned with any of them fail to load.  show_qds must be left unset.
+
         Args:
-            load_func (Any): Function to call to get hosts.
+            incremental (bool, optional): Update a database that has already been loaded.  Each
+                host is stored with a digest of its content and detections, and hosts whose
+                digest hasn't changed since the last load are skipped.  Changed hosts are deleted
+                along with their detections and loaded again.  Hosts no longer returned by the
+                API are not deleted.  Defaults to False, which inserts every host.
+            history (bool, optional): Also append the detections that are new, have changed
+                status or last_found_datetime, or have disappeared from their host since the
+                last load to the DetectionHistory table.  Only hosts returned by the API are
+                compared, so the detections of a host that is no longer returned at all are
+                not recorded as removed, just as incremental loads don't delete the host.  The
+                history schema is separate, so it is kept when load_safe replaces the detection
+                schema.  Defaults to False.
             **kwargs (Any): Keyword arguments to pass to host_list_vm_detection.
         """
 
@@ -519,12 +960,37 @@ class HostListVMDetectionORM(VmdrAPI, QualysORMMixin):
             Args:
                 to_load (list[host_list_vm_detection_orm.Host]): List of hosts to load.
             """
+            Host = host_list_vm_detection_orm.Host
             with orm.Session(self.engine) as session:
+                if incremental:
+                    stored = dict(
+                        session.execute(
+                            sa.select(Host.id, Host.content_digest).where(
+                                Host.id.in_([host.id for host in to_load])
+                            )
+                        ).all()
+                    )
+                    to_load = [
+                        host
+                        for host in to_load
+                        if stored.get(host.id) != host.content_digest
+                    ]
+                    changed = [host.id for host in to_load if host.id in stored]
+                    if changed:
+                        qutils.delete_orm_trees(session, Host, Host.id.in_(changed))
+                if history and to_load:
+                    self._record_history(session, to_load, recorded_at)
                 session.add_all(to_load)
                 # for obj in to_load:
                 #     session.merge(obj)
                 session.commit()
 
+        self._add_content_digest_column()
+        recorded_at = datetime.datetime.now(datetime.timezone.utc)
+        if history:
+            self.init_history_db()
+            self._create_history_partition(recorded_at)
+
         kwargs.setdefault("truncation_limit", 1000)
         truncated = True
         next_id_min = None
@@ -542,6 +1008,8 @@ class HostListVMDetectionORM(VmdrAPI, QualysORMMixin):
                     to_load = qutils.to_orm_objects(
                         hosts, host_list_vm_detection_orm.Host
                     )
+                    for host, orm_host in zip(hosts, to_load):
+                        orm_host.content_digest = qutils.content_digest(host)
                     load_set(to_load)
                     success = True
                 except (
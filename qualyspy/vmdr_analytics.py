@@ -0,0 +1,327 @@
+"""
+Vectorized aggregations over VMDR detections loaded into the database.
+
+Detections are read from the host_list_vm_detection schema into NumPy columns, with status and
+type integer-coded in SQL, and aggregated per host or per asset group without building ORM
+objects.  Requires the optional numpy dependency (pip install qualyspy[analytics]).
+
+Typical usage example:
+vmdr_orm = vmdr.HostListVMDetectionORM()
+columns = vmdr_analytics.DetectionColumns.from_database(vmdr_orm)
+hosts, counts = vmdr_analytics.severity_status_counts(columns)
+"""
+
+import dataclasses
+import datetime
+from typing import Any, Iterable, Mapping, Sequence
+
+import sqlalchemy as sa
+
+from .base import QualysORMMixin
+from .models.vmdr import host_list_vm_detection_orm
+
+try:
+    import numpy as np
+    import numpy.typing as npt
+except ImportError as e:
+    raise ImportError(
+        "qualyspy.vmdr_analytics requires numpy.  Install it with: pip install qualyspy[analytics]"
+    ) from e
+
+# Integer codes of the enumerated columns are the index in these tuples.  The last entry (None)
+# is used for missing or unrecognized values.
+STATUSES: tuple[str | None, ...] = ("New", "Active", "Re-Opened", "Fixed", None)
+TYPES: tuple[str | None, ...] = ("Confirmed", "Potential", "Info", None)
+# Severity is stored as is; 0 means missing.
+SEVERITIES = tuple(range(6))
+
+DEFAULT_AGE_BINS_DAYS: tuple[float, ...] = (0, 30, 60, 90, 180, 365, np.inf)
+
+# Indices into the detection columns and the group key for each of them.
+Grouping = tuple[npt.NDArray[np.intp], npt.NDArray[np.int64]]
+
+# Sentinel for NULL integers read from the database.  For datetime columns this is NaT.
+_NULL = np.iinfo(np.int64).min
+
+
+@dataclasses.dataclass
+class DetectionColumns:
+    """Detections stored column-wise in NumPy arrays.  All arrays have one entry per detection.
+
+    Attributes:
+        host_id (npt.NDArray[np.int64]): ID of the host the detection belongs to.
+        qid (npt.NDArray[np.int64]): QID of the detection.
+        severity (npt.NDArray[np.int8]): Severity, 1-5, or 0 if missing.
+        status (npt.NDArray[np.int8]): Index of the status in STATUSES.
+        type (npt.NDArray[np.int8]): Index of the type in TYPES.
+        qds (npt.NDArray[np.float64]): QDS score, or NaN if missing.
+        first_found (npt.NDArray[np.datetime64]): first_found_datetime in UTC, or NaT.
+        last_fixed (npt.NDArray[np.datetime64]): last_fixed_datetime in UTC, or NaT.
+    """
+
+    host_id: npt.NDArray[np.int64]
+    qid: npt.NDArray[np.int64]
+    severity: npt.NDArray[np.int8]
+    status: npt.NDArray[np.int8]
+    type: npt.NDArray[np.int8]
+    qds: npt.NDArray[np.float64]
+    first_found: npt.NDArray[np.datetime64]
+    last_fixed: npt.NDArray[np.datetime64]
+
+    def __len__(self) -> int:
+        return len(self.host_id)
+
+    @classmethod
+    def from_database(
+        cls,
+        orm_obj: QualysORMMixin,
+        *criteria: Any,
+        batch_size: int = 100000,
+    ) -> "DetectionColumns":
+        """Read detections from the database.
+
+        Enumerated columns are coded and datetimes are converted to epoch seconds by the database,
+        so every row arrives as a tuple of integers.
+
+        Args:
+            orm_obj (QualysORMMixin): ORM object connected to the host_list_vm_detection schema,
+                e.g. vmdr.HostListVMDetectionORM.
+            *criteria (Any): Optional WHERE criteria on the detection table, e.g.
+                host_list_vm_detection_orm.Detection.severity >= 4.
+            batch_size (int, optional): Number of rows fetched from the server at a time.
+                Defaults to 100000.
+
+        Returns:
+            DetectionColumns: The detections.
+        """
+        detection = host_list_vm_detection_orm.Detection
+        qds = host_list_vm_detection_orm.Qds
+
+        def _code(column: Any, values: tuple[str | None, ...]) -> Any:
+            return sa.case(
+                {value: code for code, value in enumerate(values) if value is not None},
+                value=column,
+                else_=len(values) - 1,
+            )
+
+        def _epoch(column: Any) -> Any:
+            return sa.func.coalesce(
+                sa.cast(sa.extract("epoch", column), sa.BigInteger), _NULL
+            )
+
+        stmt = (
+            sa.select(
+                detection.host_id,
+                detection.qid,
+                sa.func.coalesce(detection.severity, 0),
+                _code(detection.status, STATUSES),
+                _code(detection.type, TYPES),
+                sa.func.coalesce(qds.value, _NULL),
+                _epoch(detection.first_found_datetime),
+                _epoch(detection.last_fixed_datetime),
+            )
+            .outerjoin(
+                qds,
+                sa.and_(
+                    qds.detection_unqiue_vuln_id == detection.unique_vuln_id,
+                    qds.detection_qid == detection.qid,
+                ),
+            )
+            .where(*criteria)
+        )
+
+        chunks: list[npt.NDArray[np.int64]] = []
+        with orm_obj.engine.connect() as conn:
+            result = conn.execution_options(yield_per=batch_size).execute(stmt)
+            for partition in result.partitions():
+                chunks.append(np.array(partition, dtype=np.int64).reshape(-1, 8))
+        rows = np.concatenate(chunks) if chunks else np.empty((0, 8), dtype=np.int64)
+
+        qds_values = rows[:, 5].astype(np.float64)
+        qds_values[rows[:, 5] == _NULL] = np.nan
+        return cls(
+            host_id=rows[:, 0].copy(),
+            qid=rows[:, 1].copy(),
+            severity=np.clip(rows[:, 2], 0, len(SEVERITIES) - 1).astype(np.int8),
+            status=rows[:, 3].astype(np.int8),
+            type=rows[:, 4].astype(np.int8),
+            qds=qds_values,
+            first_found=rows[:, 6].astype("datetime64[s]"),
+            last_fixed=rows[:, 7].astype("datetime64[s]"),
+        )
+
+
+def asset_group_keys(
+    columns: DetectionColumns, asset_groups: Mapping[int, Iterable[int]]
+) -> Grouping:
+    """Assign detections to asset groups.
+
+    A host can be in several asset groups, so a detection may appear more than once in the result.
+
+    Args:
+        columns (DetectionColumns): The detections.
+        asset_groups (Mapping[int, Iterable[int]]): Host IDs of each asset group, keyed by asset
+            group ID.
+
+    Returns:
+        Grouping: Indices into the detection columns and the asset group ID for each of them.  Can
+            be passed as the by argument of the aggregation functions.
+    """
+    indices: list[npt.NDArray[np.intp]] = []
+    keys: list[npt.NDArray[np.int64]] = []
+    for group_id, host_ids in asset_groups.items():
+        group_hosts = np.fromiter(host_ids, dtype=np.int64)
+        (index,) = np.nonzero(np.isin(columns.host_id, group_hosts))
+        indices.append(index)
+        keys.append(np.full(len(index), group_id, dtype=np.int64))
+    if not indices:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.int64)
+    return np.concatenate(indices), np.concatenate(keys)
+
+
+def _grouping(
+    columns: DetectionColumns, by: Grouping | None
+) -> tuple[npt.NDArray[np.intp], npt.NDArray[np.int64], npt.NDArray[np.intp]]:
+    """Resolve the by argument of the aggregation functions.
+
+    Returns:
+        tuple[npt.NDArray[np.intp], npt.NDArray[np.int64], npt.NDArray[np.intp]]: Indices into the
+            detection columns, the sorted unique group keys, and the position of each index's
+            group in the unique keys.
+    """
+    if by is None:
+        index = np.arange(len(columns))
+        keys = columns.host_id
+    else:
+        index, keys = by
+    groups, inverse = np.unique(keys, return_inverse=True)
+    return index, groups, inverse.reshape(-1)
+
+
+def severity_status_counts(
+    columns: DetectionColumns, by: Grouping | None = None
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+    """Count detections by severity and status for each host or asset group.
+
+    Args:
+        columns (DetectionColumns): The detections.
+        by (Grouping | None, optional): Grouping from asset_group_keys.  Defaults to None,
+            which groups by host.
+
+    Returns:
+        tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]: The group keys (host or asset group
+            IDs), and counts of shape (groups, len(SEVERITIES), len(STATUSES)) such that
+            counts[i, severity, status_code] is the number of detections in group i.
+    """
+    index, groups, inverse = _grouping(columns, by)
+    shape = (len(groups), len(SEVERITIES), len(STATUSES))
+    flat = np.ravel_multi_index(
+        (inverse, columns.severity[index], columns.status[index]), shape
+    )
+    counts = np.bincount(flat, minlength=int(np.prod(shape))).reshape(shape)
+    return groups, counts
+
+
+def qds_percentiles(
+    columns: DetectionColumns,
+    percentiles: Sequence[float] = (50, 90, 99),
+    by: Grouping | None = None,
+    *,
+    statuses: Sequence[str | None] | None = None,
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.float64]]:
+    """Compute percentiles of the QDS score for each host or asset group.
+
+    Percentiles are linearly interpolated, as with numpy.percentile.  Detections without a QDS
+    score are ignored.
+
+    Args:
+        columns (DetectionColumns): The detections.
+        percentiles (Sequence[float], optional): Percentiles to compute, between 0 and 100.
+            Defaults to (50, 90, 99).
+        by (Grouping | None, optional): Grouping from asset_group_keys.  Defaults to None,
+            which groups by host.
+        statuses (Sequence[str | None] | None, optional): Only include detections with these
+            statuses.  Defaults to None, which includes all detections.
+
+    Returns:
+        tuple[npt.NDArray[np.int64], npt.NDArray[np.float64]]: The group keys, and percentiles of
+            shape (groups, len(percentiles)).  Groups without any scores are NaN.
+    """
+    index, groups, inverse = _grouping(columns, by)
+    values = columns.qds[index]
+    keep = ~np.isnan(values)
+    if statuses is not None:
+        codes = [STATUSES.index(status) for status in statuses]
+        keep &= np.isin(columns.status[index], codes)
+    values, inverse = values[keep], inverse[keep]
+
+    # Sort by group, then by value, so each group's values are contiguous and ordered.
+    order = np.lexsort((values, inverse))
+    values = values[order]
+    counts = np.bincount(inverse, minlength=len(groups))
+    starts = np.cumsum(counts) - counts
+
+    fractions = np.asarray(percentiles, dtype=np.float64) / 100
+    positions = starts[:, None] + (counts[:, None] - 1) * fractions[None, :]
+    positions = np.clip(positions, 0, max(len(values) - 1, 0))
+    lower = np.floor(positions).astype(np.intp)
+    upper = np.ceil(positions).astype(np.intp)
+    if len(values) == 0:
+        return groups, np.full((len(groups), len(fractions)), np.nan)
+    result = values[lower] + (values[upper] - values[lower]) * (positions - lower)
+    result[counts == 0] = np.nan
+    return groups, result
+
+
+def age_histogram(
+    columns: DetectionColumns,
+    bins_days: Sequence[float] = DEFAULT_AGE_BINS_DAYS,
+    by: Grouping | None = None,
+    *,
+    fixed: bool = False,
+    now: datetime.datetime | None = None,
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+    """Histogram detection ages for each host or asset group.
+
+    Args:
+        columns (DetectionColumns): The detections.
+        bins_days (Sequence[float], optional): Bin edges in days.  Defaults to
+            DEFAULT_AGE_BINS_DAYS.
+        by (Grouping | None, optional): Grouping from asset_group_keys.  Defaults to None,
+            which groups by host.
+        fixed (bool, optional): If False, histogram the age of open (not Fixed) detections, from
+            first_found_datetime until now.  If True, histogram the time to fix of Fixed
+            detections, from first_found_datetime until last_fixed_datetime.  Defaults to False.
+        now (datetime.datetime | None, optional): Time to measure open detections' age against.
+            Defaults to the current time.
+
+    Returns:
+        tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]: The group keys, and counts of shape
+            (groups, len(bins_days) - 1).  Detections outside the bins or without the required
+            datetimes are not counted.
+    """
+    index, groups, inverse = _grouping(columns, by)
+    first_found = columns.first_found[index]
+    fixed_code = STATUSES.index("Fixed")
+    if fixed:
+        keep = columns.status[index] == fixed_code
+        end = columns.last_fixed[index]
+    else:
+        keep = columns.status[index] != fixed_code
+        if now is None:
+            now = datetime.datetime.now(datetime.timezone.utc)
+        if now.tzinfo is not None:
+            now = now.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        end = np.full(len(index), np.datetime64(now, "s"))
+
+    ages = (end - first_found).astype(np.float64) / 86400
+    keep &= ~np.isnat(first_found) & ~np.isnat(end)
+
+    edges = np.asarray(bins_days, dtype=np.float64)
+    bins = np.searchsorted(edges, ages, side="right") - 1
+    keep &= (bins >= 0) & (bins < len(edges) - 1)
+
+    shape = (len(groups), len(edges) - 1)
+    flat = np.ravel_multi_index((inverse[keep], bins[keep]), shape)
+    counts = np.bincount(flat, minlength=int(np.prod(shape))).reshape(shape)
+    return groups, counts
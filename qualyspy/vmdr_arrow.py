@@ -0,0 +1,336 @@
+"""
+Columnar export of VMDR host detections using Apache Arrow.
+
+Hosts and detections are streamed page by page from host_list_vm_detection into Arrow record
+batches, which can be written out as Parquet datasets and queried with DuckDB, pandas, etc.  Map
+reports are streamed the same way, in batches of hosts.
+Requires the optional pyarrow dependency (pip install qualyspy[arrow]).
+
+Typical usage example:
+exporter = vmdr_arrow.HostListVMDetectionArrow()
+exporter.write_parquet("detections/", partition_by=["status"], show_qds=True)
+"""
+
+import pathlib
+import shutil
+from typing import Any, Iterator
+
+from . import qutils, vmdr
+from .models.vmdr import host_list_vm_detection_output, map_report
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError as e:
+    raise ImportError(
+        "qualyspy.vmdr_arrow requires pyarrow.  Install it with: pip install qualyspy[arrow]"
+    ) from e
+
+# Low-cardinality strings are dictionary encoded, which keeps them small in memory and on disk.
+_DICT_STRING = pa.dictionary(pa.int32(), pa.string())
+_TIMESTAMP = pa.timestamp("us", tz="UTC")
+
+HOST_SCHEMA = pa.schema(
+    [
+        ("id", pa.int64()),
+        ("asset_id", pa.int64()),
+        ("ip", pa.string()),
+        ("ipv6", pa.string()),
+        ("tracking_method", _DICT_STRING),
+        ("network_id", pa.int64()),
+        ("os", _DICT_STRING),
+        ("os_cpe", _DICT_STRING),
+        ("dns", pa.string()),
+        ("dns_hostname", pa.string()),
+        ("dns_domain", _DICT_STRING),
+        ("dns_fqdn", pa.string()),
+        ("cloud_provider", _DICT_STRING),
+        ("cloud_service", _DICT_STRING),
+        ("cloud_resource_id", pa.string()),
+        ("ec2_instance_id", pa.string()),
+        ("netbios", pa.string()),
+        ("qg_hostid", pa.string()),
+        ("last_scan_datetime", _TIMESTAMP),
+        ("last_vm_scanned_date", _TIMESTAMP),
+        ("last_vm_scanned_duration", pa.int64()),
+        ("last_vm_auth_scanned_date", _TIMESTAMP),
+        ("last_vm_auth_scanned_duration", pa.int64()),
+        ("last_pc_scanned_date", _TIMESTAMP),
+        ("tag_ids", pa.list_(pa.int64())),
+        ("tag_names", pa.list_(_DICT_STRING)),
+    ]
+)
+
+DETECTION_SCHEMA = pa.schema(
+    [
+        ("host_id", pa.int64()),
+        ("unique_vuln_id", pa.int64()),
+        ("qid", pa.int64()),
+        ("type", _DICT_STRING),
+        ("severity", pa.int8()),
+        ("port", pa.int32()),
+        ("protocol", _DICT_STRING),
+        ("fqdn", pa.string()),
+        ("ssl", pa.bool_()),
+        ("instance", pa.string()),
+        ("results", pa.string()),
+        ("status", _DICT_STRING),
+        ("first_found_datetime", _TIMESTAMP),
+        ("last_found_datetime", _TIMESTAMP),
+        ("qds_severity", _DICT_STRING),
+        ("qds_score", pa.int16()),
+        ("times_found", pa.int64()),
+        ("last_test_datetime", _TIMESTAMP),
+        ("last_update_datetime", _TIMESTAMP),
+        ("last_fixed_datetime", _TIMESTAMP),
+        ("first_reopened_datetime", _TIMESTAMP),
+        ("last_reopened_datetime", _TIMESTAMP),
+        ("times_reopened", pa.int64()),
+        ("service", _DICT_STRING),
+        ("is_ignored", pa.bool_()),
+        ("is_disabled", pa.bool_()),
+        ("affect_running_kernel", pa.bool_()),
+        ("affect_running_service", pa.bool_()),
+        ("affect_exploitable_config", pa.bool_()),
+        ("last_processed_datetime", _TIMESTAMP),
+        ("asset_cve", pa.string()),
+    ]
+)
+
+MAP_IP_SCHEMA = pa.schema(
+    [
+        ("report_ref", _DICT_STRING),
+        ("value", pa.string()),
+        ("name", pa.string()),
+        ("type", _DICT_STRING),
+        ("os", _DICT_STRING),
+        ("account", _DICT_STRING),
+        ("netbios", pa.string()),
+        ("network", _DICT_STRING),
+        ("network_id", _DICT_STRING),
+        ("port", pa.list_(pa.struct([("value", pa.string()), ("port", pa.string())]))),
+        (
+            "discovery",
+            pa.list_(pa.struct([("method", pa.string()), ("discovery", pa.string())])),
+        ),
+        ("link", pa.list_(pa.struct([("value", pa.string()), ("link", pa.string())]))),
+    ]
+)
+
+# Columns copied as-is from the output models.  The remaining columns are flattened from nested
+# models below.
+_HOST_FIELDS = [
+    name
+    for name in HOST_SCHEMA.names
+    if name in host_list_vm_detection_output.Host.model_fields
+]
+_DETECTION_FIELDS = [
+    name
+    for name in DETECTION_SCHEMA.names
+    if name in host_list_vm_detection_output.Detection.model_fields
+]
+
+
+def _str_or_none(value: Any) -> str | None:
+    return None if value is None else str(value)
+
+
+def to_record_batches(
+    hosts: list[host_list_vm_detection_output.Host],
+) -> tuple[pa.RecordBatch, pa.RecordBatch]:
+    """Convert hosts and their detections to Arrow record batches.
+
+    Args:
+        hosts (list[host_list_vm_detection_output.Host]): Hosts, as returned by
+            VmdrAPI.host_list_vm_detection.
+
+    Returns:
+        tuple[pa.RecordBatch, pa.RecordBatch]: A batch of hosts following HOST_SCHEMA and a batch
+            of detections following DETECTION_SCHEMA.  Detections are linked to hosts by host_id.
+    """
+    host_columns: dict[str, list[Any]] = {name: [] for name in HOST_SCHEMA.names}
+    detection_columns: dict[str, list[Any]] = {
+        name: [] for name in DETECTION_SCHEMA.names
+    }
+
+    for host in hosts:
+        for name in _HOST_FIELDS:
+            host_columns[name].append(getattr(host, name))
+        dns_data = host.dns_data
+        host_columns["dns_hostname"].append(dns_data.hostname if dns_data else None)
+        host_columns["dns_domain"].append(dns_data.domain if dns_data else None)
+        host_columns["dns_fqdn"].append(dns_data.fqdn if dns_data else None)
+        host_columns["tag_ids"].append([tag.tag_id for tag in host.tags])
+        host_columns["tag_names"].append([tag.name for tag in host.tags])
+
+        for detection in host.detections:
+            detection_columns["host_id"].append(host.id)
+            for name in _DETECTION_FIELDS:
+                detection_columns[name].append(getattr(detection, name))
+            qds = detection.qds
+            detection_columns["qds_severity"].append(qds.severity if qds else None)
+            detection_columns["qds_score"].append(qds.score if qds else None)
+
+    host_columns["ip"] = [_str_or_none(ip) for ip in host_columns["ip"]]
+    host_columns["ipv6"] = [_str_or_none(ip) for ip in host_columns["ipv6"]]
+
+    host_batch = pa.RecordBatch.from_arrays(
+        [pa.array(host_columns[f.name], type=f.type) for f in HOST_SCHEMA],
+        schema=HOST_SCHEMA,
+    )
+    detection_batch = pa.RecordBatch.from_arrays(
+        [pa.array(detection_columns[f.name], type=f.type) for f in DETECTION_SCHEMA],
+        schema=DETECTION_SCHEMA,
+    )
+    return host_batch, detection_batch
+
+
+def map_ips_to_record_batch(
+    ips: list[map_report.Ip], report_ref: str
+) -> pa.RecordBatch:
+    """Convert the hosts of a map report to an Arrow record batch.
+
+    Args:
+        ips (list[map_report.Ip]): Hosts, as yielded by VmdrAPI.iter_map_report.
+        report_ref (str): Reference of the map report the hosts are from.
+
+    Returns:
+        pa.RecordBatch: A batch of hosts following MAP_IP_SCHEMA.
+    """
+    columns: dict[str, list[Any]] = {name: [] for name in MAP_IP_SCHEMA.names}
+    for ip in ips:
+        row = ip.model_dump()
+        columns["report_ref"].append(report_ref)
+        for name in MAP_IP_SCHEMA.names[1:]:
+            columns[name].append(row[name])
+    return pa.RecordBatch.from_arrays(
+        [pa.array(columns[f.name], type=f.type) for f in MAP_IP_SCHEMA],
+        schema=MAP_IP_SCHEMA,
+    )
+
+
+class HostListVMDetectionArrow(vmdr.VmdrAPI):
+    """Qualys VMDR Host List Detection Arrow Class.  Contains methods for exporting host
+    detections to Arrow record batches and Parquet datasets.
+    """
+
+    def record_batches(
+        self, **kwargs: Any
+    ) -> Iterator[tuple[pa.RecordBatch, pa.RecordBatch]]:
+        """Page through host_list_vm_detection, yielding one pair of record batches per page.
+
+        Args:
+            **kwargs (Any): Keyword arguments to pass to host_list_vm_detection.
+
+        Yields:
+            tuple[pa.RecordBatch, pa.RecordBatch]: The hosts and detections of a single page.
+        """
+        kwargs.setdefault("truncation_limit", 1000)
+        truncated = True
+        next_id_min = kwargs.pop("id_min", None)
+        while truncated:
+            kwargs["id_min"] = next_id_min
+            hosts, truncated, next_id_min = self.host_list_vm_detection(**kwargs)
+            yield to_record_batches(hosts)
+
+    def write_parquet(
+        self,
+        directory: str | pathlib.Path,
+        *,
+        partition_by: list[str] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """Export hosts and detections to Parquet datasets.
+
+        Hosts are written to directory/host and detections to directory/detection, one file (per
+        partition) for each page returned by the API, so memory use is bounded by the page size.
+        Existing host and detection datasets in the directory are deleted once the first page
+        arrives, so no files from an earlier export are left behind.
+
+        Args:
+            directory (str | pathlib.Path): Directory to write the datasets to.
+            partition_by (list[str] | None, optional): Detection columns to partition the detection
+                dataset by, using Hive-style directories (e.g. ["status"] or ["severity"]).
+                Defaults to None, which writes an unpartitioned dataset.
+            **kwargs (Any): Keyword arguments to pass to host_list_vm_detection.
+        """
+        directory = pathlib.Path(directory)
+        partitioning = (
+            ds.partitioning(
+                pa.schema([DETECTION_SCHEMA.field(name) for name in partition_by]),
+                flavor="hive",
+            )
+            if partition_by
+            else None
+        )
+
+        for page, (host_batch, detection_batch) in enumerate(
+            self.record_batches(**kwargs)
+        ):
+            if page == 0:
+                # Each page is written alongside the previous ones, so stale files from a
+                # larger export have to be removed up front.
+                for dataset in ("host", "detection"):
+                    shutil.rmtree(directory / dataset, ignore_errors=True)
+            ds.write_dataset(
+                host_batch,
+                directory / "host",
+                format="parquet",
+                basename_template=f"part-{page}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+            )
+            ds.write_dataset(
+                detection_batch,
+                directory / "detection",
+                format="parquet",
+                partitioning=partitioning,
+                basename_template=f"part-{page}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+            )
+
+
+class MapReportArrow(vmdr.VmdrAPI):
+    """Qualys VMDR Map Report Arrow Class.  Contains methods for exporting map reports to Arrow
+    record batches and Parquet datasets.
+    """
+
+    def record_batches(
+        self, *, ref: str, batch_size: int = 10000
+    ) -> Iterator[pa.RecordBatch]:
+        """Stream a saved map report, yielding its hosts in record batches.
+
+        Args:
+            ref (str): Reference of the map report, e.g. from map_report_list.
+            batch_size (int, optional): Number of hosts per batch.  Defaults to 10000.
+
+        Yields:
+            pa.RecordBatch: The hosts, following MAP_IP_SCHEMA.
+        """
+        for ips in qutils.chunked(self.iter_map_report(ref=ref), batch_size):
+            yield map_ips_to_record_batch(ips, ref)
+
+    def write_parquet(
+        self,
+        directory: str | pathlib.Path,
+        *,
+        ref: str,
+        batch_size: int = 10000,
+    ) -> None:
+        """Export the hosts of a saved map report to a Parquet dataset.
+
+        The report is streamed and written batch by batch, so memory use is bounded by
+        batch_size rather than the size of the report.  Existing data in the directory is
+        deleted.
+
+        Args:
+            directory (str | pathlib.Path): Directory to write the dataset to.
+            ref (str): Reference of the map report, e.g. from map_report_list.
+            batch_size (int, optional): Number of hosts per batch.  Defaults to 10000.
+        """
+        ds.write_dataset(
+            self.record_batches(ref=ref, batch_size=batch_size),
+            pathlib.Path(directory),
+            schema=MAP_IP_SCHEMA,
+            format="parquet",
+            existing_data_behavior="delete_matching",
+        )
@@ -0,0 +1,222 @@
+"""
+Index of the IP addresses of VMDR asset groups, for finding the asset groups containing an IP.
+
+The IPs, ranges and networks of every asset group are converted into sorted, non-overlapping
+integer intervals held in NumPy arrays, each mapped to the asset groups covering it, so lookups
+are a binary search instead of a loop over every group.  The index can be saved to and loaded
+from a .npz file.  Requires the optional numpy dependency (pip install qualyspy[analytics]).
+
+Typical usage example:
+api = vmdr.VmdrAPI()
+index = vmdr_asset_group_index.AssetGroupIndex.from_asset_groups(api.asset_group_list())
+group_ids = index.lookup("10.0.0.1")
+"""
+
+import collections
+import ipaddress
+import os
+from typing import Any, Iterable
+
+from . import qutils
+from .models.vmdr import asset_group_list_output
+from .vmdr import asset_group_ips
+
+try:
+    import numpy as np
+    import numpy.typing as npt
+except ImportError as e:
+    raise ImportError(
+        "qualyspy.vmdr_asset_group_index requires numpy.  Install it with: pip install qualyspy[analytics]"
+    ) from e
+
+IPLike = str | qutils.IPAddress
+
+# IPv4 addresses are stored as integers.  IPv6 addresses don't fit in a NumPy integer, so they
+# are stored as 16 big-endian bytes, which sort in the same order as the addresses.
+_DTYPES = {4: np.dtype(np.uint64), 6: np.dtype("S16")}
+
+
+def _key(ip: qutils.IPAddress) -> Any:
+    return int(ip) if ip.version == 4 else ip.packed
+
+
+class _Segments:
+    """Disjoint, sorted intervals of one IP version and the asset groups covering each."""
+
+    def __init__(
+        self,
+        starts: npt.NDArray[Any],
+        ends: npt.NDArray[Any],
+        offsets: npt.NDArray[np.int64],
+        group_ids: npt.NDArray[np.int64],
+    ) -> None:
+        self.starts = starts
+        self.ends = ends
+        # The groups of segment i are group_ids[offsets[i]:offsets[i + 1]].
+        self.offsets = offsets
+        self.group_ids = group_ids
+
+    @classmethod
+    def build(cls, version: int, intervals: list[tuple[Any, Any, int]]) -> "_Segments":
+        """Split overlapping (first, last, group ID) intervals into disjoint segments."""
+        # Sweep over the boundaries, tracking the groups covering the current position.
+        events: dict[Any, list[tuple[int, int]]] = collections.defaultdict(list)
+        for first, last, group_id in intervals:
+            events[int(first)].append((group_id, 1))
+            events[int(last) + 1].append((group_id, -1))
+        active: collections.Counter[int] = collections.Counter()
+        starts, ends, offsets, group_ids = [], [], [0], []
+        points = sorted(events)
+        for point, next_point in zip(points, points[1:]):
+            for group_id, delta in events[point]:
+                active[group_id] += delta
+            covering = sorted(group_id for group_id, n in active.items() if n > 0)
+            if covering:
+                starts.append(point)
+                ends.append(next_point - 1)
+                group_ids += covering
+                offsets.append(len(group_ids))
+
+        def _array(values: list[int]) -> npt.NDArray[Any]:
+            if version == 4:
+                return np.array(values, dtype=_DTYPES[4])
+            return np.array(
+                [value.to_bytes(16, "big") for value in values], dtype=_DTYPES[6]
+            )
+
+        return cls(
+            _array(starts),
+            _array(ends),
+            np.array(offsets, dtype=np.int64),
+            np.array(group_ids, dtype=np.int64),
+        )
+
+    def find(self, keys: npt.NDArray[Any]) -> npt.NDArray[np.intp]:
+        """Get the index of the segment containing each key, or -1 if there is none."""
+        index = np.searchsorted(self.starts, keys, side="right") - 1
+        found = index >= 0
+        found[found] = keys[found] <= self.ends[index[found]]
+        return np.where(found, index, -1)
+
+    def groups(self, segment: int) -> npt.NDArray[np.int64]:
+        if segment < 0:
+            return self.group_ids[:0]
+        return self.group_ids[self.offsets[segment] : self.offsets[segment + 1]]
+
+
+class AssetGroupIndex:
+    """Index of the IP addresses of asset groups.
+
+    Use from_asset_groups to build an index, or load to read one saved with save.
+    """
+
+    def __init__(self, segments: dict[int, _Segments]) -> None:
+        self._segments = segments
+
+    @classmethod
+    def from_asset_groups(
+        cls, asset_groups: Iterable[asset_group_list_output.AssetGroup]
+    ) -> "AssetGroupIndex":
+        """Build an index from asset groups, as returned by VmdrAPI.asset_group_list.
+
+        Args:
+            asset_groups (Iterable[asset_group_list_output.AssetGroup]): The asset groups.
+
+        Returns:
+            AssetGroupIndex: The index.
+        """
+        intervals: dict[int, list[tuple[Any, Any, int]]] = {4: [], 6: []}
+        for asset_group in asset_groups:
+            ranges = qutils.collapse_ip_ranges(asset_group_ips(asset_group))
+            for first, last in ranges:
+                intervals[first.version].append((first, last, asset_group.id))
+        return cls(
+            {
+                version: _Segments.build(version, intervals[version])
+                for version in intervals
+            }
+        )
+
+    def lookup(self, ip: IPLike) -> npt.NDArray[np.int64]:
+        """Get the IDs of the asset groups containing an IP.
+
+        Args:
+            ip (str | ipaddress.IPv4Address | ipaddress.IPv6Address): The IP.
+
+        Returns:
+            npt.NDArray[np.int64]: The asset group IDs, in ascending order.
+        """
+        address = ipaddress.ip_address(ip)
+        segments = self._segments[address.version]
+        keys = np.array([_key(address)], dtype=_DTYPES[address.version])
+        return segments.groups(int(segments.find(keys)[0]))
+
+    def lookup_many(self, ips: Iterable[IPLike]) -> list[npt.NDArray[np.int64]]:
+        """Get the IDs of the asset groups containing each of many IPs.
+
+        The IPs are searched for all at once, per IP version.
+
+        Args:
+            ips (Iterable[str | ipaddress.IPv4Address | ipaddress.IPv6Address]): The IPs.
+
+        Returns:
+            list[npt.NDArray[np.int64]]: For each IP, in the same order, the asset group IDs in
+                ascending order.
+        """
+        addresses = [ipaddress.ip_address(ip) for ip in ips]
+        found = np.full(len(addresses), -1, dtype=np.intp)
+        for version, segments in self._segments.items():
+            positions = np.array(
+                [
+                    i
+                    for i, address in enumerate(addresses)
+                    if address.version == version
+                ],
+                dtype=np.intp,
+            )
+            if len(positions):
+                keys = np.array(
+                    [_key(addresses[i]) for i in positions], dtype=_DTYPES[version]
+                )
+                found[positions] = segments.find(keys)
+        return [
+            self._segments[address.version].groups(int(segment))
+            for address, segment in zip(addresses, found)
+        ]
+
+    def save(self, path: str | os.PathLike[str]) -> None:
+        """Save the index to a .npz file.
+
+        Args:
+            path (str | os.PathLike[str]): Path of the file.
+        """
+        arrays = {}
+        for version, segments in self._segments.items():
+            arrays[f"v{version}_starts"] = segments.starts
+            arrays[f"v{version}_ends"] = segments.ends
+            arrays[f"v{version}_offsets"] = segments.offsets
+            arrays[f"v{version}_group_ids"] = segments.group_ids
+        np.savez(path, **arrays)  # type: ignore[arg-type]
+
+    @classmethod
+    def load(cls, path: str | os.PathLike[str]) -> "AssetGroupIndex":
+        """Load an index saved with save.
+
+        Args:
+            path (str | os.PathLike[str]): Path of the file.
+
+        Returns:
+            AssetGroupIndex: The index.
+        """
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls(
+                {
+                    version: _Segments(
+                        arrays[f"v{version}_starts"],
+                        arrays[f"v{version}_ends"],
+                        arrays[f"v{version}_offsets"],
+                        arrays[f"v{version}_group_ids"],
+                    )
+                    for version in _DTYPES
+                }
+            )
@@ -0,0 +1,364 @@
+"""
+Watch many VMDR scans until they finish, with one vm_scan_list call per poll.
+
+Scans are tracked by reference.  Each poll lists the scans launched since the earliest tracked
+one, so the number of API calls per poll doesn't grow with the number of scans watched.  The
+time between polls depends on the states of the tracked scans, and backs off while none of them
+change.  Each watched scan gets a Future, resolved with the scan once it finishes; use
+asyncio.wrap_future to await it from asyncio code.
+
+Typical usage example:
+api = vmdr.VmdrAPI()
+watcher = vmdr_scan_watcher.ScanWatcher(api)
+launch = api.launch_vm_scan(scan_title="Scan", option_title="Profile", fqdn="example.com")
+future = watcher.watch(vmdr_scan_watcher.launched_scan_ref(launch))
+watcher.run()
+scan = future.result()
+"""
+
+import dataclasses
+import datetime
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Mapping
+
+from .models.vmdr import scan_list_output, simple_return
+from .vmdr import VmdrAPI
+
+# States after which a scan doesn't change anymore.
+TERMINAL_STATES = frozenset({"Finished", "Error", "Canceled", "Interrupted"})
+
+# Seconds to wait between polls while a tracked scan is in each state.  The shortest interval
+# among the tracked scans is used.  "Finished" only applies to scans waiting to be processed.
+DEFAULT_INTERVALS: Mapping[str, float] = {
+    "Submitted": 30.0,
+    "Queued": 120.0,
+    "Loading": 60.0,
+    "Running": 60.0,
+    "Paused": 600.0,
+    "Finished": 60.0,
+}
+# Interval for scans in other states, or not seen yet.
+_DEFAULT_INTERVAL = 60.0
+
+
+def launched_scan_ref(launch: simple_return.SimpleReturn) -> str:
+    """Get the reference of the scan launched by VmdrAPI.launch_vm_scan.
+
+    Args:
+        launch (simple_return.SimpleReturn): The response of launch_vm_scan.
+
+    Returns:
+        str: The scan reference, e.g. "scan/1700000000.12345".
+
+    Raises:
+        ValueError: Raised if the response has no scan reference.
+    """
+    for item in launch.response.item_list or []:
+        if item.key == "REFERENCE":
+            return item.value
+    raise ValueError("Launch response has no scan reference.")
+
+
+@dataclasses.dataclass
+class _Tracked:
+    future: "Future[scan_list_output.Scan]"
+    # Earliest time the scan can have been launched at.
+    since: datetime.datetime
+    scan: scan_list_output.Scan | None = None
+    looked_up: bool = False
+
+
+def _state(scan: scan_list_output.Scan | None) -> str | None:
+    if scan is None or scan.status is None:
+        return None
+    return scan.status.state
+
+
+def _progress(scan: scan_list_output.Scan | None) -> tuple[str | None, bool | None]:
+    if scan is None:
+        return None, None
+    return _state(scan), scan.processed
+
+
+class ScanWatcher:
+    """Track VMDR scans until they finish, polling all of them with one API call.
+
+    Drive the watcher with run, which returns once every watched scan has finished, or with
+    start and stop, which poll from a background thread.  poll can also be called directly.
+
+    Attributes:
+        api (VmdrAPI): The API to poll with.
+        intervals (Mapping[str, float]): Seconds between polls for each scan state.
+        backoff (float): Factor the interval is multiplied by after each poll where no tracked
+            scan changed.
+        max_interval (float): Longest time between polls, in seconds, when backing off.
+        wait_for_processed (bool): Whether finished scans are only complete once processed.
+        clock_skew (datetime.timedelta): Margin subtracted from the time a scan is watched at
+            to get the earliest time it can have been launched at.
+        max_errors (int): Number of polls in a row that can fail before run gives up.
+    """
+
+    def __init__(
+        self,
+        api: VmdrAPI,
+        *,
+        intervals: Mapping[str, float] | None = None,
+        backoff: float = 1.5,
+        max_interval: float = 900.0,
+        wait_for_processed: bool = False,
+        clock_skew: datetime.timedelta = datetime.timedelta(hours=1),
+        max_errors: int = 5,
+    ) -> None:
+        """Initialize the watcher.
+
+        Args:
+            api (VmdrAPI): The API to poll with.
+            intervals (Mapping[str, float], optional): Seconds between polls for each scan
+                state.  Defaults to None, which uses DEFAULT_INTERVALS.
+            backoff (float, optional): Factor the interval is multiplied by after each poll
+                where no tracked scan changed.  Defaults to 1.5.
+            max_interval (float, optional): Longest time between polls, in seconds, when
+                backing off.  Defaults to 900.
+            wait_for_processed (bool, optional): Whether finished scans are only complete once
+                their results are processed.  Defaults to False.
+            clock_skew (datetime.timedelta, optional): Margin subtracted from the time a scan is
+                watched at to get the earliest time it can have been launched at.  Scans
+                launched earlier are looked up on their own once.  Defaults to one hour.
+            max_errors (int, optional): Number of polls in a row that can fail before run
+                fails every watched scan with the last error.  Defaults to 5.
+        """
+        self.api = api
+        self.intervals = DEFAULT_INTERVALS if intervals is None else intervals
+        self.backoff = backoff
+        self.max_interval = max_interval
+        self.wait_for_processed = wait_for_processed
+        self.clock_skew = clock_skew
+        self.max_errors = max_errors
+        self._tracked: dict[str, _Tracked] = {}
+        self._lock = threading.Lock()
+        self._unchanged_polls = 0
+        self._errors = 0
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self) -> "ScanWatcher":
+        self.start()
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.stop()
+
+    @property
+    def pending(self) -> list[str]:
+        """References of the scans being watched that haven't finished yet."""
+        with self._lock:
+            return [
+                ref
+                for ref, tracked in self._tracked.items()
+                if not tracked.future.done()
+            ]
+
+    def watch(
+        self,
+        scan_ref: str,
+        callback: Callable[[scan_list_output.Scan], None] | None = None,
+    ) -> "Future[scan_list_output.Scan]":
+        """Start watching a scan.
+
+        Watching a scan that is already watched returns the same Future.  Cancelling the Future
+        stops watching the scan.
+
+        Args:
+            scan_ref (str): Reference of the scan, e.g. from launched_scan_ref.
+            callback (Callable[[scan_list_output.Scan], None], optional): Function called with
+                the scan once it finishes.  Defaults to None.
+
+        Returns:
+            Future[scan_list_output.Scan]: Resolved with the scan once it finishes.
+        """
+        with self._lock:
+            was_idle = not self._tracked
+            if scan_ref not in self._tracked:
+                since = datetime.datetime.now(datetime.timezone.utc) - self.clock_skew
+                self._tracked[scan_ref] = _Tracked(future=Future(), since=since)
+                self._unchanged_polls = 0
+            future = self._tracked[scan_ref].future
+
+        if callback is not None:
+            future.add_done_callback(
+                lambda f: (
+                    callback(f.result())
+                    if not f.cancelled() and f.exception() is None
+                    else None
+                )
+            )
+        if was_idle:
+            self._wake.set()
+        return future
+
+    def poll(self) -> list[scan_list_output.Scan]:
+        """Get the state of every watched scan with one vm_scan_list call.
+
+        Scans missing from the list, because they were launched before they were watched, are
+        looked up on their own, once each.
+
+        Returns:
+            list[scan_list_output.Scan]: The scans that finished since the last poll.
+        """
+        with self._lock:
+            for ref in [
+                ref for ref, t in self._tracked.items() if t.future.cancelled()
+            ]:
+                del self._tracked[ref]
+            if not self._tracked:
+                return []
+            since = min(tracked.since for tracked in self._tracked.values())
+
+        response = self.api.vm_scan_list(launched_after_datetime=since)
+        scans = {scan.ref: scan for scan in response.response.scan_list or []}
+
+        with self._lock:
+            missing = [
+                ref
+                for ref, tracked in self._tracked.items()
+                if ref not in scans and not tracked.looked_up
+            ]
+        for ref in missing:
+            scan_list = self.api.vm_scan_list(scan_ref=ref).response.scan_list
+            if scan_list:
+                scans[ref] = scan_list[0]
+            with self._lock:
+                tracked = self._tracked.get(ref)
+                if tracked is None:
+                    continue
+                tracked.looked_up = True
+                if not scan_list:
+                    del self._tracked[ref]
+                    if tracked.future.set_running_or_notify_cancel():
+                        tracked.future.set_exception(ValueError(f"No scan {ref}."))
+
+        finished = []
+        changed = False
+        with self._lock:
+            for ref, scan in scans.items():
+                tracked = self._tracked.get(ref)
+                if tracked is None:
+                    continue
+                launched = scan.launch_datetime
+                if launched.tzinfo is None:
+                    launched = launched.replace(tzinfo=datetime.timezone.utc)
+                tracked.since = min(tracked.since, launched)
+                changed = changed or _progress(tracked.scan) != _progress(scan)
+                tracked.scan = scan
+                if self._is_finished(scan):
+                    del self._tracked[ref]
+                    finished.append((tracked.future, scan))
+            self._unchanged_polls = 0 if changed else self._unchanged_polls + 1
+
+        # Resolved outside the lock, since callbacks may watch more scans.
+        for future, scan in finished:
+            if future.set_running_or_notify_cancel():
+                future.set_result(scan)
+        return [scan for _, scan in finished]
+
+    def next_interval(self) -> float:
+        """Get the number of seconds to wait before the next poll.
+
+        Returns:
+            float: The shortest interval among the states of the watched scans, backed off for
+                each poll in a row where no scan changed.
+        """
+        with self._lock:
+            states = [_state(tracked.scan) for tracked in self._tracked.values()]
+            unchanged_polls = self._unchanged_polls
+        interval = min(
+            (self.intervals.get(state or "", _DEFAULT_INTERVAL) for state in states),
+            default=_DEFAULT_INTERVAL,
+        )
+        return min(
+            interval * self.backoff**unchanged_polls, max(interval, self.max_interval)
+        )
+
+    def run(self, timeout: float | None = None) -> bool:
+        """Poll until every watched scan has finished.
+
+        Args:
+            timeout (float, optional): Longest time to run for, in seconds.  Defaults to None,
+                which runs until every scan has finished.
+
+        Returns:
+            bool: Whether every watched scan finished.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.pending:
+            self._step()
+            if not self.pending:
+                break
+            delay = self.next_interval()
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                delay = min(delay, remaining)
+            time.sleep(delay)
+        return True
+
+    def start(self) -> None:
+        """Start polling from a background thread, until stop is called."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._serve, name="ScanWatcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread started by start, waiting for it to exit."""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _is_finished(self, scan: scan_list_output.Scan) -> bool:
+        state = _state(scan)
+        if state is None:
+            return scan.processed
+        if state not in TERMINAL_STATES:
+            return False
+        return not (
+            self.wait_for_processed and state == "Finished" and not scan.processed
+        )
+
+    def _step(self) -> None:
+        """Poll once, failing every watched scan after max_errors failed polls in a row."""
+        try:
+            self.poll()
+            self._errors = 0
+        except Exception as e:
+            self._errors += 1
+            with self._lock:
+                self._unchanged_polls += 1
+            self.api.log.warning("Scan poll %d failed: %s", self._errors, e)
+            if self._errors >= self.max_errors:
+                with self._lock:
+                    tracked = list(self._tracked.values())
+                    self._tracked.clear()
+                for t in tracked:
+                    if t.future.set_running_or_notify_cancel():
+                        t.future.set_exception(e)
+                self._errors = 0
+
+    def _serve(self) -> None:
+        while not self._stopped.is_set():
+            self._wake.clear()
+            if self.pending:
+                self._step()
+            if not self.pending:
+                self._wake.wait()
+            else:
+                self._wake.wait(self.next_interval())
@@ -56,6 +56,16 @@ class TestTags(unittest.TestCase):
 
         self.assertEqual(update_resp.response_code, "SUCCESS")
 
+    def test_update_assets(self):
+        api = asset_mgmt_tagging.AssetMgmtTaggingAPI()
+        results = api.update_assets(
+            asset_ids=[14355608, 14355608], add_tags=[12158745], batch_size=1
+        )
+
+        self.assertEqual(len(results), 1)
+        self.assertTrue(results[0].ok)
+        self.assertEqual(results[0].result.response_code, "SUCCESS")
+
     def test_search_assets(self):
         api = asset_mgmt_tagging.AssetMgmtTaggingAPI()
         criteria = asset_request.Criteria(
@@ -65,3 +75,36 @@ class TestTags(unittest.TestCase):
         search_resp = api.search_assets(criteria=[criteria])
         
         self.assertEqual(search_resp.count, 1)
+
+    def test_iter_assets(self):
+        api = asset_mgmt_tagging.AssetMgmtTaggingAPI()
+        criteria = asset_request.Criteria(
+            field="tagName", operator="EQUALS", value="Test Search Assets"
+        )
+        assets = list(api.iter_assets(criteria=[criteria], page_size=1))
+
+        self.assertEqual(len(assets), api.count_assets(criteria=[criteria]))
+
+    def test_iter_tags(self):
+        api = asset_mgmt_tagging.AssetMgmtTaggingAPI()
+        tags = list(api.iter_tags(page_size=100))
+        serial = list(api.iter_tags(page_size=100, workers=1))
+
+        self.assertEqual(len(tags), api.count_tags())
+        self.assertEqual([tag.id for tag in tags], [tag.id for tag in serial])
+
+    def test_tag_index(self):
+        api = asset_mgmt_tagging.AssetMgmtTaggingAPI()
+        index = api.tag_index()
+        add_resp = api.create_tag(name="Tag Index Parent", children=["Tag Index Child"])
+        parent_id = add_resp.data[0].tag.id
+
+        self.assertEqual(index.id_of("Tag Index Parent"), parent_id)
+        self.assertEqual(
+            [tag.name for tag in index.children(parent_id)], ["Tag Index Child"]
+        )
+
+        api.delete_tag(parent_id)
+
+        self.assertNotIn(parent_id, index)
+        self.assertEqual(index.by_name("Tag Index Child"), [])
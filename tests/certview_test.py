@@ -5,12 +5,16 @@ import inspect
 import os
 import sys
 import unittest
+from unittest import mock
+
+import sqlalchemy as sa
 
 currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
 parentdir = os.path.dirname(currentdir)
 sys.path.insert(0, parentdir)
 
 from qualyspy import certview  # noqa: E402
+from qualyspy.models.certview import instances_orm  # noqa: E402
 
 
 class TestCertViewAPI(unittest.TestCase):
@@ -33,4 +37,51 @@ class TestCertViewAPI(unittest.TestCase):
             "quest.uwaterloo.ca",
             "lib.uwaterloo.ca",
         ]
-        api.add_bulk_external_sites(sites=sites)
+        results = api.add_bulk_external_sites(sites=sites, skip_existing=False)
+
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual(sum(len(result.items) for result in results), len(sites))
+
+    def test_add_bulk_external_sites_existing(self):
+        with mock.patch.object(certview.CertViewAPI, "get"):
+            api = certview.CertViewAPI()
+        sites = ["a.example.com", "B.example.com", "10.0.0.1", "a.example.com"]
+        with (
+            mock.patch.object(api, "existing_sites") as existing_sites,
+            mock.patch.object(api, "post") as post,
+        ):
+            post.return_value.content = b""
+            all_sites = api.add_bulk_external_sites(sites=sites)
+            new_sites = api.add_bulk_external_sites(
+                sites=sites,
+                skip_existing=True,
+                existing={"b.example.com", "10.0.0.1"},
+                chunk_size=1,
+            )
+
+        existing_sites.assert_not_called()
+        self.assertEqual(
+            [result.items for result in all_sites],
+            [["a.example.com", "B.example.com", "10.0.0.1"]],
+        )
+        self.assertEqual([result.items for result in new_sites], [["a.example.com"]])
+
+
+class TestCertViewORM(unittest.TestCase):
+    def test_orm_load(self):
+        api = certview.CertViewORM()
+        api.drop()
+        api.init_db()
+        filter_request = certview.FilterRequest(
+            filters=[
+                certview.Filter(field="asset.id", value="42967118", operator="EQUALS"),
+            ],
+        )
+        api.load(filter_request=filter_request, page_size=1, workers=2)
+        api.load(filter_request=filter_request, page_size=1, workers=2)
+        stmt = sa.select(instances_orm.Instance).where(
+            instances_orm.Instance.asset_id == 42967118
+        )
+        result = api.query(stmt)
+
+        self.assertEqual(result[0][0].service, "https")
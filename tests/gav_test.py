@@ -24,6 +24,18 @@ class TestOutputModels(unittest.TestCase):
 
         self.assertEqual(asset.address, ipaddress.ip_address("172.16.76.84"))
 
+    def test_asset_details_many(self):
+        api = gav.GavAPI()
+        results = api.asset_details_many(asset_ids=[61389689, 0, 61389689])
+
+        self.assertEqual(
+            [result.items for result in results], [[61389689], [0], [61389689]]
+        )
+        self.assertEqual(
+            results[0].result.address, ipaddress.ip_address("172.16.76.84")
+        )
+        self.assertTrue(results[1].result is None or not results[1].ok)
+
     def test_all_asset_details(self):
         api = gav.GavAPI()
         assets, _, _ = api.all_asset_details()
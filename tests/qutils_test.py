@@ -0,0 +1,90 @@
+# mypy: ignore-errors
+# type: ignore
+
+import inspect
+import ipaddress
+import os
+import sys
+import unittest
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from qualyspy import qutils  # noqa: E402
+
+
+class TestIds(unittest.TestCase):
+    def test_collapse_ids(self):
+        self.assertEqual(
+            qutils.collapse_ids([9, 3, 1, 2, 2, 7, 8, 11]), ["1-3", "7-9", "11"]
+        )
+        self.assertEqual(qutils.collapse_ids([]), [])
+
+
+def ip_ranges(*ranges):
+    return [
+        (ipaddress.ip_address(first), ipaddress.ip_address(last))
+        for first, last in ranges
+    ]
+
+
+class TestIpRanges(unittest.TestCase):
+    def test_parse_ip_range(self):
+        self.assertEqual(
+            qutils.parse_ip_range("10.0.0.0/30"), ip_ranges(("10.0.0.0", "10.0.0.3"))[0]
+        )
+        self.assertEqual(
+            qutils.parse_ip_range(" 10.0.0.5 - 10.0.0.9 "),
+            ip_ranges(("10.0.0.5", "10.0.0.9"))[0],
+        )
+        with self.assertRaises(ValueError):
+            qutils.parse_ip_range("10.0.0.9-10.0.0.5")
+        with self.assertRaises(ValueError):
+            qutils.parse_ip_range("10.0.0.1-fe80::1")
+
+    def test_collapse_ip_ranges(self):
+        ranges = qutils.collapse_ip_ranges(
+            [
+                "fe80::1",
+                "10.0.0.4-10.0.0.9",
+                "10.0.0.0/30",
+                ipaddress.ip_address("10.0.0.12"),
+                "10.0.0.8-10.0.0.10",
+                "fe80::2",
+            ]
+        )
+
+        self.assertEqual(
+            ranges,
+            ip_ranges(
+                ("10.0.0.0", "10.0.0.10"),
+                ("10.0.0.12", "10.0.0.12"),
+                ("fe80::1", "fe80::2"),
+            ),
+        )
+        self.assertEqual(
+            qutils.format_ip_ranges(ranges),
+            "10.0.0.0-10.0.0.10,10.0.0.12,fe80::1-fe80::2",
+        )
+
+    def test_subtract_ip_ranges(self):
+        ranges = ip_ranges(("10.0.0.0", "10.0.0.10"), ("fe80::1", "fe80::4"))
+        to_remove = ip_ranges(
+            ("10.0.0.0", "10.0.0.1"), ("10.0.0.5", "10.0.0.6"), ("fe80::4", "fe80::9")
+        )
+
+        self.assertEqual(
+            qutils.subtract_ip_ranges(ranges, to_remove),
+            ip_ranges(
+                ("10.0.0.2", "10.0.0.4"),
+                ("10.0.0.7", "10.0.0.10"),
+                ("fe80::1", "fe80::3"),
+            ),
+        )
+        self.assertEqual(qutils.subtract_ip_ranges(ranges, ranges), [])
+        self.assertEqual(qutils.subtract_ip_ranges(ranges, []), ranges)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,14 @@
 # mypy: ignore-errors
 # type: ignore
 
+import datetime
 import inspect
 import ipaddress
 import os
 import sys
+import tempfile
 import unittest
+from unittest import mock
 
 import sqlalchemy as sa
 
@@ -13,8 +16,50 @@ currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentfram
 parentdir = os.path.dirname(currentdir)
 sys.path.insert(0, parentdir)
 
-from qualyspy import vmdr  # noqa: E402
-from qualyspy.models.vmdr import host_list_orm, host_list_vm_detection_orm  # noqa: E402
+from qualyspy import qutils, vmdr, vmdr_scan_watcher  # noqa: E402
+from qualyspy.models import fast_xml  # noqa: E402
+from qualyspy.models.vmdr import (  # noqa: E402
+    asset_group_list_output,
+    host_list_orm,
+    host_list_vm_detection_orm,
+    host_list_vm_detection_output,
+    map_report,
+)
+
+try:
+    import pyarrow.dataset as ds
+
+    from qualyspy import vmdr_arrow  # noqa: E402
+except ImportError:
+    vmdr_arrow = None
+
+try:
+    import numpy as np
+
+    from qualyspy import vmdr_analytics  # noqa: E402
+except ImportError:
+    vmdr_analytics = None
+
+try:
+    from qualyspy import vmdr_asset_group_index  # noqa: E402
+except ImportError:
+    vmdr_asset_group_index = None
+
+
+def read_fixture(name):
+    with open(os.path.join(currentdir, "data", name), "rb") as f:
+        return f.read()
+
+
+def fixture_hosts():
+    root = qutils.xml_root_from_bytes(
+        read_fixture("host_list_vm_detection_output.xml"),
+        "HOST_LIST_VM_DETECTION_OUTPUT",
+        huge_tree=True,
+    )
+    return fast_xml.decode(
+        host_list_vm_detection_output.HostListVMDetectionOutput, root
+    ).response.host_list
 
 
 class TestOutputModels(unittest.TestCase):
@@ -35,6 +80,27 @@ class TestOutputModels(unittest.TestCase):
 
         self.assertEqual(host.ip, ipaddress.ip_address("172.16.68.91"))
 
+    def test_host_list_chunked(self):
+        api = vmdr.VmdrAPI()
+        ips = ["172.16.68.91", "129.97.128.5", "129.97.85.0/24", "172.16.64.51"]
+        ids = [32381680, 11619472]
+        host_list, _, _ = api.host_list(ips=ips, truncation_limit=0)
+        ids_host_list, _, _ = api.host_list(ids=ids)
+
+        api.filter_chunk_size = 1
+        chunked_host_list, truncated, _ = api.host_list(ips=ips, truncation_limit=0)
+        chunked_ids_host_list, _, _ = api.host_list(ids=ids)
+
+        self.assertFalse(truncated)
+        self.assertEqual(
+            [host.id for host in chunked_host_list],
+            sorted(host.id for host in host_list),
+        )
+        self.assertEqual(
+            [host.id for host in chunked_ids_host_list],
+            sorted(host.id for host in ids_host_list),
+        )
+
     def test_host_list_vm_detection(self):
         api = vmdr.VmdrAPI()
         host_list, _, _ = api.host_list_vm_detection(
@@ -70,6 +136,28 @@ class TestOutputModels(unittest.TestCase):
 
         self.assertTrue(scan.ref.startswith("scan/"))
 
+    def test_scan_watcher(self):
+        api = vmdr.VmdrAPI()
+        scans = api.vm_scan_list().response.scan_list
+        finished = [
+            scan
+            for scan in scans
+            if scan.status is not None
+            and scan.status.state in vmdr_scan_watcher.TERMINAL_STATES
+        ][:5]
+        watcher = vmdr_scan_watcher.ScanWatcher(api)
+        completed = []
+        futures = [
+            watcher.watch(scan.ref, callback=completed.append) for scan in finished
+        ]
+
+        self.assertTrue(watcher.run(timeout=60))
+        self.assertEqual(
+            [future.result().ref for future in futures],
+            [scan.ref for scan in finished],
+        )
+        self.assertEqual(len(completed), len(finished))
+
     def test_map_report_list(self):
         api = vmdr.VmdrAPI()
         reports = api.map_report_list(last=True)
@@ -86,6 +174,15 @@ class TestOutputModels(unittest.TestCase):
 
         self.assertEqual(report.value, report_ref)
 
+    def test_iter_map_report(self):
+        api = vmdr.VmdrAPI()
+        report_ref = api.map_report_list(last=True).report_list[0].ref
+
+        report = api.download_saved_map_report(ref=report_ref)
+        ips = list(api.iter_map_report(ref=report_ref))
+
+        self.assertEqual(ips, report.ip or [])
+
     def test_asset_group_list(self):
         api = vmdr.VmdrAPI()
         asset_groups = api.asset_group_list()
@@ -111,6 +208,31 @@ class TestOutputModels(unittest.TestCase):
 
             self.assertEqual(edit.response.text, "Asset Group Updated Successfully")
 
+    def test_update_asset_group_ips(self):
+        api = vmdr.VmdrAPI()
+        test_group = next(
+            ag for ag in api.asset_group_list() if ag.title == "QualysPy Test"
+        )
+        ips = ["129.97.83.104", "172.16.76.49", "172.19.15.0/27"]
+        api.edit_asset_group(id=test_group.id, set_ips=ips)
+
+        results = api.update_asset_groups_ips(
+            ips={test_group.id: ["129.97.83.104", "172.19.15.0/28"]}
+        )
+        self.assertTrue(results[0].ok, results[0].error)
+        test_group = next(ag for ag in api.asset_group_list() if ag.id == test_group.id)
+        self.assertEqual(
+            qutils.collapse_ip_ranges(vmdr.asset_group_ips(test_group)),
+            qutils.collapse_ip_ranges(["129.97.83.104", "172.19.15.0/28"]),
+        )
+        self.assertIsNone(
+            api.update_asset_group_ips(
+                asset_group=test_group, ips=["172.19.15.0/28", "129.97.83.104"]
+            )
+        )
+
+        api.edit_asset_group(id=test_group.id, set_ips=ips)
+
 
 class TestORM(unittest.TestCase):
     def test_orm_host_list(self):
@@ -121,6 +243,17 @@ class TestORM(unittest.TestCase):
         host = result[0][0]
         self.assertEqual(host.ip, ipaddress.ip_address("172.16.76.84"))
 
+    def test_orm_host_list_fast_build(self):
+        api = vmdr.HostListORM()
+        api.load_safe(fast_build=True, unlogged=True, show_tags=True)
+        stmt = sa.select(host_list_orm.Host).where(host_list_orm.Host.id == 11619472)
+        result = api.query(stmt)
+        host = result[0][0]
+        self.assertEqual(host.ip, ipaddress.ip_address("172.16.76.84"))
+        with api.engine.connect() as conn:
+            indexes = sa.inspect(conn).get_indexes("host", schema="qualys_host_list")
+        self.assertIn("ix_host_ip", [index["name"] for index in indexes])
+
     def test_orm_vm_detection(self):
         api = vmdr.HostListVMDetectionORM()
         api.drop()
@@ -133,6 +266,87 @@ class TestORM(unittest.TestCase):
         host = result[0][0]
         self.assertEqual(host.ip, ipaddress.ip_address("172.16.76.84"))
 
+    def test_orm_vm_detection_incremental(self):
+        api = vmdr.HostListVMDetectionORM()
+        api.drop()
+        api.init_db()
+        stmt = sa.select(host_list_vm_detection_orm.Host.content_digest).where(
+            host_list_vm_detection_orm.Host.id == 11619472
+        )
+        api.load(incremental=True, ids=11619472)
+        digest = api.query(stmt)[0][0]
+        api.load(incremental=True, ids=11619472)
+
+        self.assertIsNotNone(digest)
+        self.assertEqual(api.query(stmt)[0][0], digest)
+
+    def test_orm_vm_detection_history(self):
+        api = vmdr.HostListVMDetectionORM()
+        api.drop()
+        api.init_db()
+        History = host_list_vm_detection_orm.DetectionHistory
+        with api.engine.begin() as conn:
+            conn.execute(
+                sa.schema.DropSchema(
+                    History.metadata.schema, cascade=True, if_exists=True
+                )
+            )
+        hosts = fixture_hosts()
+        # Not supported by load yet, see its docstring.
+        for host in hosts:
+            host.metadata = None
+            for detection in host.detections:
+                detection.qds = None
+                detection.qds_factors = []
+        with mock.patch.object(
+            api, "host_list_vm_detection", return_value=(hosts, False, None)
+        ):
+            api.load(incremental=True, history=True)
+            hosts[0].detections[0].status = "Fixed"
+            del hosts[0].detections[1]
+            api.load(incremental=True, history=True)
+        stmt = sa.select(
+            History.unique_vuln_id, History.change, History.status
+        ).order_by(History.recorded_at, History.unique_vuln_id)
+
+        self.assertEqual(
+            [tuple(row) for row in api.query(stmt)],
+            [
+                (2000000001, "added", "Active"),
+                (2000000002, "added", "Fixed"),
+                (2000000003, "added", "New"),
+                (2000000001, "changed", "Fixed"),
+                (2000000002, "removed", "Fixed"),
+            ],
+        )
+
+    def test_orm_stream_query(self):
+        api = vmdr.HostListVMDetectionORM()
+        stmt = sa.select(
+            host_list_vm_detection_orm.Detection.host_id,
+            host_list_vm_detection_orm.Detection.qid,
+        ).where(host_list_vm_detection_orm.Detection.host_id == 11619472)
+        rows = list(api.stream_query(stmt, batch_size=10))
+        partitions = list(api.stream_query(stmt, batch_size=10, partitions=True))
+
+        self.assertEqual(rows, [row for partition in partitions for row in partition])
+        self.assertTrue(all(len(partition) <= 10 for partition in partitions))
+
+    def test_orm_query_output_class(self):
+        api = vmdr.HostListVMDetectionORM()
+        stmt = sa.select(host_list_vm_detection_orm.Host).where(
+            host_list_vm_detection_orm.Host.id == 11619472
+        )
+        hosts = api.query(stmt, output_class=vmdr.host_list_vm_detection_output.Host)
+        detections = api.query(
+            sa.select(host_list_vm_detection_orm.Detection).where(
+                host_list_vm_detection_orm.Detection.host_id == 11619472
+            )
+        )
+
+        self.assertEqual(hosts[0].ip, ipaddress.ip_address("172.16.76.84"))
+        self.assertEqual(len(hosts[0].detections), len(detections))
+
     def test_orm_knowledgebase(self):
         api = vmdr.KnowledgebaseORM()
         api.drop()
@@ -145,6 +359,319 @@ class TestORM(unittest.TestCase):
         vuln = result[0][0]
         self.assertEqual(vuln.title, "DNS Host Name")
 
+    def test_orm_map_report(self):
+        api = vmdr.MapReportORM()
+        report_ref = api.map_report_list(last=True).report_list[0].ref
+        api.drop()
+        api.init_db()
+        api.load(ref=report_ref)
+        api.load(ref=report_ref)
+        stmt = sa.select(sa.func.count()).where(
+            vmdr.map_report_orm.Ip.report_ref == report_ref
+        )
+        count = api.query(stmt)[0][0]
+
+        self.assertEqual(count, len(list(api.iter_map_report(ref=report_ref))))
+
+
+@unittest.skipIf(vmdr_arrow is None, "pyarrow is not installed")
+class TestArrow(unittest.TestCase):
+    def test_write_parquet(self):
+        api = vmdr_arrow.HostListVMDetectionArrow()
+        with tempfile.TemporaryDirectory() as directory:
+            api.write_parquet(directory, partition_by=["status"], ids=32381680)
+            hosts = ds.dataset(os.path.join(directory, "host")).to_table()
+            detections = ds.dataset(
+                os.path.join(directory, "detection"), partitioning="hive"
+            ).to_table()
+
+        self.assertEqual(hosts.column("ip")[0].as_py(), "172.16.76.84")
+        self.assertGreater(detections.num_rows, 0)
+
+    def test_write_map_report_parquet(self):
+        api = vmdr_arrow.MapReportArrow()
+        report_ref = api.map_report_list(last=True).report_list[0].ref
+        with tempfile.TemporaryDirectory() as directory:
+            api.write_parquet(directory, ref=report_ref, batch_size=100)
+            ips = ds.dataset(directory).to_table()
+
+        self.assertEqual(ips.column("report_ref")[0].as_py(), report_ref)
+        self.assertEqual(ips.schema, vmdr_arrow.MAP_IP_SCHEMA)
+
+
+@unittest.skipIf(vmdr_analytics is None, "numpy is not installed")
+class TestAnalytics(unittest.TestCase):
+    def test_severity_status_counts(self):
+        api = vmdr.HostListVMDetectionORM()
+        columns = vmdr_analytics.DetectionColumns.from_database(
+            api, host_list_vm_detection_orm.Detection.host_id == 11619472
+        )
+        hosts, counts = vmdr_analytics.severity_status_counts(columns)
+
+        self.assertEqual(list(hosts), [11619472])
+        self.assertEqual(counts.sum(), len(columns))
+
+    def columns(self):
+        statuses = ["Active", "Active", "Fixed", "New", None, "Active"]
+        return vmdr_analytics.DetectionColumns(
+            host_id=np.array([1, 1, 1, 2, 2, 3], dtype=np.int64),
+            qid=np.arange(6, dtype=np.int64),
+            severity=np.array([5, 5, 3, 0, 4, 5], dtype=np.int8),
+            status=np.array(
+                [vmdr_analytics.STATUSES.index(s) for s in statuses], dtype=np.int8
+            ),
+            type=np.zeros(6, dtype=np.int8),
+            qds=np.array([90, 50, np.nan, 10, 20, 30], dtype=np.float64),
+            first_found=np.array(
+                [
+                    "2024-01-21",
+                    "2023-12-01",
+                    "2023-11-01",
+                    "2024-01-30",
+                    "NaT",
+                    "2023-01-01",
+                ],
+                dtype="datetime64[s]",
+            ),
+            last_fixed=np.array(
+                ["NaT", "NaT", "2023-11-11", "NaT", "NaT", "NaT"],
+                dtype="datetime64[s]",
+            ),
+        )
+
+    def test_severity_status_counts_offline(self):
+        columns = self.columns()
+        active = vmdr_analytics.STATUSES.index("Active")
+        fixed = vmdr_analytics.STATUSES.index("Fixed")
+        new = vmdr_analytics.STATUSES.index("New")
+        unknown = vmdr_analytics.STATUSES.index(None)
+
+        hosts, counts = vmdr_analytics.severity_status_counts(columns)
+        groups, group_counts = vmdr_analytics.severity_status_counts(
+            columns, vmdr_analytics.asset_group_keys(columns, {20: [2, 3], 10: [1, 2]})
+        )
+
+        self.assertEqual(list(hosts), [1, 2, 3])
+        self.assertEqual(
+            counts.shape,
+            (3, len(vmdr_analytics.SEVERITIES), len(vmdr_analytics.STATUSES)),
+        )
+        self.assertEqual(
+            [(*index, counts[index]) for index in zip(*np.nonzero(counts))],
+            [(0, 3, fixed, 1), (0, 5, active, 2), (1, 0, new, 1), (1, 4, unknown, 1)]
+            + [(2, 5, active, 1)],
+        )
+        self.assertEqual(list(groups), [10, 20])
+        self.assertEqual(list(group_counts.sum(axis=(1, 2))), [5, 3])
+        self.assertEqual(list(group_counts[:, 5, active]), [2, 1])
+
+    def test_age_histogram_offline(self):
+        columns = self.columns()
+        now = datetime.datetime(2024, 1, 31, tzinfo=datetime.timezone.utc)
+
+        hosts, open_counts = vmdr_analytics.age_histogram(columns, now=now)
+        _, fixed_counts = vmdr_analytics.age_histogram(columns, fixed=True)
+
+        self.assertEqual(list(hosts), [1, 2, 3])
+        self.assertEqual(
+            open_counts.tolist(),
+            [[1, 0, 1, 0, 0, 0], [1, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 1]],
+        )
+        self.assertEqual(
+            fixed_counts.tolist(),
+            [[1, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0]],
+        )
+
+    def test_qds_percentiles_offline(self):
+        columns = self.columns()
+
+        hosts, medians = vmdr_analytics.qds_percentiles(columns, [50])
+        _, active_medians = vmdr_analytics.qds_percentiles(
+            columns, [50], statuses=["Active"]
+        )
+
+        self.assertEqual(list(hosts), [1, 2, 3])
+        self.assertEqual(medians[:, 0].tolist(), [70, 15, 30])
+        self.assertEqual(active_medians[0, 0], 70)
+        self.assertTrue(np.isnan(active_medians[1, 0]))
+        self.assertEqual(active_medians[2, 0], 30)
+
+
+class TestFastXML(unittest.TestCase):
+    def test_decode_matches_from_xml_tree(self):
+        root = qutils.xml_root_from_bytes(
+            read_fixture("host_list_vm_detection_output.xml"),
+            "HOST_LIST_VM_DETECTION_OUTPUT",
+            huge_tree=True,
+        )
+        model = host_list_vm_detection_output.HostListVMDetectionOutput
+
+        decoded = fast_xml.decode(model, root)
+
+        self.assertEqual(decoded, model.from_xml_tree(root))
+        self.assertEqual(len(decoded.response.host_list), 2)
+        self.assertEqual(
+            len(decoded.response.host_list[0].detections[0].qds_factors), 2
+        )
+
+    def test_decode_keeps_out_of_order_children(self):
+        root = qutils.xml_root_from_bytes(
+            b'<IP value="10.0.0.1"><DISCOVERY method="ICMP"/><PORT value="22"/>'
+            b'<DISCOVERY method="TCP"/></IP>',
+            "IP",
+        )
+
+        decoded = fast_xml.decode(map_report.Ip, root)
+
+        self.assertEqual([d.method for d in decoded.discovery], ["ICMP", "TCP"])
+        self.assertEqual([p.value for p in decoded.port], ["22"])
+
+
+class TestAssetGroupIps(unittest.TestCase):
+    def test_asset_group_ips(self):
+        asset_group = asset_group_list_output.AssetGroup(
+            id=1,
+            ip_set=asset_group_list_output.IPSet(
+                ip=[asset_group_list_output.IP(value="10.0.0.1")],
+                ip_range=[asset_group_list_output.IPRange(value="10.0.0.5-10.0.0.9")],
+            ),
+        )
+
+        self.assertEqual(
+            vmdr.asset_group_ips(asset_group),
+            [ipaddress.ip_address("10.0.0.1"), "10.0.0.5-10.0.0.9"],
+        )
+        self.assertEqual(
+            vmdr.asset_group_ips(asset_group_list_output.AssetGroup(id=2)), []
+        )
+
+
+class TestHostListFilters(unittest.TestCase):
+    def test_id_filters(self):
+        filters = vmdr._id_filters("ids", [7, 1, 2, 3, 5, 9, 10], 2)
+
+        self.assertEqual(filters, [{"ids": "1-3,5"}, {"ids": "7,9-10"}])
+        self.assertEqual(vmdr._id_bounds(filters[1]["ids"]), (7, 10))
+        self.assertEqual(vmdr._id_bounds(None), (0, None))
+
+    def test_ip_filters(self):
+        filters = vmdr._ip_filters(
+            ["10.0.0.1", "10.0.0.2", "10.0.1.0/24", "10.0.3.5", "fe80::1"], 2
+        )
+
+        self.assertEqual(
+            filters,
+            [
+                {"ips": "10.0.0.1-10.0.0.2,10.0.1.0-10.0.1.255"},
+                {"ips": "10.0.3.5"},
+                {"ipv6": "fe80::1"},
+            ],
+        )
+        self.assertEqual(vmdr._ip_filters(None, 2), [{}])
+
+    def test_ip_filters_adjacent_ipv6(self):
+        filters = vmdr._ip_filters(["fe80::2", "fe80::1", "fe80::3", "fe80::1"], 2)
+
+        self.assertEqual(filters, [{"ipv6": "fe80::1,fe80::2"}, {"ipv6": "fe80::3"}])
+        self.assertEqual(
+            vmdr._ip_filters(["fe80::/127"], 1000), [{"ipv6": "fe80::,fe80::1"}]
+        )
+        with self.assertRaises(ValueError):
+            vmdr._ip_filters(["fe80::/64"], 1000)
+
+    def test_host_list_vm_detection_chunks(self):
+        def post(url, data, **kwargs):
+            qids = []
+            for qid_range in data["qids"].split(","):
+                first, _, last = qid_range.partition("-")
+                qids += range(int(first), int(last or first) + 1)
+            detections = "".join(
+                f"<DETECTION><UNIQUE_VULN_ID>{qid}</UNIQUE_VULN_ID><QID>{qid}</QID>"
+                "<TYPE>Confirmed</TYPE></DETECTION>"
+                for qid in qids
+            )
+            hosts = "".join(
+                f"<HOST><ID>{id}</ID><DETECTION_LIST>{detections}</DETECTION_LIST></HOST>"
+                for id in data["ids"].split(",")
+            )
+            xml = (
+                "<HOST_LIST_VM_DETECTION_OUTPUT><RESPONSE>"
+                "<DATETIME>2024-01-15T12:00:00Z</DATETIME>"
+                f"<HOST_LIST>{hosts}</HOST_LIST>"
+                "</RESPONSE></HOST_LIST_VM_DETECTION_OUTPUT>"
+            )
+            return mock.Mock(content=xml.encode())
+
+        with mock.patch.object(vmdr.VmdrAPI, "get"):
+            api = vmdr.VmdrAPI()
+        api.filter_chunk_size = 1
+        with mock.patch.object(api, "post", side_effect=post) as mock_post:
+            hosts, truncated, next_id_min = api.host_list_vm_detection(
+                ids=[1, 3, 5], qids=[100, 101, 200], truncation_limit=2
+            )
+
+        self.assertEqual(
+            [call.kwargs["data"]["qids"] for call in mock_post.call_args_list],
+            ["100-101,200"] * 3,
+        )
+        self.assertEqual([host.id for host in hosts], [1, 3])
+        for host in hosts:
+            self.assertEqual([d.qid for d in host.detections], [100, 101, 200])
+        self.assertTrue(truncated)
+        self.assertEqual(next_id_min, 5)
+
+
+@unittest.skipIf(vmdr_asset_group_index is None, "numpy is not installed")
+class TestAssetGroupIndex(unittest.TestCase):
+    def test_lookup_offline(self):
+        def asset_group(id, ips=(), ip_ranges=()):
+            return asset_group_list_output.AssetGroup(
+                id=id,
+                ip_set=asset_group_list_output.IPSet(
+                    ip=[asset_group_list_output.IP(value=ip) for ip in ips],
+                    ip_range=[
+                        asset_group_list_output.IPRange(value=ip_range)
+                        for ip_range in ip_ranges
+                    ],
+                ),
+            )
+
+        index = vmdr_asset_group_index.AssetGroupIndex.from_asset_groups(
+            [
+                asset_group(3, ip_ranges=["10.0.0.0-10.0.0.255"]),
+                asset_group(1, ips=["10.0.0.5", "fe80::1"]),
+                asset_group(2, ip_ranges=["10.0.0.5-10.0.1.10", "fe80::1-fe80::9"]),
+                asset_group_list_output.AssetGroup(id=4),
+            ]
+        )
+        ips = ["10.0.0.5", "10.0.1.10", "10.0.1.11", "fe80::1", "fe80::a", "10.0.0.0"]
+        expected = [[1, 2, 3], [2], [], [1, 2], [], [3]]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "index.npz")
+            index.save(path)
+            loaded = vmdr_asset_group_index.AssetGroupIndex.load(path)
+
+        self.assertEqual([list(index.lookup(ip)) for ip in ips], expected)
+        self.assertEqual([list(ids) for ids in index.lookup_many(ips)], expected)
+        self.assertEqual([list(ids) for ids in loaded.lookup_many(ips)], expected)
+        self.assertEqual(index.lookup_many([]), [])
+
+    def test_lookup(self):
+        api = vmdr.VmdrAPI()
+        asset_groups = api.asset_group_list()
+        test_group = next(ag for ag in asset_groups if ag.title == "QualysPy Test")
+        index = vmdr_asset_group_index.AssetGroupIndex.from_asset_groups(asset_groups)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "index.npz")
+            index.save(path)
+            loaded = vmdr_asset_group_index.AssetGroupIndex.load(path)
+
+        self.assertIn(test_group.id, index.lookup("172.19.15.1"))
+        self.assertEqual(
+            [list(ids) for ids in loaded.lookup_many(["172.19.15.1", "172.16.76.49"])],
+            [list(ids) for ids in index.lookup_many(["172.19.15.1", "172.16.76.49"])],
+        )
+
 
 if __name__ == "__main__":
     unittest.main()